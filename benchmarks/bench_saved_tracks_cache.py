@@ -0,0 +1,219 @@
+"""Scale benchmarks for the saved-tracks cache.
+
+Generates synthetic libraries, then times and measures the peak memory of
+loading, saving, building the duplicate-check key set and filtering by date.
+Results are compared against a stored baseline; the run fails when any
+operation regresses beyond the tolerance.
+
+    python benchmarks/bench_saved_tracks_cache.py                 # 10k, 100k, 1M
+    python benchmarks/bench_saved_tracks_cache.py --sizes 10000   # quick check
+    python benchmarks/bench_saved_tracks_cache.py --update-baseline
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from loguru import logger  # noqa: E402
+from saved_tracks_cache import (  # noqa: E402
+    _load_from_cache,
+    _save_to_cache,
+    get_saved_track_keys,
+    get_tracks_in_date_range,
+)
+from track_collection import TrackCollection  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+# Allowed slowdown / growth over the baseline before a result counts as a regression
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.2
+# Timings are the best of this many runs; large libraries are run once
+REPEATS = 3
+SINGLE_RUN_FROM = 1_000_000
+# Rolling windows and the weekly mix filter on windows of roughly this size
+FILTER_DAYS = 90
+LIBRARY_YEARS = 10
+SEED = 20240101
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def _spotify_id(rng: random.Random) -> str:
+    return "".join(rng.choices(_ID_ALPHABET, k=22))
+
+
+def generate_library(
+    size: int, seed: int = SEED, newest: datetime.datetime | None = None
+) -> TrackCollection:
+    """Build a synthetic library of `size` tracks, most recently added first.
+
+    Artist popularity is skewed so a few artists own many tracks, as in real
+    libraries, and additions are spread evenly over the LIBRARY_YEARS up to
+    `newest` (by default the start of today, so date filters, which count
+    back from now, see the same window whenever the benchmark runs).
+    """
+    rng = random.Random(seed)
+    artist_count = max(1, size // 20)
+    artists = [(f"Artist {i}", _spotify_id(rng)) for i in range(artist_count)]
+    if newest is None:
+        newest = datetime.datetime.now(datetime.timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+    step = LIBRARY_YEARS * 365 * 24 * 3600 / size
+
+    tracks = TrackCollection()
+    for i in range(size):
+        primary = artists[min(int(rng.paretovariate(1.2)) - 1, artist_count - 1)]
+        group = [primary]
+        if rng.random() < 0.15:
+            group.append(rng.choice(artists))
+
+        added = newest - datetime.timedelta(seconds=int(i * step))
+        tracks.append(
+            id=_spotify_id(rng),
+            name=f"Track {i}",
+            artists=[name for name, _ in group],
+            artist_ids=[artist_id for _, artist_id in group],
+            album=f"{primary[0]} Album {rng.randrange(8)}",
+            duration_ms=rng.randrange(90_000, 420_000),
+            added_at=added.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            added_at_epoch=int(added.timestamp()),
+        )
+    return tracks
+
+
+def measure(fn: Callable[..., Any], repeats: int, *args: Any) -> dict[str, float]:
+    """Best wall time of `fn(*args)` over `repeats` runs, plus peak traced memory of one more.
+
+    Memory is measured separately because tracemalloc slows allocation-heavy
+    code down by several times.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started_at = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started_at)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def run_size(size: int, workdir: Path) -> dict[str, dict[str, float]]:
+    tracks = generate_library(size)
+    cache_file = workdir / f"saved_tracks_{size}.json"
+    repeats = 1 if size >= SINGLE_RUN_FROM else REPEATS
+
+    results = {"save": measure(_save_to_cache, repeats, tracks, cache_file)}
+    # Not held while the loads are measured
+    del tracks
+    results["load"] = measure(lambda: _load_from_cache(cache_file), repeats)
+    # Both go through a cache load, as the scripts do; subtract "load" to isolate them
+    results["keys"] = measure(lambda: get_saved_track_keys(None, cache_file=cache_file), repeats)
+    window = get_tracks_in_date_range(None, FILTER_DAYS, cache_file=cache_file)
+    assert len(window) > 0, f"No synthetic tracks in the last {FILTER_DAYS} days"
+    del window
+    results["date_filter"] = measure(
+        lambda: get_tracks_in_date_range(None, FILTER_DAYS, cache_file=cache_file), repeats
+    )
+    cache_file.unlink()
+    return results
+
+
+def find_regressions(
+    results: dict[str, dict[str, dict[str, float]]],
+    baseline: dict[str, dict[str, dict[str, float]]],
+    time_tolerance: float = TIME_TOLERANCE,
+    memory_tolerance: float = MEMORY_TOLERANCE,
+) -> list[str]:
+    """Describe every result worse than its baseline beyond the tolerances.
+
+    Sizes or operations missing from the baseline are not compared.
+    """
+    regressions = []
+    for size, operations in results.items():
+        for operation, result in operations.items():
+            expected = baseline.get(size, {}).get(operation)
+            if not expected:
+                continue
+            for metric, tolerance in (("seconds", time_tolerance), ("peak_mb", memory_tolerance)):
+                if result[metric] > expected[metric] * tolerance:
+                    regressions.append(
+                        f"{operation} @ {size}: {metric} {result[metric]:.3f} "
+                        f"> {expected[metric]:.3f} x {tolerance}"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the saved-tracks cache at scale")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Record these results as the new baseline instead of comparing",
+    )
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    logger.disable("saved_tracks_cache")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[str(size)] = run_size(size, Path(workdir))
+            for operation, result in results[str(size)].items():
+                print(
+                    f"{size:>9} {operation:<12} {result['seconds']:>9.3f}s "
+                    f"{result['peak_mb']:>9.1f} MB peak"
+                )
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+
+    regressions = find_regressions(
+        results,
+        json.loads(args.baseline.read_text()),
+        args.time_tolerance,
+        args.memory_tolerance,
+    )
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,129 @@
 import argparse
-import datetime
-import os
-from collections import defaultdict
+from pathlib import Path
 from dotenv import load_dotenv
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+from logging_setup import add_logging_arguments, configure_logging
 from loguru import logger
-from saved_tracks_cache import get_saved_tracks
-
-logger.remove()
-logger.add(
-    "logs/analyze-unfollowed-artists.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="DEBUG",
-)
-logger.add(
-    lambda msg: print(msg, end=""),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="INFO",
+from profiles import (
+    PROFILES_PATH,
+    authorize_spotify_client,
+    build_spotify_client,
+    resolve_profile,
 )
+from profiling import add_profiling_arguments, profiling_session, span
+from saved_tracks_cache import iter_saved_track_artists, iter_saved_tracks
+from spotify_pagination import FOLLOWED_ARTISTS_PAGE_SIZE, paginate
+from track_collection import cutoff_epoch, iter_added_since, iter_track_artists
+from unfollowed_artists import ArtistAggregate, count_artists, top_unfollowed
 
-load_dotenv()
-
-client_id = os.getenv("SPOTIPY_CLIENT_ID")
-client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
-redirect_uri = os.getenv("SPOTIPY_REDIRECT_URI")
+DEFAULT_TOP = 50
 scope = "user-library-read,user-follow-read"
 
-auth_manager = SpotifyOAuth(
-    client_id=client_id,
-    client_secret=client_secret,
-    redirect_uri=redirect_uri,
-    scope=scope,
-)
-sp = spotipy.Spotify(auth_manager=auth_manager)
 
-parser = argparse.ArgumentParser(
-    description="Analyze unfollowed artists from saved tracks"
-)
-parser.add_argument(
-    "--days",
-    type=int,
-    default=None,
-    help="Only analyze tracks saved in the last N days",
-)
-args = parser.parse_args()
+def refresh_followed_artists(sp, aggregate, force=False):
+    """Re-page followed artists only when the persisted set is stale"""
+    if not force and aggregate.followed_is_fresh():
+        logger.info(f"Using {len(aggregate.followed)} cached followed artists")
+        return
 
-logger.info("Fetching saved tracks...")
-tracks = get_saved_tracks(sp)
+    logger.info("Fetching followed artists...")
+    followed_ids = [
+        artist["id"]
+        for artist in paginate(
+            sp,
+            sp.current_user_followed_artists(limit=FOLLOWED_ARTISTS_PAGE_SIZE),
+            container_key="artists",
+        )
+    ]
+    followed, unfollowed = aggregate.apply_followed(followed_ids)
+    logger.info(
+        f"Found {len(aggregate.followed)} followed artists "
+        f"(+{followed}/-{unfollowed} since last run)"
+    )
+
+
+def analyze(args):
+    """Update the per-artist aggregate and rank unfollowed artists"""
+    profile = resolve_profile(args.profile, args.profiles)
+    with span("auth"):
+        sp = build_spotify_client(profile, scope)
+        authorize_spotify_client(sp)
 
-if args.days is not None:
-    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
-        days=args.days
+    logger.info("Fetching saved tracks...")
+    with span("aggregate"):
+        aggregate = ArtistAggregate.load(profile.unfollowed_artists_path)
+        # Streamed from the cache, so only the aggregate is held in memory
+        added, removed = aggregate.apply_library(
+            iter_saved_track_artists(sp, cache_file=profile.saved_tracks_path)
+        )
+    logger.info(
+        f"Loaded {len(aggregate.track_artists)} saved tracks "
+        f"(+{added}/-{removed} since last run)"
     )
-    tracks = [
-        t
-        for t in tracks
-        if datetime.datetime.fromisoformat(t["added_at"].replace("Z", "+00:00"))
-        >= cutoff_date
-    ]
-    logger.info(f"Filtered to {len(tracks)} tracks from last {args.days} days")
-else:
-    logger.info(f"Loaded {len(tracks)} saved tracks")
-
-logger.info("Fetching followed artists...")
-followed_artists = set()
-results = sp.current_user_followed_artists(limit=50)
-while results:
-    for artist in results["artists"]["items"]:
-        followed_artists.add(artist["name"].lower().strip())
-    if results["artists"]["next"]:
-        results = sp.next(results["artists"])
-    else:
-        break
-logger.info(f"Found {len(followed_artists)} followed artists")
-
-artist_counts = defaultdict(int)
-for track in tracks:
-    for artist_name in track.get("artists", []):
-        artist_lower = artist_name.lower().strip()
-        if artist_lower not in followed_artists:
-            artist_counts[artist_lower] += 1
-
-sorted_artists = sorted(artist_counts.items(), key=lambda x: x[1], reverse=True)
-
-logger.info(f"\nFound {len(sorted_artists)} unfollowed artists from saved tracks")
-print("\n--- Artists NOT followed (sorted by frequency) ---")
-for artist, count in sorted_artists:
-    print(f"{count:3d}  {artist}")
+    with span("followed artists"):
+        refresh_followed_artists(sp, aggregate, force=args.refresh_followed)
+    with span("aggregate save"):
+        aggregate.save(profile.unfollowed_artists_path)
+
+    top = args.top or None
+    with span("rank"):
+        if args.days is not None:
+            window = iter_added_since(
+                iter_saved_tracks(sp, cache_file=profile.saved_tracks_path),
+                cutoff_epoch(args.days),
+            )
+            filtered = 0
+
+            def counted(rows):
+                nonlocal filtered
+                for row in rows:
+                    filtered += 1
+                    yield row
+
+            # Streamed, so the window is never held in memory
+            counts, names = count_artists(counted(iter_track_artists(window)))
+            logger.info(f"Filtered to {filtered} tracks from last {args.days} days")
+            return top_unfollowed(counts, names, aggregate.followed, top)
+        return aggregate.top_unfollowed(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze unfollowed artists from saved tracks"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=None,
+        help="Only analyze tracks saved in the last N days",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP,
+        help="Number of artists to list (0 lists all)",
+    )
+    parser.add_argument(
+        "--refresh-followed",
+        action="store_true",
+        help="Re-fetch followed artists even if the cached list is fresh",
+    )
+    parser.add_argument("--profile", help="Profile name from the profiles file")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_PATH)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    configure_logging("analyze-unfollowed-artists", json_logs=args.log_json)
+    load_dotenv()
+
+    with profiling_session("analyze-unfollowed", args.cprofile, args.timings):
+        ranked = analyze(args)
+
+    logger.info(f"\nListing {len(ranked)} unfollowed artists from saved tracks")
+    print("\n--- Artists NOT followed (sorted by frequency) ---")
+    for artist in ranked:
+        print(f"{artist.count:3d}  {artist.name}")
+
+
+if __name__ == "__main__":
+    main()
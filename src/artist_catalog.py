@@ -0,0 +1,346 @@
+import datetime
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from cache_files import atomic_write_json, file_lock, lock_path_for
+from generative_discovery import fetch_similar_artists, resolve_spotify_artist
+from loguru import logger
+from singleflight import SingleFlight
+from spotify_pagination import ALBUM_TRACKS_PAGE_SIZE, ARTIST_ALBUMS_PAGE_SIZE, paginate
+
+
+CATALOG_PATH = Path(__file__).parent.parent / "data" / "artist_catalog.json"
+CATALOG_EXPIRY_DAYS = 7
+CATALOG_SECTIONS = ("artists", "albums", "similar", "resolved")
+
+
+def _trim_artists(artists: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [{"id": artist["id"], "name": artist["name"]} for artist in artists]
+
+
+def trim_album(album: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the album fields the mix generators read."""
+    return {
+        "id": album["id"],
+        "name": album["name"],
+        "artists": _trim_artists(album.get("artists", [])),
+    }
+
+
+def trim_track(track: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the track fields the mix generators read."""
+    return {
+        "id": track["id"],
+        "name": track["name"],
+        "duration_ms": track["duration_ms"],
+        "artists": _trim_artists(track.get("artists", [])),
+    }
+
+
+def trim_similar_artist(candidate: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the Last.fm similar-artist fields discovery reads."""
+    return {"name": candidate.get("name", ""), "match": candidate.get("match")}
+
+
+def _listing_unchanged(previous: dict[str, Any], first_page: dict[str, Any]) -> bool:
+    """Whether an artist's first album page matches the cached listing."""
+    if "total" not in previous or first_page.get("total") != previous["total"]:
+        return False
+    known_ids = set(previous["album_ids"])
+    return all(album["id"] in known_ids for album in first_page.get("items") or [])
+
+
+def _merge_newer(entries: dict[str, dict[str, Any]], other: dict[str, dict[str, Any]]) -> int:
+    """Copy entries from `other` that are missing or fetched more recently."""
+    merged = 0
+    for key, entry in other.items():
+        current = entries.get(key)
+        if current is None or entry["fetched_at"] > current["fetched_at"]:
+            entries[key] = entry
+            merged += 1
+    return merged
+
+
+class ArtistCatalog:
+    """User-independent cache of artist discographies and album track lists.
+
+    Catalog data is the same for every Spotify account, so one instance can be
+    shared by concurrent runs for different profiles and persisted between runs.
+    It also holds Last.fm similar artists per seed name and the Spotify artist
+    each Last.fm name resolved to (None when it did not resolve).
+
+    An `offline` catalog never calls an API: cached entries are used whatever
+    their age and misses come back empty, as for an artist with no albums.
+    """
+
+    def __init__(
+        self,
+        path: Path = CATALOG_PATH,
+        expiry_days: int = CATALOG_EXPIRY_DAYS,
+        artists: dict[str, dict[str, Any]] | None = None,
+        albums: dict[str, dict[str, Any]] | None = None,
+        similar: dict[str, dict[str, Any]] | None = None,
+        resolved: dict[str, dict[str, Any]] | None = None,
+        offline: bool = False,
+    ):
+        self.path = path
+        self.offline = offline
+        self.expiry = datetime.timedelta(days=expiry_days)
+        self._artists = {} if artists is None else artists
+        self._albums = {} if albums is None else albums
+        self._similar = {} if similar is None else similar
+        self._resolved = {} if resolved is None else resolved
+        self._lock = threading.Lock()
+        self._dirty = False
+        # Concurrent misses for the same entry share one API call
+        self._in_flight = SingleFlight()
+
+    @classmethod
+    def load(
+        cls,
+        path: Path = CATALOG_PATH,
+        expiry_days: int = CATALOG_EXPIRY_DAYS,
+        offline: bool = False,
+    ) -> "ArtistCatalog":
+        """Load the catalog from disk, starting empty if it is missing or unreadable."""
+        if not path.exists():
+            return cls(path, expiry_days, offline=offline)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading artist catalog {path}: {e}")
+            return cls(path, expiry_days, offline=offline)
+
+        sections = (data.get(section) for section in CATALOG_SECTIONS)
+        return cls(path, expiry_days, *sections, offline=offline)
+
+    def save(self) -> None:
+        """Persist the catalog if anything was fetched since it was loaded.
+
+        Entries written by other processes since this catalog was loaded are
+        merged in, keeping whichever copy of an entry was fetched most recently.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                section: dict(entries)
+                for section, entries in zip(CATALOG_SECTIONS, self._sections())
+            }
+            self._dirty = False
+
+        with file_lock(lock_path_for(self.path)):
+            on_disk = ArtistCatalog.load(self.path)
+            for key, entries in zip(CATALOG_SECTIONS, on_disk._sections()):
+                _merge_newer(data[key], entries)
+            atomic_write_json(self.path, data, ensure_ascii=False)
+
+        logger.debug(
+            f"Artist catalog saved to {self.path}: "
+            f"{len(data['artists'])} artists, {len(data['albums'])} albums"
+        )
+
+    def merge_from_disk(self) -> int:
+        """Pull in entries other processes saved since this catalog was loaded.
+
+        Entries are merged into the existing dicts in place, so offline views
+        see them too, keeping whichever copy was fetched most recently.
+        Returns how many entries were added or replaced.
+        """
+        on_disk = ArtistCatalog.load(self.path)
+        with self._lock:
+            return sum(
+                _merge_newer(entries, disk_entries)
+                for entries, disk_entries in zip(self._sections(), on_disk._sections())
+            )
+
+    def offline_view(self) -> "ArtistCatalog":
+        """An offline catalog over this one's entries, for previews beside live runs.
+
+        Entries fetched by this catalog later show up in the view too.
+        """
+        view = ArtistCatalog(self.path, self.expiry.days, *self._sections(), offline=True)
+        view._lock = self._lock
+        return view
+
+    def artist_albums(
+        self, sp: Any, artist_id: str, refresh: bool = False
+    ) -> tuple[dict[str, Any], ...]:
+        """Return an artist's albums and singles, fetching them if not fresh."""
+        entry = None if refresh else self._fresh_entry(self._artists, artist_id)
+        if entry is None:
+            entry = self._load(("artists", artist_id), self._load_artist_albums, sp, artist_id)
+        return tuple(entry["albums"]) if entry else tuple()
+
+    def album_tracks(
+        self, sp: Any, album_id: str, refresh: bool = False
+    ) -> tuple[dict[str, Any], ...]:
+        """Return an album's tracks, fetching them if not fresh."""
+        entry = None if refresh else self._fresh_entry(self._albums, album_id)
+        if entry is None:
+            entry = self._load(("albums", album_id), self._load_album_tracks, sp, album_id)
+        return tuple(entry["tracks"]) if entry else tuple()
+
+    def similar_artists(
+        self,
+        seed_artist_name: str,
+        api_key: str,
+        refresh: bool = False,
+        rate_limiter: Any = None,
+    ) -> list[dict[str, Any]]:
+        """Return Last.fm similar artists for a seed name, fetching them if not fresh.
+
+        Fetch errors propagate, as with `fetch_similar_artists`.
+        """
+        entry = None if refresh else self._fresh_entry(self._similar, seed_artist_name)
+        if entry is None:
+            entry = self._load(
+                ("similar", seed_artist_name),
+                self._load_similar_artists,
+                seed_artist_name,
+                api_key,
+                rate_limiter,
+            )
+        if entry is None:
+            return []
+        # Copied since discovery removes candidates it fails to resolve
+        return [dict(candidate) for candidate in entry["candidates"]]
+
+    def resolve_artist(
+        self, sp: Any, artist_name: str, refresh: bool = False
+    ) -> dict[str, Any] | None:
+        """Resolve a Last.fm artist name to a Spotify artist, caching misses too."""
+        entry = None if refresh else self._fresh_entry(self._resolved, artist_name)
+        if entry is None:
+            entry = self._load(
+                ("resolved", artist_name), self._load_resolved_artist, sp, artist_name
+            )
+        return dict(entry["artist"]) if entry and entry["artist"] else None
+
+    def entry_age(self, section: str, key: str) -> datetime.timedelta | None:
+        """Age of a cached entry in one of CATALOG_SECTIONS, or None if missing."""
+        entries = dict(zip(CATALOG_SECTIONS, self._sections()))[section]
+        with self._lock:
+            entry = entries.get(key)
+        if entry is None:
+            return None
+        fetched_at = datetime.datetime.fromisoformat(entry["fetched_at"])
+        return datetime.datetime.now(datetime.timezone.utc) - fetched_at
+
+    def cached_similar_artists(self, seed_artist_name: str) -> list[dict[str, Any]]:
+        """Return the cached Last.fm similar artists for a seed, whatever their age."""
+        with self._lock:
+            entry = self._similar.get(seed_artist_name)
+        return list(entry["candidates"]) if entry else []
+
+    def cached_album_tracks(self, artist_id: str) -> list[tuple[dict[str, Any], ...]]:
+        """Return the cached track lists of an artist's albums, whatever their age.
+
+        Never calls the API, so it stays fast when a run is short on time.
+        """
+        with self._lock:
+            artist = self._artists.get(artist_id)
+            if artist is None:
+                return []
+            albums = [self._albums.get(album["id"]) for album in artist["albums"]]
+        return [tuple(album["tracks"]) for album in albums if album and album["tracks"]]
+
+    def _load(
+        self, key: tuple[str, str], loader: Callable[..., Any], *args: Any
+    ) -> dict[str, Any] | None:
+        """Run a loader for a missing or stale entry; offline catalogs report a miss."""
+        if self.offline:
+            return None
+        return self._in_flight.do(key, loader, *args)
+
+    # Loaders run at most once at a time per key; concurrent callers share the result
+
+    def _load_artist_albums(self, sp: Any, artist_id: str) -> dict[str, Any] | None:
+        try:
+            entry = self._fetch_artist_albums(sp, artist_id)
+        except Exception as e:
+            logger.error(f"Error fetching albums for artist {artist_id}: {e}")
+            return None
+        return self._store(self._artists, artist_id, entry)
+
+    def _load_album_tracks(self, sp: Any, album_id: str) -> dict[str, Any] | None:
+        try:
+            first_page = sp.album_tracks(album_id, limit=ALBUM_TRACKS_PAGE_SIZE)
+            tracks = [trim_track(track) for track in paginate(sp, first_page)]
+        except Exception as e:
+            logger.error(f"Error fetching tracks for album {album_id}: {e}")
+            return None
+        return self._store(self._albums, album_id, {"tracks": tracks})
+
+    def _load_similar_artists(
+        self, seed_artist_name: str, api_key: str, rate_limiter: Any
+    ) -> dict[str, Any]:
+        candidates = fetch_similar_artists(seed_artist_name, api_key, rate_limiter=rate_limiter)
+        entry = {"candidates": [trim_similar_artist(c) for c in candidates]}
+        return self._store(self._similar, seed_artist_name, entry)
+
+    def _load_resolved_artist(self, sp: Any, artist_name: str) -> dict[str, Any]:
+        artist = resolve_spotify_artist(sp, artist_name)
+        entry = {"artist": {"id": artist["id"], "name": artist["name"]} if artist else None}
+        return self._store(self._resolved, artist_name, entry)
+
+    def _fetch_artist_albums(self, sp: Any, artist_id: str) -> dict[str, Any]:
+        """Fetch an artist's discography, reusing the cached one if nothing changed.
+
+        Only the first page is fetched when a cached listing exists: if its total
+        and album IDs match what was stored, the rest of the pages are skipped.
+        """
+        with self._lock:
+            previous = self._artists.get(artist_id)
+        first_page = sp.artist_albums(
+            artist_id, album_type="album,single", limit=ARTIST_ALBUMS_PAGE_SIZE
+        )
+
+        if previous is not None and _listing_unchanged(previous, first_page):
+            logger.debug(f"No new releases for artist {artist_id}")
+            return {
+                "albums": previous["albums"],
+                "album_ids": previous["album_ids"],
+                "total": previous["total"],
+            }
+
+        listing = list(paginate(sp, first_page))
+        return {
+            # Albums where the artist is only a guest are listed but not sampled
+            "albums": [
+                trim_album(album)
+                for album in listing
+                if artist_id in [artist["id"] for artist in album["artists"]]
+            ],
+            "album_ids": [album["id"] for album in listing],
+            "total": first_page.get("total", len(listing)),
+        }
+
+    def _sections(self) -> tuple[dict[str, dict[str, Any]], ...]:
+        return (self._artists, self._albums, self._similar, self._resolved)
+
+    def _fresh_entry(
+        self, entries: dict[str, dict[str, Any]], key: str
+    ) -> dict[str, Any] | None:
+        with self._lock:
+            entry = entries.get(key)
+        if entry is None or self.offline:
+            return entry
+
+        fetched_at = datetime.datetime.fromisoformat(entry["fetched_at"])
+        if datetime.datetime.now(datetime.timezone.utc) - fetched_at > self.expiry:
+            return None
+        return entry
+
+    def _store(
+        self, entries: dict[str, dict[str, Any]], key: str, entry: dict[str, Any]
+    ) -> dict[str, Any]:
+        entry["fetched_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock:
+            entries[key] = entry
+            self._dirty = True
+        return entry
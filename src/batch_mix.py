@@ -0,0 +1,120 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from artist_catalog import ArtistCatalog
+from dotenv import load_dotenv
+from logging_setup import add_logging_arguments, configure_logging
+from loguru import logger
+from make_rolling import run_rolling_playlists
+from make_weekly_mix import load_config, run_weekly_mix
+from profiles import (
+    PROFILES_PATH,
+    Profile,
+    build_spotify_client,
+    load_profiles,
+    load_profiles_config,
+)
+from request_scheduler import CRITICAL
+
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def run_profile(
+    profile: Profile,
+    config: dict,
+    catalog: ArtistCatalog,
+    lastfm_api_key: str | None,
+) -> dict[str, bool]:
+    """Run every job configured for one profile, returning success per job."""
+    results = {}
+    try:
+        sp = build_spotify_client(profile, priority=CRITICAL)
+    except Exception as e:
+        logger.error(f"[{profile.name}] Could not create Spotify client: {e}")
+        return {job: False for job in profile.jobs}
+
+    for job in profile.jobs:
+        logger.info(f"[{profile.name}] Starting {job} job")
+        try:
+            if job == "weekly":
+                run_weekly_mix(sp, profile, config, catalog, lastfm_api_key)
+            elif job == "rolling":
+                run_rolling_playlists(sp, profile, config)
+            results[job] = True
+            logger.info(f"[{profile.name}] Finished {job} job")
+        except Exception as e:
+            logger.exception(f"[{profile.name}] {job} job failed: {e}")
+            results[job] = False
+
+    return results
+
+
+def run_batch(
+    profiles: list[Profile],
+    config: dict,
+    catalog: ArtistCatalog,
+    lastfm_api_key: str | None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> dict[str, dict[str, bool]]:
+    """Run all profiles on a worker pool that shares one artist catalog."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            profile.name: executor.submit(
+                run_profile, profile, config, catalog, lastfm_api_key
+            )
+            for profile in profiles
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run weekly and rolling playlist jobs for every profile"
+    )
+    parser.add_argument("--profiles", type=Path, default=PROFILES_PATH)
+    parser.add_argument("--max-workers", type=int, default=None)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_logging("batch", json_logs=args.log_json)
+    load_dotenv()
+
+    profiles = load_profiles(args.profiles)
+    if not profiles:
+        logger.error(f"No profiles configured in {args.profiles}")
+        raise SystemExit(1)
+
+    max_workers = args.max_workers or load_profiles_config(args.profiles).get(
+        "max_workers", DEFAULT_MAX_WORKERS
+    )
+    logger.info(f"Running {len(profiles)} profiles with {max_workers} workers")
+
+    catalog = ArtistCatalog.load()
+    try:
+        results = run_batch(
+            profiles,
+            load_config(),
+            catalog,
+            os.getenv("LASTFM_API_KEY"),
+            max_workers=max_workers,
+        )
+    finally:
+        catalog.save()
+
+    failures = [
+        f"{name}:{job}"
+        for name, jobs in results.items()
+        for job, succeeded in jobs.items()
+        if not succeeded
+    ]
+    if failures:
+        logger.error(f"Failed jobs: {', '.join(failures)}")
+        raise SystemExit(1)
+    logger.info("All profile jobs completed successfully")
+
+
+if __name__ == "__main__":
+    main()
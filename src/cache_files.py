@@ -0,0 +1,74 @@
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+def lock_path_for(path: Path, purpose: str = "lock") -> Path:
+    """Return the sidecar lock file guarding `path`."""
+    return path.with_name(f"{path.name}.{purpose}")
+
+
+@contextmanager
+def file_lock(lock_path: Path, shared: bool = False, blocking: bool = True) -> Iterator[None]:
+    """Hold an advisory lock on `lock_path` across processes until the block exits.
+
+    With `blocking=False`, raises BlockingIOError instead of waiting for a holder.
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        fcntl.flock(lock_file, operation if blocking else operation | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: Path, data: Any, **dump_kwargs: Any) -> None:
+    """Write JSON to a temp file in the same directory, then rename it over `path`.
+
+    Readers see either the old file or the new one, never a partial write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_json_lines(path: Path, records: Iterable[Any], **dump_kwargs: Any) -> None:
+    """Write one JSON document per line, atomically as in `atomic_write_json`.
+
+    Records are serialized as they are consumed, so a generator is never
+    materialized in full.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, **dump_kwargs))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
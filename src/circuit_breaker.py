@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Any, Callable
+
+from loguru import logger
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while, so callers fail fast.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call raises CircuitOpenError without running. Calls slower than
+    `slow_call_seconds` count as failures even when they succeed, so a
+    dependency that answers only after a long wait trips it too. Once
+    `open_seconds` have passed a single trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        slow_call_seconds: float | None = None,
+        open_seconds: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        # Calls rejected while open, for run summaries
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at < self.open_seconds:
+                return "open"
+            return "half-open"
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._before_call()
+        started_at = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(success=False)
+            raise
+
+        slow = (
+            self.slow_call_seconds is not None
+            and self._clock() - started_at > self.slow_call_seconds
+        )
+        self._record(success=not slow)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = self._clock() - self._opened_at
+            if waited >= self.open_seconds and not self._trial_running:
+                self._trial_running = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.open_seconds - waited)
+        raise CircuitOpenError(f"{self.name} circuit is open, retrying in {retry_in:.0f}s")
+
+    def _record(self, success: bool) -> None:
+        with self._lock:
+            was_open = self._opened_at is not None
+            was_trial = self._trial_running
+            self._trial_running = False
+            opens = False
+            if success:
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                # Calls still in flight when the circuit opened don't reopen it
+                opens = was_trial or (
+                    not was_open and self._failures >= self.failure_threshold
+                )
+                if opens:
+                    self._opened_at = self._clock()
+
+        if success and was_open:
+            logger.info(f"{self.name} recovered, circuit closed")
+        elif opens:
+            logger.warning(
+                f"{self.name} failed {self._failures} times in a row, "
+                f"skipping calls for {self.open_seconds:.0f}s"
+            )
@@ -0,0 +1,67 @@
+import datetime
+import json
+from pathlib import Path
+from typing import Any
+
+from cache_files import atomic_write_json, file_lock, lock_path_for
+from loguru import logger
+from spotify_pagination import FOLLOWED_ARTISTS_PAGE_SIZE, paginate
+
+
+# The prewarm job refreshes this daily; the slack covers a missed run
+FOLLOWED_ARTISTS_EXPIRY_HOURS = 48
+
+
+def fetch_followed_artists(sp: Any) -> list[dict[str, Any]]:
+    """Page through the user's followed artists, keeping only ID and name."""
+    logger.info("Fetching saved artists...")
+    first_page = sp.current_user_followed_artists(limit=FOLLOWED_ARTISTS_PAGE_SIZE)
+    artists = [
+        {"id": artist["id"], "name": artist["name"]}
+        for artist in paginate(sp, first_page, container_key="artists")
+    ]
+    logger.info(f"Total saved artists found: {len(artists)}")
+    return artists
+
+
+def load_followed_artists(
+    path: Path, max_age_hours: float = FOLLOWED_ARTISTS_EXPIRY_HOURS
+) -> list[dict[str, Any]] | None:
+    """Return the cached followed artists, or None if missing or expired."""
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        fetched_at = datetime.datetime.fromisoformat(data["fetched_at"])
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Error loading followed artists {path}: {e}")
+        return None
+
+    age = datetime.datetime.now(datetime.timezone.utc) - fetched_at
+    if age.total_seconds() >= max_age_hours * 60 * 60:
+        return None
+    return data["artists"]
+
+
+def save_followed_artists(path: Path, artists: list[dict[str, Any]]) -> None:
+    data = {
+        "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "artists": artists,
+    }
+    with file_lock(lock_path_for(path)):
+        atomic_write_json(path, data, ensure_ascii=False)
+
+
+def get_followed_artists(sp: Any, path: Path, refresh: bool = False) -> list[dict[str, Any]]:
+    """Return followed artists from the cache when fresh, refetching otherwise."""
+    if not refresh:
+        cached = load_followed_artists(path)
+        if cached is not None:
+            logger.info(f"Loaded {len(cached)} followed artists from cache")
+            return cached
+
+    artists = fetch_followed_artists(sp)
+    save_followed_artists(path, artists)
+    return artists
@@ -1,11 +1,33 @@
 import random
 import re
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
 
 import requests
+from circuit_breaker import CircuitBreaker
+from request_scheduler import LASTFM, retry_after_seconds, scheduler
 
 
 LASTFM_API_URL = "https://ws.audioscrobbler.com/2.0/"
+LASTFM_MAX_WORKERS = 4
+# Healthy responses take well under a second, so a short deadline plus one
+# retry fails faster than a single long wait and rides out a dropped request
+LASTFM_TIMEOUT_SECONDS = 4
+LASTFM_RETRIES = 1
+# Consecutive failed or slow requests before Last.fm is skipped for a while
+LASTFM_FAILURE_THRESHOLD = 3
+LASTFM_SLOW_CALL_SECONDS = 3
+LASTFM_OPEN_SECONDS = 120
+# Last.fm's error code for "Rate limit exceeded"
+LASTFM_RATE_LIMIT_ERROR = 29
+
+# Shared by every Last.fm request in the process, so one outage is noticed once
+lastfm_circuit = CircuitBreaker(
+    "Last.fm",
+    failure_threshold=LASTFM_FAILURE_THRESHOLD,
+    slow_call_seconds=LASTFM_SLOW_CALL_SECONDS,
+    open_seconds=LASTFM_OPEN_SECONDS,
+)
 
 
 def normalize_artist_name(name: str) -> str:
@@ -54,13 +76,29 @@ def weighted_choice(candidates: list[dict[str, Any]], rng: Any = random) -> dict
     return weighted_candidates[-1][0]
 
 
+def _get_lastfm(params: dict[str, Any], timeout: float) -> dict[str, Any]:
+    response = requests.get(LASTFM_API_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
 def fetch_similar_artists(
     artist_name: str,
     api_key: str,
     limit: int = 50,
-    timeout: int = 10,
+    timeout: float = LASTFM_TIMEOUT_SECONDS,
+    rate_limiter: Any = None,
+    retries: int = LASTFM_RETRIES,
+    circuit_breaker: CircuitBreaker | None = lastfm_circuit,
 ) -> list[dict[str, Any]]:
-    """Fetch similar artists from Last.fm for one artist name."""
+    """Fetch similar artists from Last.fm for one artist name.
+
+    Timeouts, connection errors and rate-limit responses are retried up to
+    `retries` times; rate limiting is also reported to `rate_limiter`, so
+    other requests slow down. Requests go through `circuit_breaker`, which
+    raises CircuitOpenError right away while Last.fm is failing; pass None to
+    always call it.
+    """
     params = {
         "method": "artist.getSimilar",
         "artist": artist_name,
@@ -69,14 +107,34 @@ def fetch_similar_artists(
         "autocorrect": 1,
         "limit": limit,
     }
-    try:
-        response = requests.get(LASTFM_API_URL, params=params, timeout=timeout)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        raise RuntimeError(
-            f"Last.fm artist.getSimilar request failed for {artist_name}: {e.__class__.__name__}"
-        ) from None
-    payload = response.json()
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            if circuit_breaker is not None:
+                payload = circuit_breaker.call(_get_lastfm, params, timeout)
+            else:
+                payload = _get_lastfm(params, timeout)
+        except requests.RequestException as e:
+            throttled = e.response is not None and e.response.status_code == 429
+            if throttled and rate_limiter is not None:
+                rate_limiter.throttled(retry_after_seconds(e.response.headers))
+            transient = throttled or isinstance(e, (requests.Timeout, requests.ConnectionError))
+            if transient and attempt < retries:
+                continue
+            raise RuntimeError(
+                f"Last.fm artist.getSimilar request failed for {artist_name}: "
+                f"{e.__class__.__name__}"
+            ) from None
+
+        if payload.get("error") != LASTFM_RATE_LIMIT_ERROR:
+            if rate_limiter is not None:
+                rate_limiter.succeeded()
+            break
+        if rate_limiter is not None:
+            rate_limiter.throttled()
+        if attempt == retries:
+            break
 
     error = payload.get("error")
     if error:
@@ -143,3 +201,83 @@ def discover_similar_spotify_artist(
         logger.debug(f"Could not resolve Last.fm artist to Spotify: {candidate_name}")
 
     return None
+
+
+def merge_similar_artists(
+    results: Iterable[tuple[str, list[dict[str, Any]]]],
+    saved_artist_names: set[str],
+) -> list[dict[str, Any]]:
+    """Merge per-seed Last.fm results into one deduplicated candidate list.
+
+    Candidates are keyed by normalized name and keep their best match score
+    and the seed it came from; every seed that suggested one is listed in
+    `lastfm_seeds`. Saved artists are dropped and the best matches come first.
+    """
+    merged: dict[str, dict[str, Any]] = {}
+    for seed_artist_name, candidates in results:
+        for candidate in filter_saved_artist_matches(candidates, saved_artist_names):
+            key = normalize_artist_name(candidate.get("name", ""))
+            if not key:
+                continue
+            try:
+                match = float(candidate.get("match", 0))
+            except (TypeError, ValueError):
+                match = 0.0
+
+            current = merged.get(key)
+            if current is None:
+                merged[key] = {
+                    "name": candidate["name"],
+                    "match": match,
+                    "lastfm_seed_artist": seed_artist_name,
+                    "lastfm_seeds": [seed_artist_name],
+                }
+                continue
+            current["lastfm_seeds"].append(seed_artist_name)
+            if match > current["match"]:
+                current["match"] = match
+                current["lastfm_seed_artist"] = seed_artist_name
+
+    return sorted(merged.values(), key=lambda candidate: candidate["match"], reverse=True)
+
+
+def expand_similar_artists(
+    seed_artist_names: Iterable[str],
+    api_key: str,
+    saved_artist_names: set[str],
+    logger: Any,
+    catalog: Any = None,
+    max_workers: int = LASTFM_MAX_WORKERS,
+    rate_limiter: Any = None,
+) -> list[dict[str, Any]]:
+    """Fetch similar artists for many seeds in one bounded, rate-limited burst.
+
+    With an ArtistCatalog, seeds fetched recently are served from its cache
+    without using up the rate limit. A failing seed is logged and skipped
+    instead of failing the whole expansion.
+    """
+    if rate_limiter is None:
+        rate_limiter = scheduler.limiter(LASTFM)
+    seeds = list(dict.fromkeys(seed_artist_names))
+
+    def fetch_seed(seed_artist_name: str) -> tuple[str, list[dict[str, Any]]]:
+        try:
+            if catalog is not None:
+                candidates = catalog.similar_artists(
+                    seed_artist_name, api_key, rate_limiter=rate_limiter
+                )
+            else:
+                candidates = fetch_similar_artists(
+                    seed_artist_name, api_key, rate_limiter=rate_limiter
+                )
+            return seed_artist_name, candidates
+        except Exception as e:
+            logger.warning(f"Last.fm expansion failed for {seed_artist_name}: {e}")
+            return seed_artist_name, []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(seeds)) or 1) as executor:
+        results = list(executor.map(fetch_seed, seeds))
+
+    candidates = merge_similar_artists(results, saved_artist_names)
+    logger.debug(f"Expanded {len(seeds)} seeds into {len(candidates)} similar artists")
+    return candidates
@@ -0,0 +1,88 @@
+import argparse
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Sequence
+
+from loguru import logger
+
+
+LOG_DIR = Path("logs")
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}"
+# Sampled messages are logged the first time and then once per this many calls
+SAMPLE_EVERY = 50
+# Items shown when a long list is logged
+PREVIEW_ITEMS = 5
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Write the log file as JSON lines (logs/<script>.jsonl) for querying",
+    )
+
+
+def configure_logging(
+    name: str,
+    console_level: str = "INFO",
+    file_level: str = "DEBUG",
+    json_logs: bool = False,
+    log_dir: Path = LOG_DIR,
+) -> None:
+    """Set up the process's log sinks; scripts call this once, at startup.
+
+    The file sink is queued: records are handed to a background thread, so a
+    burst of debug logging never waits on disk. The console sink stays
+    synchronous so its lines keep their order with the scripts' printed
+    reports. Queued records are flushed when the process exits.
+    """
+    logger.remove()
+    if json_logs:
+        logger.add(log_dir / f"{name}.jsonl", level=file_level, serialize=True, enqueue=True)
+    else:
+        logger.add(log_dir / f"{name}.log", format=LOG_FORMAT, level=file_level, enqueue=True)
+    logger.add(sys.stdout, format=LOG_FORMAT, level=console_level, colorize=False)
+
+
+class SampledLogger:
+    """Logs only a sample of repeated messages from hot loops.
+
+    Messages are grouped by `key`: the first of each group is logged, then
+    one in every `every`, tagged with how many the group has seen so far.
+    Skipped messages are never formatted when passed loguru-style as a
+    template plus arguments.
+    """
+
+    def __init__(self, every: int = SAMPLE_EVERY):
+        self.every = every
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def debug(self, key: str, message: str, *args: Any, **kwargs: Any) -> None:
+        self._log("DEBUG", key, message, *args, **kwargs)
+
+    def log(self, level: str, key: str, message: str, *args: Any, **kwargs: Any) -> None:
+        self._log(level, key, message, *args, **kwargs)
+
+    def _log(self, level: str, key: str, message: str, *args: Any, **kwargs: Any) -> None:
+        with self._lock:
+            count = self._counts[key] = self._counts.get(key, 0) + 1
+        if (count - 1) % self.every:
+            return
+        if count > 1:
+            message = f"{message} [{key}: {count} so far]"
+        # Attribute the record to the caller, not to this class
+        logger.opt(depth=2).log(level, message, *args, **kwargs)
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def preview(items: Sequence[Any], limit: int = PREVIEW_ITEMS) -> str:
+    """Short rendering of a long list for log lines: the first items and a count."""
+    if len(items) <= limit:
+        return str(list(items))
+    shown = ", ".join(str(item) for item in items[:limit])
+    return f"[{shown}, ... {len(items) - limit} more]"
@@ -1,22 +1,42 @@
 # %%
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+import argparse
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+import itertools
+import math
 import os
 import random
+import time
 from collections import defaultdict
-from functools import lru_cache
 from pathlib import Path
 import yaml
-from generative_discovery import discover_similar_spotify_artist
+from artist_catalog import ArtistCatalog
+from followed_artists import get_followed_artists, load_followed_artists
+from generative_discovery import expand_similar_artists, lastfm_circuit, weighted_choice
+from logging_setup import SampledLogger, add_logging_arguments, configure_logging
 from loguru import logger
-from saved_tracks_cache import get_saved_track_keys
+from mixed_tracks_filter import (
+    MIXED_TRACKS_LOOKBACK_WEEKS,
+    MixedTracksFilter,
+    record_mixed_tracks,
+)
+from profiles import (
+    PROFILES_PATH,
+    Profile,
+    authorize_spotify_client,
+    build_spotify_client,
+    resolve_profile,
+)
+from profiling import add_profiling_arguments, profiling_session, span
+from request_scheduler import CRITICAL, LASTFM, scheduler
+from run_budget import RunBudget
+from saved_tracks_cache import build_track_keys, get_saved_track_keys, load_cached_saved_tracks
+from similarity_scoring import SimilarityMatrix, library_seed_weights
 from weekly_mix_description import (
     build_playlist_description,
     format_generative_attribution,
 )
 from weekly_mix_state import (
-    STATE_PATH,
     build_weekly_mix_identity,
     find_current_week_playlist,
     load_weekly_mix_runs,
@@ -56,135 +76,21 @@ def find_artist_ids(track, return_artists=False):
 
 
 # %%
-logger.remove()
-logger.add(
-    "logs/weekly-mix.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="DEBUG",
-)
-logger.add(
-    lambda msg: print(msg, end=""),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="INFO",
-)
+CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+MAX_ATTEMPTS = 200  # Prevent infinite loops
+# Saved artists expanded through Last.fm together for the generative pool
+GENERATIVE_SEED_COUNT = 8
+# Best-scoring candidates kept for sampling
+GENERATIVE_POOL_SIZE = 50
 
-load_dotenv()
 
-config_path = Path(__file__).parent.parent / "config.yaml"
-with open(config_path) as f:
-    config = yaml.safe_load(f)
+def load_config(config_path=CONFIG_PATH):
+    with open(config_path) as f:
+        return yaml.safe_load(f)
 
-client_id = os.getenv("SPOTIPY_CLIENT_ID")
-client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
-redirect_uri = os.getenv("SPOTIPY_REDIRECT_URI")
-lastfm_api_key = os.getenv("LASTFM_API_KEY")
-scope = (
-    "playlist-modify-public,playlist-modify-private,playlist-read-private,"
-    "user-library-read,user-follow-read"
-)
-
-# %%
-sp = spotipy.Spotify(
-    auth_manager=SpotifyOAuth(
-        client_id=client_id,
-        client_secret=client_secret,
-        redirect_uri=redirect_uri,
-        scope=scope,
-    )
-)
 
-# %%
-user_id = sp.current_user()["id"]
-weekly_mix_identity = build_weekly_mix_identity()
-weekly_mix_state = load_weekly_mix_runs()
-existing_weekly_mix = find_current_week_playlist(
-    sp=sp,
-    user_id=user_id,
-    identity=weekly_mix_identity,
-    state=weekly_mix_state,
-)
-
-if existing_weekly_mix:
-    playlist_id = existing_weekly_mix.get("playlist_id") or existing_weekly_mix["id"]
-    logger.info(
-        f"Weekly mix already exists for {weekly_mix_identity.key}: {playlist_id}"
-    )
-    if "playlist_id" not in existing_weekly_mix:
-        record_weekly_mix_run(
-            state_path=STATE_PATH,
-            identity=weekly_mix_identity,
-            playlist_id=playlist_id,
-            playlist_url=existing_weekly_mix.get("external_urls", {}).get("spotify"),
-        )
-    raise SystemExit(0)
-
-# %%
-# Get all saved/followed artists
-logger.info("Fetching saved artists...")
-saved_artists = []
-results = sp.current_user_followed_artists(limit=50)
-
-while results:
-    for artist in results["artists"]["items"]:
-        saved_artists.append(artist)
-        logger.debug(f"Found artist: {artist['name']}")
-
-    if results["artists"]["next"]:
-        results = sp.next(results["artists"])
-    else:
-        break
-
-logger.info(f"Total saved artists found: {len(saved_artists)}")
-saved_artist_names = {artist["name"] for artist in saved_artists}
-
-# %%
-# Get all saved tracks to check for duplicates by name+artist
-logger.info("Fetching saved tracks to avoid duplicates...")
-saved_tracks_set = get_saved_track_keys(sp)
-
-
-# %%
-@lru_cache(maxsize=128)
-def get_artist_albums(artist_id, limit=50):
-    """Get all albums for a specific artist"""
-    try:
-        all_albums = []
-        results = sp.artist_albums(artist_id, album_type="album,single", limit=limit)
-
-        while results:
-            for album in results["items"]:
-                # Check if the requested artist is actually in this album
-                album_artist_ids = [artist["id"] for artist in album["artists"]]
-                if artist_id in album_artist_ids:
-                    all_albums.append(album)
-                else:
-                    # If we find an album that doesn't belong to this artist, stop here
-                    logger.debug(
-                        f"Found album not belonging to artist {artist_id}, stopping pagination"
-                    )
-                    return tuple(all_albums)
-
-            if results["next"]:
-                results = sp.next(results)
-            else:
-                break
-
-        return tuple(all_albums)  # Return tuple for hashability
-    except Exception as e:
-        logger.error(f"Error fetching albums for artist {artist_id}: {e}")
-        return tuple()
-
-
-# %%
-@lru_cache(maxsize=256)
-def get_album_tracks(album_id):
-    """Get tracks from a specific album"""
-    try:
-        tracks = sp.album_tracks(album_id)
-        return tuple(tracks["items"])  # Return tuple for hashability
-    except Exception as e:
-        logger.error(f"Error fetching tracks for album {album_id}: {e}")
-        return tuple()
+def mixed_tracks_lookback_weeks(config):
+    return config.get("mixed_tracks_lookback_weeks", MIXED_TRACKS_LOOKBACK_WEEKS)
 
 
 # %%
@@ -195,262 +101,687 @@ def pick_random_artist(saved_artists):
 
 
 # %%
-def pick_random_track_from_artist(artist_id):
+def pick_random_track_from_artist(sp, catalog, artist_id):
     """Pick a random track from a random album of the given artist"""
-    albums = get_artist_albums(artist_id)
+    albums = catalog.artist_albums(sp, artist_id)
     if not albums:
         return None
 
     # Pick a random album
     rand_album = random.choice(albums)
-    tracks = get_album_tracks(rand_album["id"])
+    tracks = catalog.album_tracks(sp, rand_album["id"])
 
     if not tracks:
         return None
 
-    # Pick a random track from the album
-    rand_track = random.choice(tracks)
+    # Pick a random track from the album, copied since catalog entries are shared
+    rand_track = dict(random.choice(tracks))
     return rand_track
 
 
+def pick_cached_track_from_artist(catalog, artist_id):
+    """Pick a random track from the artist's albums already in the catalog"""
+    album_tracks = catalog.cached_album_tracks(artist_id)
+    if not album_tracks:
+        return None
+    return dict(random.choice(random.choice(album_tracks)))
+
+
 # %%
-def get_generative_track(sp, saved_artists, saved_artist_names, lastfm_api_key, logger):
-    """Get a random track from a Last.fm similar artist."""
+def build_generative_pool(
+    catalog, saved_artists, saved_artist_names, saved_tracks_set, lastfm_api_key
+):
+    """Rank Last.fm candidates by affinity to the whole library, once per run.
+
+    A random sample of saved artists is expanded through Last.fm (filling the
+    catalog); then every saved artist with cached neighbours contributes to a
+    sparse similarity matrix, weighted by how many saved tracks it has.
+    """
     if not lastfm_api_key:
         logger.warning("LASTFM_API_KEY is not set; skipping generative discovery")
-        return None
+        return []
     if not saved_artists:
         logger.error("No saved artists to use for generative discovery")
+        return []
+
+    # An offline catalog can only serve what is cached, which the matrix reads anyway
+    if not catalog.offline:
+        seeds = random.sample(saved_artists, min(GENERATIVE_SEED_COUNT, len(saved_artists)))
+        logger.debug(f"Using {[seed['name'] for seed in seeds]} as Last.fm generative seeds")
+        expand_similar_artists(
+            [seed["name"] for seed in seeds],
+            lastfm_api_key,
+            saved_artist_names,
+            logger=logger,
+            catalog=catalog,
+            rate_limiter=scheduler.limiter(LASTFM, CRITICAL),
+        )
+        if lastfm_circuit.state != "closed":
+            logger.warning("Last.fm is failing; the generative pool uses cached neighbours only")
+
+    matrix = SimilarityMatrix()
+    for artist in saved_artists:
+        similar = catalog.cached_similar_artists(artist["name"])
+        if similar:
+            matrix.add_seed(artist["name"], similar)
+    ranked = matrix.rank(
+        saved_artist_names,
+        library_seed_weights(matrix.seeds, saved_tracks_set),
+        k=GENERATIVE_POOL_SIZE,
+    )
+    logger.info(
+        f"Generative pool has {len(ranked)} similar artists from {len(matrix.seeds)} seeds"
+    )
+    return [
+        {
+            "name": candidate.name,
+            "match": candidate.score,
+            "lastfm_seed_artist": candidate.best_seed,
+            "lastfm_match": candidate.best_match,
+        }
+        for candidate in ranked
+    ]
+
+
+def get_generative_track(sp, catalog, candidate_pool, logger):
+    """Get a random track from a Last.fm similar artist drawn from the pool."""
+    candidate = weighted_choice(candidate_pool)
+    if not candidate:
         return None
+    # Each candidate is tried once per run
+    candidate_pool.remove(candidate)
 
-    seed_artist = pick_random_artist(saved_artists)
-    logger.debug(f"Using {seed_artist['name']} as Last.fm generative seed")
     try:
-        similar_artist = discover_similar_spotify_artist(
-            sp=sp,
-            seed_artist_name=seed_artist["name"],
-            saved_artist_names=saved_artist_names,
-            lastfm_api_key=lastfm_api_key,
-            logger=logger,
-        )
+        similar_artist = catalog.resolve_artist(sp, candidate["name"])
     except Exception as e:
-        logger.warning(f"Generative discovery failed for {seed_artist['name']}: {e}")
+        logger.warning(f"Could not resolve {candidate['name']} on Spotify: {e}")
         return None
-
     if not similar_artist:
+        logger.debug(f"Could not resolve Last.fm artist to Spotify: {candidate['name']}")
         return None
 
-    track = pick_random_track_from_artist(similar_artist["id"])
+    seed_artist_name = candidate["lastfm_seed_artist"]
+    similar_artist["lastfm_seed_artist"] = seed_artist_name
+    similar_artist["lastfm_match"] = candidate["lastfm_match"]
+
+    track = pick_random_track_from_artist(sp, catalog, similar_artist["id"])
     if not track:
         logger.debug(f"No tracks found for generative artist {similar_artist['name']}")
         return None
 
     track["generative_artist"] = similar_artist
-    track["discovery_reason"] = f"Last.fm similar to {seed_artist['name']}"
+    track["discovery_reason"] = f"Last.fm similar to {seed_artist_name}"
     return track
 
 
-def pick_candidate_track():
-    """Pick either a Last.fm generative track or a normal saved-artist track."""
-    if should_try_generative(
-        generative_runtime_ms,
-        generative_runtime_target_ms,
-        generative_failed_attempts,
-        failed_runtime_attempts,
+# %%
+@dataclass
+class MixSelection:
+    track_ids: list[str] = field(default_factory=list)
+    track_labels: list[str] = field(default_factory=list)
+    total_runtime: int = 0
+    artist_counts: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    generative_artists: list[dict] = field(default_factory=list)
+    attempts: int = 0
+    runtime_limit_hits: int = 0
+    generative_runtime_target_ms: int = 0
+    generative_runtime_ms: int = 0
+    generative_tracks_added: int = 0
+    ended_early_reason: str = ""
+
+
+def select_tracks(
+    sp,
+    catalog,
+    config,
+    saved_artists,
+    saved_artist_names,
+    saved_tracks_set,
+    lastfm_api_key,
+    budget=None,
+    mixed_tracks=(),
+    generative_pool=None,
+):
+    """Run the weekly mix selection loop and return the chosen tracks.
+
+    Tracks in `mixed_tracks` (served by recent weekly mixes) are skipped. A
+    prebuilt `generative_pool` is drawn from (a copy of) instead of building one.
+
+    As the run budget runs low, generative discovery is skipped, then only
+    artists with cached catalog entries are sampled, then selection stops.
+    """
+    if budget is None:
+        budget = RunBudget()
+    max_tracks = config["max_tracks"]
+    max_runtime = config["max_runtime"]
+    max_artist = config["max_artist"]
+    failed_runtime_attempts = config["failed_runtime_attempts"]
+    generative_percentage_mean = config["generative_percentage_mean"]
+    generative_percentage_std = config["generative_percentage_std"]
+    generative_runtime_overrun_percentage = config.get(
+        "generative_runtime_overrun_percentage",
+        10,
+    )
+
+    max_runtime_ms = max_runtime * 60 * 1000
+    selection = MixSelection()
+    generative_artist_ids: set[str] = set()
+
+    generative_percentage = max(
+        0,
+        min(100, random.gauss(generative_percentage_mean, generative_percentage_std)),
+    )
+    generative_runtime_target_ms = int(max_runtime_ms * generative_percentage / 100)
+    generative_runtime_cap_ms = int(
+        generative_runtime_target_ms * (1 + generative_runtime_overrun_percentage / 100)
+    )
+    generative_failed_attempts = 0
+    # Rejections repeat every attempt, so only a sample of them is logged
+    rejections = SampledLogger()
+    cached_artists = None
+    if generative_pool is not None:
+        # Candidates are removed as they are tried
+        generative_pool = list(generative_pool)
+
+    logger.info(
+        f"Creating weekly mix with max {max_tracks} tracks, "
+        f"{max_runtime} minutes runtime, max {max_artist} tracks per artist, "
+        f"{generative_percentage:.1f}% generative runtime target"
+    )
+    if generative_runtime_target_ms and not lastfm_api_key:
+        logger.warning("LASTFM_API_KEY is not set; generative discovery is disabled")
+        generative_runtime_target_ms = 0
+        generative_runtime_cap_ms = 0
+    selection.generative_runtime_target_ms = generative_runtime_target_ms
+
+    def pick_candidate_track():
+        """Pick either a Last.fm generative track or a normal saved-artist track."""
+        nonlocal cached_artists, generative_pool
+        if budget.cached_only():
+            if cached_artists is None:
+                cached_artists = [
+                    artist
+                    for artist in saved_artists
+                    if catalog.cached_album_tracks(artist["id"])
+                ]
+                logger.info(f"{len(cached_artists)} saved artists have cached tracks")
+            if not cached_artists:
+                return None, None, False
+            artist = pick_random_artist(cached_artists)
+            return pick_cached_track_from_artist(catalog, artist["id"]), artist, False
+
+        if budget.allows_generative() and should_try_generative(
+            selection.generative_runtime_ms,
+            generative_runtime_target_ms,
+            generative_failed_attempts,
+            failed_runtime_attempts,
+        ):
+            if generative_pool is None:
+                generative_pool = build_generative_pool(
+                    catalog,
+                    saved_artists,
+                    saved_artist_names,
+                    saved_tracks_set,
+                    lastfm_api_key,
+                )
+            track = get_generative_track(sp, catalog, generative_pool, logger)
+            if track:
+                artist = track["generative_artist"]
+                return track, artist, True
+
+        artist = pick_random_artist(saved_artists)
+        track = pick_random_track_from_artist(sp, catalog, artist["id"])
+        return track, artist, False
+
+    while (
+        selection.total_runtime <= max_runtime_ms
+        and len(selection.track_ids) < max_tracks
+        and selection.attempts < MAX_ATTEMPTS
     ):
-        track = get_generative_track(
-            sp,
-            saved_artists,
-            saved_artist_names,
-            lastfm_api_key,
-            logger,
-        )
-        if track:
-            artist = track["generative_artist"]
-            return track, artist, True
+        if budget.should_stop():
+            selection.ended_early_reason = "Ended early because the run budget is nearly spent."
+            logger.info(selection.ended_early_reason)
+            break
+        selection.attempts += 1
 
-    artist = pick_random_artist(saved_artists)
-    track = pick_random_track_from_artist(artist["id"])
-    return track, artist, False
+        rand_track, artist, is_generative = pick_candidate_track()
+        if artist is None:
+            selection.ended_early_reason = (
+                "Ended early because no cached candidates were left within the run budget."
+            )
+            logger.info(selection.ended_early_reason)
+            break
+        artist_name = artist["name"]
+
+        if not rand_track:
+            logger.warning(f"No tracks found for {artist_name}")
+            continue
+
+        rand_track_id = rand_track["id"]
+        rand_track_ms = rand_track["duration_ms"]
+        track_name = rand_track["name"]
+        label = (track_name, artist_name)
+
+        # The smaller cached pool repeats tracks, so skip ones already picked
+        if rand_track_id in selection.track_ids:
+            rejections.debug("duplicate", "{} by {} is already in the playlist", *label)
+            continue
+
+        if rand_track_id in mixed_tracks:
+            rejections.debug("recently mixed", "{} by {} was in a recent weekly mix", *label)
+            continue
+
+        # Check if track (or a version of it) is already saved
+        track_key = (track_name.lower().strip(), artist_name.lower().strip())
+        if track_key in saved_tracks_set:
+            rejections.debug("saved", "{} by {} is already saved (or a version of it)", *label)
+            continue
+
+        # Check artist count limit
+        if selection.artist_counts[artist_name] >= max_artist:
+            rejections.debug(
+                "artist limit", "{} by {} - too many tracks by this artist already", *label
+            )
+            continue
+
+        # Check if adding this track would exceed runtime
+        if selection.total_runtime + rand_track_ms > max_runtime_ms:
+            selection.runtime_limit_hits += 1
+            rejections.debug("runtime", "{} by {} would make playlist too long", *label)
+            if selection.runtime_limit_hits >= failed_runtime_attempts:
+                selection.ended_early_reason = (
+                    "Ended early because too many tracks hit runtime limit, "
+                    "likely near max time."
+                )
+                logger.info(selection.ended_early_reason)
+                break
+            continue
+
+        if (
+            is_generative
+            and selection.generative_runtime_ms + rand_track_ms > generative_runtime_cap_ms
+        ):
+            generative_failed_attempts += 1
+            rejections.debug(
+                "generative cap", "{} by {} would exceed generative runtime cap", *label
+            )
+            if generative_failed_attempts >= failed_runtime_attempts:
+                logger.info(
+                    "Generative discovery hit failed attempt limit; "
+                    "using saved-artist tracks for the rest of this run"
+                )
+            continue
+
+        selection.track_ids.append(rand_track_id)
+        selection.track_labels.append(f"{track_name} by {artist_name}")
+        selection.total_runtime += rand_track_ms
+        selection.artist_counts[artist_name] += 1
+        if is_generative:
+            generative_attribution = format_generative_attribution(
+                rand_track["generative_artist"]
+            )
+            logger.info(
+                f"✓ {track_name} by {artist_name} made it to the playlist! "
+                f"Generative artist: {generative_attribution}"
+            )
+            selection.generative_tracks_added += 1
+            selection.generative_runtime_ms += rand_track_ms
+            generative_artist = rand_track["generative_artist"]
+            if generative_artist["id"] not in generative_artist_ids:
+                selection.generative_artists.append(generative_artist)
+                generative_artist_ids.add(generative_artist["id"])
+        else:
+            logger.info(f"✓ {track_name} by {artist_name} made it to the playlist!")
+
+    logger.debug(f"Rejected candidates: {rejections.counts()}")
+    return selection
+
+
+def log_selection_summary(selection):
+    logger.info(f"\nPlaylist created with {len(selection.track_ids)} tracks")
+    logger.info(f"Total runtime: {selection.total_runtime / 1000 / 60:.1f} minutes")
+    logger.info(f"Attempts made: {selection.attempts}")
+    logger.info(f"Runtime limit hits: {selection.runtime_limit_hits}")
+    logger.info(f"Generative tracks added: {selection.generative_tracks_added}")
+    logger.info(
+        f"Generative runtime: {selection.generative_runtime_ms / 1000 / 60:.1f}/"
+        f"{selection.generative_runtime_target_ms / 1000 / 60:.1f} minutes"
+    )
+    if selection.ended_early_reason:
+        logger.info(selection.ended_early_reason)
 
 
-# %%
-# LOAD CONFIGURATION FROM config.yaml
-max_tracks = config["max_tracks"]
-max_runtime = config["max_runtime"]
-max_artist = config["max_artist"]
-failed_runtime_attempts = config["failed_runtime_attempts"]
-generative_percentage_mean = config["generative_percentage_mean"]
-generative_percentage_std = config["generative_percentage_std"]
-generative_runtime_overrun_percentage = config.get(
-    "generative_runtime_overrun_percentage",
-    10,
-)
+def log_artist_distribution(artist_counts, max_artist):
+    """Display final artist distribution"""
+    logger.info("\nArtist distribution in the playlist:")
 
-max_runtime_ms = max_runtime * 60 * 1000
-total_runtime = 0
-runtime_limit_hits = 0
-new_playlist_ids: list[str] = []
-artist_counts: dict[str, int] = defaultdict(int)
-generative_artists: list[dict] = []
-generative_artist_ids: set[str] = set()
-attempts = 0
-max_attempts = 200  # Prevent infinite loops
-ended_early_reason = ""
-
-generative_percentage = max(
-    0,
-    min(100, random.gauss(generative_percentage_mean, generative_percentage_std)),
-)
-generative_runtime_target_ms = int(max_runtime_ms * generative_percentage / 100)
-generative_runtime_cap_ms = int(
-    generative_runtime_target_ms * (1 + generative_runtime_overrun_percentage / 100)
-)
-generative_runtime_ms = 0
-generative_tracks_added = 0
-generative_failed_attempts = 0
-
-logger.info(
-    f"Creating weekly mix with max {max_tracks} tracks, "
-    f"{max_runtime} minutes runtime, max {max_artist} tracks per artist, "
-    f"{generative_percentage:.1f}% generative runtime target"
-)
-if generative_runtime_target_ms and not lastfm_api_key:
-    logger.warning("LASTFM_API_KEY is not set; generative discovery is disabled")
-    generative_runtime_target_ms = 0
-    generative_runtime_cap_ms = 0
-
-while (
-    total_runtime <= max_runtime_ms
-    and len(new_playlist_ids) < max_tracks
-    and attempts < max_attempts
-):
-    attempts += 1
+    # Group artists by track count
+    tracks_to_artists = defaultdict(list)
+    for artist, count in artist_counts.items():
+        if count > 0:
+            tracks_to_artists[count].append(artist)
 
-    rand_track, artist, is_generative = pick_candidate_track()
-    artist_name = artist["name"]
+    # Display grouped by count, only showing groups that exist and are <= max_artist
+    for track_count in sorted(tracks_to_artists.keys()):
+        if track_count <= max_artist:
+            artists = sorted(tracks_to_artists[track_count])
+            plural = "track" if track_count == 1 else "tracks"
+            logger.info(f"Artists with {track_count} {plural}:")
+            for artist in artists:
+                logger.info(f"  - {artist}")
 
-    if not rand_track:
-        logger.warning(f"No tracks found for {artist_name}")
-        continue
 
-    rand_track_id = rand_track["id"]
-    rand_track_ms = rand_track["duration_ms"]
-    track_name = rand_track["name"]
+# %%
+def run_weekly_mix(sp, profile: Profile, config, catalog, lastfm_api_key, inputs=None):
+    """Create this week's mix for one profile, returning the playlist ID
+
+    With `inputs` already in memory (as the mix service keeps them), the
+    followed artists, saved tracks and past mixes are not reloaded.
+    """
+    budget = RunBudget.from_config(config)
+    try:
+        return _run_weekly_mix(sp, profile, config, catalog, lastfm_api_key, budget, inputs)
+    finally:
+        budget.log_summary()
 
-    # Check if track (or a version of it) is already saved
-    track_key = (track_name.lower().strip(), artist_name.lower().strip())
-    if track_key in saved_tracks_set:
-        logger.debug(
-            f"{track_name} by {artist_name} is already saved (or a version of it)"
-        )
-        continue
 
-    # Check artist count limit
-    if artist_counts[artist_name] >= max_artist:
-        logger.debug(
-            f"{track_name} by {artist_name} - too many tracks by this artist already"
+def _run_weekly_mix(sp, profile, config, catalog, lastfm_api_key, budget, inputs=None):
+    with budget.phase("existing playlist"):
+        user_id = sp.current_user()["id"]
+        weekly_mix_identity = build_weekly_mix_identity()
+        weekly_mix_state = load_weekly_mix_runs(profile.weekly_mix_state_path)
+        existing_weekly_mix = find_current_week_playlist(
+            sp=sp,
+            user_id=user_id,
+            identity=weekly_mix_identity,
+            state=weekly_mix_state,
         )
-        continue
-
-    # Check if adding this track would exceed runtime
-    if total_runtime + rand_track_ms > max_runtime_ms:
-        runtime_limit_hits += 1
-        logger.debug(f"{track_name} by {artist_name} would make playlist too long")
-        if runtime_limit_hits >= failed_runtime_attempts:
-            ended_early_reason = (
-                "Ended early because too many tracks hit runtime limit, "
-                "likely near max time."
-            )
-            logger.info(ended_early_reason)
-            break
-        continue
 
-    if is_generative and generative_runtime_ms + rand_track_ms > generative_runtime_cap_ms:
-        generative_failed_attempts += 1
-        logger.debug(
-            f"{track_name} by {artist_name} would exceed generative runtime cap"
+    if existing_weekly_mix:
+        playlist_id = existing_weekly_mix.get("playlist_id") or existing_weekly_mix["id"]
+        logger.info(
+            f"Weekly mix already exists for {weekly_mix_identity.key}: {playlist_id}"
         )
-        if generative_failed_attempts >= failed_runtime_attempts:
-            logger.info(
-                "Generative discovery hit failed attempt limit; "
-                "using saved-artist tracks for the rest of this run"
+        if "playlist_id" not in existing_weekly_mix:
+            record_weekly_mix_run(
+                state_path=profile.weekly_mix_state_path,
+                identity=weekly_mix_identity,
+                playlist_id=playlist_id,
+                playlist_url=existing_weekly_mix.get("external_urls", {}).get("spotify"),
+            )
+        return playlist_id
+
+    lookback_weeks = mixed_tracks_lookback_weeks(config)
+    if inputs is None:
+        with budget.phase("followed artists"):
+            saved_artists = get_followed_artists(sp, profile.followed_artists_path)
+
+        # Get all saved tracks to check for duplicates by name+artist
+        logger.info("Fetching saved tracks to avoid duplicates...")
+        with budget.phase("saved tracks"):
+            # Day-old data is fine for duplicate checks, so don't block on a refetch
+            saved_tracks_set = get_saved_track_keys(
+                sp, cache_file=profile.saved_tracks_path, allow_stale=True
             )
-        continue
-
-    new_playlist_ids.append(rand_track_id)
-    total_runtime += rand_track_ms
-    artist_counts[artist_name] += 1
-    if is_generative:
-        generative_attribution = format_generative_attribution(
-            rand_track["generative_artist"]
+            mixed_tracks = MixedTracksFilter.load(
+                profile.mixed_tracks_path, weekly_mix_identity.key, lookback_weeks
+            )
+        inputs = PlanInputs(
+            saved_artists=saved_artists,
+            saved_artist_names={artist["name"] for artist in saved_artists},
+            saved_tracks_set=saved_tracks_set,
+            mixed_tracks=mixed_tracks,
         )
-        logger.info(
-            f"✓ {track_name} by {artist_name} made it to the playlist! "
-            f"Generative artist: {generative_attribution}"
+    logger.info(
+        f"Excluding {len(inputs.mixed_tracks)} tracks from the last {lookback_weeks} weeks"
+    )
+
+    with budget.phase("selection"):
+        selection = select_tracks(
+            sp,
+            catalog,
+            config,
+            inputs.saved_artists,
+            inputs.saved_artist_names,
+            inputs.saved_tracks_set,
+            lastfm_api_key,
+            budget,
+            inputs.mixed_tracks,
         )
-        generative_tracks_added += 1
-        generative_runtime_ms += rand_track_ms
-        generative_artist = rand_track["generative_artist"]
-        if generative_artist["id"] not in generative_artist_ids:
-            generative_artists.append(generative_artist)
-            generative_artist_ids.add(generative_artist["id"])
+    log_selection_summary(selection)
+
+    playlist_id = None
+    if selection.track_ids:
+        with budget.phase("publish"):
+            playlist_name = weekly_mix_identity.playlist_name
+
+            logger.info(f"Creating playlist: {playlist_name}")
+            new_playlist = sp.user_playlist_create(
+                user_id,
+                playlist_name,
+                public=False,
+                description=build_playlist_description(selection.generative_artists),
+            )
+            sp.playlist_add_items(new_playlist["id"], selection.track_ids)
+            record_weekly_mix_run(
+                state_path=profile.weekly_mix_state_path,
+                identity=weekly_mix_identity,
+                playlist_id=new_playlist["id"],
+                playlist_url=new_playlist["external_urls"]["spotify"],
+            )
+            record_mixed_tracks(
+                profile.mixed_tracks_path,
+                weekly_mix_identity.key,
+                selection.track_ids,
+                keep_weeks=lookback_weeks,
+            )
+            playlist_id = new_playlist["id"]
+
+            logger.info(f"Playlist '{playlist_name}' created successfully!")
+            logger.info(f"Playlist URL: {new_playlist['external_urls']['spotify']}")
     else:
-        logger.info(f"✓ {track_name} by {artist_name} made it to the playlist!")
-
-logger.info(f"\nPlaylist created with {len(new_playlist_ids)} tracks")
-logger.info(f"Total runtime: {total_runtime / 1000 / 60:.1f} minutes")
-logger.info(f"Attempts made: {attempts}")
-logger.info(f"Runtime limit hits: {runtime_limit_hits}")
-logger.info(f"Generative tracks added: {generative_tracks_added}")
-logger.info(
-    f"Generative runtime: {generative_runtime_ms / 1000 / 60:.1f}/"
-    f"{generative_runtime_target_ms / 1000 / 60:.1f} minutes"
-)
-if ended_early_reason:
-    logger.info(ended_early_reason)
+        logger.warning("No tracks were added to the playlist.")
+
+    log_artist_distribution(selection.artist_counts, config["max_artist"])
+    return playlist_id
+
 
 # %%
-if new_playlist_ids:
-    playlist_name = weekly_mix_identity.playlist_name
-
-    logger.info(f"Creating playlist: {playlist_name}")
-    new_playlist = sp.user_playlist_create(
-        user_id,
-        playlist_name,
-        public=False,
-        description=build_playlist_description(generative_artists),
+@dataclass
+class PlanInputs:
+    """Library data the selection runs against, read once up front."""
+
+    saved_artists: list[dict]
+    saved_artist_names: set[str]
+    saved_tracks_set: set[tuple[str, str]]
+    mixed_tracks: MixedTracksFilter = field(default_factory=MixedTracksFilter)
+    # Ranked Last.fm candidates, when already built from the same catalog
+    generative_pool: list[dict] | None = None
+
+
+def load_plan_inputs(profile: Profile, config):
+    """Read followed artists, saved tracks and past mixes from the local caches."""
+    saved_artists = load_followed_artists(profile.followed_artists_path, max_age_hours=math.inf)
+    if saved_artists is None:
+        raise ValueError(f"No cached followed artists at {profile.followed_artists_path}")
+    saved_tracks = load_cached_saved_tracks(profile.saved_tracks_path)
+    if saved_tracks is None:
+        raise ValueError(f"No cached saved tracks at {profile.saved_tracks_path}")
+
+    return PlanInputs(
+        saved_artists=saved_artists,
+        saved_artist_names={artist["name"] for artist in saved_artists},
+        saved_tracks_set=build_track_keys(saved_tracks),
+        mixed_tracks=MixedTracksFilter.load(
+            profile.mixed_tracks_path,
+            build_weekly_mix_identity().key,
+            mixed_tracks_lookback_weeks(config),
+        ),
     )
-    sp.playlist_add_items(new_playlist["id"], new_playlist_ids)
-    record_weekly_mix_run(
-        state_path=STATE_PATH,
-        identity=weekly_mix_identity,
-        playlist_id=new_playlist["id"],
-        playlist_url=new_playlist["external_urls"]["spotify"],
+
+
+def parse_config_overrides(assignments):
+    """Parse `key=value[,value...]` assignments into a list of values per key.
+
+    Values are read as YAML scalars, so numbers keep their type.
+    """
+    overrides = {}
+    for assignment in assignments:
+        key, separator, values = assignment.partition("=")
+        if not separator or not key or not values:
+            raise ValueError(f"Expected key=value[,value...], got {assignment!r}")
+        overrides[key.strip()] = [yaml.safe_load(value) for value in values.split(",")]
+    return overrides
+
+
+def config_grid(config, overrides):
+    """Every combination of the override values applied over `config`."""
+    keys = list(overrides)
+    return [
+        {**config, **dict(zip(keys, values))}
+        for values in itertools.product(*(overrides[key] for key in keys))
+    ]
+
+
+def plan_weekly_mix(catalog, config, inputs, lastfm_api_key, seed):
+    """Run the selection loop against an offline catalog with a fixed random seed.
+
+    Nothing is fetched or written, so the same seed and config always select
+    the same tracks from the same caches.
+    """
+    if not catalog.offline:
+        raise ValueError("Plan runs need an offline catalog")
+    random.seed(seed)
+    return select_tracks(
+        None,
+        catalog,
+        config,
+        inputs.saved_artists,
+        inputs.saved_artist_names,
+        inputs.saved_tracks_set,
+        lastfm_api_key,
+        mixed_tracks=inputs.mixed_tracks,
+        generative_pool=inputs.generative_pool,
     )
 
-    logger.info(f"Playlist '{playlist_name}' created successfully!")
-    logger.info(f"Playlist URL: {new_playlist['external_urls']['spotify']}")
-else:
-    logger.warning("No tracks were added to the playlist.")
 
-# %%
-# Display final artist distribution
-logger.info("\nArtist distribution in the playlist:")
-
-# Group artists by track count
-tracks_to_artists = defaultdict(list)
-for artist, count in artist_counts.items():
-    if count > 0:
-        tracks_to_artists[count].append(artist)
-
-# Display grouped by count, only showing groups that exist and are <= max_artist
-for track_count in sorted(tracks_to_artists.keys()):
-    if track_count <= max_artist:
-        artists = sorted(tracks_to_artists[track_count])
-        plural = "track" if track_count == 1 else "tracks"
-        logger.info(f"Artists with {track_count} {plural}:")
-        for artist in artists:
-            logger.info(f"  - {artist}")
+def summarize_selection(selection):
+    return {
+        "tracks": len(selection.track_ids),
+        "runtime_minutes": round(selection.total_runtime / 1000 / 60, 1),
+        "generative_tracks": selection.generative_tracks_added,
+        "generative_minutes": round(selection.generative_runtime_ms / 1000 / 60, 1),
+        "artists": sum(1 for count in selection.artist_counts.values() if count),
+        "attempts": selection.attempts,
+        "ended_early": bool(selection.ended_early_reason),
+    }
+
+
+def run_plan(catalog, config, inputs, lastfm_api_key, overrides, seeds):
+    """Print the would-be playlist, or one averaged row per config when sweeping."""
+    configs = config_grid(config, overrides)
+    if len(configs) == 1 and len(seeds) == 1:
+        started_at = time.perf_counter()
+        selection = plan_weekly_mix(catalog, configs[0], inputs, lastfm_api_key, seeds[0])
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+
+        print(f"\n--- Planned weekly mix (seed {seeds[0]}, {elapsed_ms:.1f} ms) ---")
+        for label in selection.track_labels:
+            print(f"  {label}")
+        if selection.ended_early_reason:
+            print(selection.ended_early_reason)
+        print(", ".join(f"{key}: {value}" for key, value in summarize_selection(selection).items()))
+        return
+
+    print(
+        f"\n--- {len(configs)} configs x {len(seeds)} seeds, averaged per config ---\n"
+        f"{'tracks':>7} {'minutes':>8} {'gen':>5} {'gen min':>8} {'artists':>8} "
+        f"{'early':>6} {'ms':>7}  overrides"
+    )
+    for run_config in configs:
+        started_at = time.perf_counter()
+        summaries = [
+            summarize_selection(
+                plan_weekly_mix(catalog, run_config, inputs, lastfm_api_key, seed)
+            )
+            for seed in seeds
+        ]
+        elapsed_ms = (time.perf_counter() - started_at) * 1000 / len(seeds)
+
+        def mean(key):
+            return sum(summary[key] for summary in summaries) / len(summaries)
+
+        changed = ", ".join(f"{key}={run_config[key]}" for key in overrides) or "config.yaml"
+        print(
+            f"{mean('tracks'):>7.1f} {mean('runtime_minutes'):>8.1f} "
+            f"{mean('generative_tracks'):>5.1f} {mean('generative_minutes'):>8.1f} "
+            f"{mean('artists'):>8.1f} {mean('ended_early'):>6.0%} {elapsed_ms:>7.1f}  {changed}"
+        )
+
 
 # %%
+def main():
+    parser = argparse.ArgumentParser(description="Create this week's Spotify mix")
+    parser.add_argument("--profile", help="Profile name from the profiles file")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_PATH)
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Select from the local caches only and print the would-be playlist; "
+        "nothing is fetched from or written to Spotify",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="First random seed for --plan (default: 0)"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=1, help="Consecutive seeds to average over in --plan"
+    )
+    parser.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE[,VALUE...]",
+        help="Override a config.yaml value in --plan; several values sweep them",
+    )
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    # Plans print their own report; the per-track log stays in the log file
+    configure_logging(
+        "weekly-mix", console_level="ERROR" if args.plan else "INFO", json_logs=args.log_json
+    )
+    load_dotenv()
+
+    if args.plan:
+        with profiling_session("weekly-mix-plan", args.cprofile, args.timings):
+            profile = resolve_profile(args.profile, args.profiles)
+            config = load_config()
+            run_plan(
+                ArtistCatalog.load(offline=True),
+                config,
+                load_plan_inputs(profile, config),
+                os.getenv("LASTFM_API_KEY"),
+                parse_config_overrides(args.overrides),
+                range(args.seed, args.seed + args.runs),
+            )
+        return
+
+    with profiling_session("weekly-mix", args.cprofile, args.timings):
+        config = load_config()
+        profile = resolve_profile(args.profile, args.profiles)
+        with span("auth"):
+            sp = build_spotify_client(profile, priority=CRITICAL)
+            authorize_spotify_client(sp)
+        with span("catalog load"):
+            catalog = ArtistCatalog.load()
+        try:
+            run_weekly_mix(sp, profile, config, catalog, os.getenv("LASTFM_API_KEY"))
+        finally:
+            with span("catalog save"):
+                catalog.save()
+
+
+if __name__ == "__main__":
+    main()
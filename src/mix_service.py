@@ -0,0 +1,354 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, cast
+from urllib.parse import parse_qs, urlsplit
+
+from artist_catalog import ArtistCatalog
+from dotenv import load_dotenv
+from followed_artists import get_followed_artists
+from logging_setup import add_logging_arguments, configure_logging
+from loguru import logger
+from make_rolling import run_rolling_playlists
+from make_weekly_mix import (
+    PlanInputs,
+    build_generative_pool,
+    load_config,
+    mixed_tracks_lookback_weeks,
+    plan_weekly_mix,
+    run_weekly_mix,
+    summarize_selection,
+)
+from mixed_tracks_filter import MixedTracksFilter
+from profiles import (
+    PROFILES_PATH,
+    Profile,
+    authorize_spotify_client,
+    build_spotify_client,
+    resolve_profile,
+)
+from request_scheduler import BACKGROUND, CRITICAL
+from rolling_windows import load_rolling_windows, partition_windows
+from saved_tracks_cache import build_track_keys, get_saved_tracks
+from track_collection import TrackCollection
+from weekly_mix_state import build_weekly_mix_identity
+
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+REFRESH_INTERVAL_SECONDS = 30 * 60
+
+
+@dataclass(frozen=True)
+class WarmState:
+    """Library data the service answers from, replaced whole on each refresh."""
+
+    inputs: PlanInputs
+    tracks: TrackCollection
+    refreshed_at: float
+    # ISO week the past-mix filter in `inputs` was loaded for
+    week_key: str
+
+
+class MixService:
+    """Keeps one profile's library, catalog and Spotify client loaded between mixes.
+
+    Requests are served from the warm state; a background thread reloads it
+    every `refresh_interval` seconds, using its own Spotify client at
+    background priority so refreshes never hold up a request, and merges in
+    catalog entries other processes (such as the prewarm) have saved. Weekly
+    selections run one at a time, since seeded previews reseed the shared
+    random generator.
+
+    Previews draw from a generative pool ranked once per refresh. Generate
+    runs still rank their own, since they first fetch fresh Last.fm
+    neighbours for a sample of seeds.
+    """
+
+    def __init__(
+        self,
+        profile: Profile,
+        config: dict[str, Any],
+        sp: Any,
+        background_sp: Any,
+        catalog: ArtistCatalog,
+        lastfm_api_key: str | None,
+        refresh_interval: float = REFRESH_INTERVAL_SECONDS,
+    ):
+        self.profile = profile
+        self.config = config
+        self.sp = sp
+        self.background_sp = background_sp
+        self.catalog = catalog
+        self.preview_catalog = catalog.offline_view()
+        self.lastfm_api_key = lastfm_api_key
+        self.refresh_interval = refresh_interval
+        self.state: WarmState | None = None
+        self._refresh_lock = threading.Lock()
+        self._selection_lock = threading.Lock()
+        # Concurrent write plans against the same playlists would interleave
+        self._rolling_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher: threading.Thread | None = None
+
+    def refresh(self) -> WarmState:
+        """Reload the library from the caches, refetching whatever has expired."""
+        with self._refresh_lock:
+            started_at = time.perf_counter()
+            saved_artists = get_followed_artists(
+                self.background_sp, self.profile.followed_artists_path
+            )
+            tracks = get_saved_tracks(
+                self.background_sp, cache_file=self.profile.saved_tracks_path
+            )
+            self.catalog.save()
+            merged = self.catalog.merge_from_disk()
+
+            week_key = build_weekly_mix_identity().key
+            saved_artist_names = {artist["name"] for artist in saved_artists}
+            saved_tracks_set = build_track_keys(tracks)
+            inputs = PlanInputs(
+                saved_artists=saved_artists,
+                saved_artist_names=saved_artist_names,
+                saved_tracks_set=saved_tracks_set,
+                mixed_tracks=self._load_mixed_tracks(week_key),
+                generative_pool=build_generative_pool(
+                    self.preview_catalog,
+                    saved_artists,
+                    saved_artist_names,
+                    saved_tracks_set,
+                    self.lastfm_api_key,
+                ),
+            )
+            self.state = WarmState(inputs, tracks, time.time(), week_key)
+
+        logger.info(
+            f"Refreshed {len(saved_artists)} followed artists, {len(tracks)} saved tracks "
+            f"and {merged} catalog entries in {time.perf_counter() - started_at:.1f}s"
+        )
+        return self.state
+
+    def start_background_refresh(self) -> None:
+        self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._refresher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join()
+
+    def status(self) -> dict[str, Any]:
+        state = self._warm_state()
+        return {
+            "profile": self.profile.name,
+            "followed_artists": len(state.inputs.saved_artists),
+            "saved_tracks": len(state.tracks),
+            "refreshed_seconds_ago": round(time.time() - state.refreshed_at),
+        }
+
+    def preview_weekly(self, seed: int | None = None) -> dict[str, Any]:
+        """Select this week's mix from memory without fetching or publishing anything."""
+        inputs = self._current_week_inputs()
+        if seed is None:
+            seed = random.randrange(2**32)
+        with self._selection_lock:
+            started_at = time.perf_counter()
+            selection = plan_weekly_mix(
+                self.preview_catalog, self.config, inputs, self.lastfm_api_key, seed
+            )
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+        return {
+            "seed": seed,
+            "tracks": selection.track_labels,
+            "summary": summarize_selection(selection),
+            "ended_early_reason": selection.ended_early_reason,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+
+    def generate_weekly(self) -> dict[str, Any]:
+        """Create this week's mix on Spotify, or return the one already created."""
+        inputs = self._current_week_inputs()
+        with self._selection_lock:
+            playlist_id = run_weekly_mix(
+                self.sp,
+                self.profile,
+                self.config,
+                self.catalog,
+                self.lastfm_api_key,
+                inputs=inputs,
+            )
+        self.catalog.save()
+        return {"playlist_id": playlist_id}
+
+    def preview_rolling(self) -> dict[str, Any]:
+        """Track counts each rolling playlist would get from the warm library."""
+        windows = load_rolling_windows(self.config)
+        partitions = partition_windows(self._warm_state().tracks, windows)
+        return {
+            "windows": [
+                {"name": window.name, "days": window.days, "tracks": len(partitions[window.name])}
+                for window in windows
+            ]
+        }
+
+    def generate_rolling(self) -> dict[str, Any]:
+        windows = load_rolling_windows(self.config)
+        with self._rolling_lock:
+            run_rolling_playlists(self.sp, self.profile, self.config, self._warm_state().tracks)
+        return {"updated": [window.name for window in windows]}
+
+    def _load_mixed_tracks(self, week_key: str) -> MixedTracksFilter:
+        return MixedTracksFilter.load(
+            self.profile.mixed_tracks_path, week_key, mixed_tracks_lookback_weeks(self.config)
+        )
+
+    def _current_week_inputs(self) -> PlanInputs:
+        """The warm inputs, with the past-mix filter reloaded if the week has rolled over."""
+        state = self._warm_state()
+        week_key = build_weekly_mix_identity().key
+        if state.week_key == week_key:
+            return state.inputs
+        return replace(state.inputs, mixed_tracks=self._load_mixed_tracks(week_key))
+
+    def _warm_state(self) -> WarmState:
+        state = self.state
+        return state if state is not None else self.refresh()
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # The previous state keeps serving until a refresh succeeds
+                logger.exception(f"Background refresh failed: {e}")
+
+
+class MixRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a MixService; GET routes only read, POST routes write or refresh."""
+
+    def do_GET(self) -> None:
+        service = self._service()
+        routes: dict[str, Callable[[dict[str, list[str]]], Any]] = {
+            "/status": lambda query: service.status(),
+            "/weekly/preview": lambda query: service.preview_weekly(_int_param(query, "seed")),
+            "/rolling/preview": lambda query: service.preview_rolling(),
+        }
+        self._dispatch(routes)
+
+    def do_POST(self) -> None:
+        service = self._service()
+        routes: dict[str, Callable[[dict[str, list[str]]], Any]] = {
+            "/weekly/generate": lambda query: service.generate_weekly(),
+            "/rolling/generate": lambda query: service.generate_rolling(),
+            "/refresh": lambda query: _refreshed(service.refresh()),
+        }
+        self._dispatch(routes)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _service(self) -> MixService:
+        return cast(MixServer, self.server).service
+
+    def _dispatch(self, routes: dict[str, Callable[[dict[str, list[str]]], Any]]) -> None:
+        url = urlsplit(self.path)
+        route = routes.get(url.path)
+        if route is None:
+            self._respond(404, {"error": f"No route for {self.command} {url.path}"})
+            return
+        try:
+            self._respond(200, route(parse_qs(url.query)))
+        except ValueError as e:
+            self._respond(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception(f"{self.command} {url.path} failed: {e}")
+            self._respond(500, {"error": f"{e.__class__.__name__}: {e}"})
+
+    def _respond(self, status: int, body: dict[str, Any]) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MixServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: MixService):
+        super().__init__(address, MixRequestHandler)
+        self.service = service
+
+
+def _int_param(query: dict[str, list[str]], name: str) -> int | None:
+    values = query.get(name)
+    if not values:
+        return None
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {values[0]!r}") from None
+
+
+def _refreshed(state: WarmState) -> dict[str, Any]:
+    return {"saved_tracks": len(state.tracks), "refreshed_at": state.refreshed_at}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve weekly and rolling playlists from warm in-memory caches"
+    )
+    parser.add_argument("--profile", help="Profile name from the profiles file")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_PATH)
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument(
+        "--refresh-minutes",
+        type=float,
+        default=REFRESH_INTERVAL_SECONDS / 60,
+        help="Reload followed artists and saved tracks this often",
+    )
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_logging("mix-service", json_logs=args.log_json)
+    load_dotenv()
+
+    profile = resolve_profile(args.profile, args.profiles)
+    sp = build_spotify_client(profile, priority=CRITICAL)
+    authorize_spotify_client(sp)
+    catalog = ArtistCatalog.load()
+    service = MixService(
+        profile,
+        load_config(),
+        sp,
+        build_spotify_client(profile, priority=BACKGROUND),
+        catalog,
+        os.getenv("LASTFM_API_KEY"),
+        refresh_interval=args.refresh_minutes * 60,
+    )
+    # Warm up before listening, so the first request is as fast as the rest
+    service.refresh()
+    service.start_background_refresh()
+
+    server = MixServer((args.host, args.port), service)
+    logger.info(f"Mix service for {profile.name} listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        service.stop()
+        catalog.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import base64
+import datetime
+import hashlib
+import json
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable
+
+from cache_files import atomic_write_json, file_lock, lock_path_for
+from loguru import logger
+
+
+# Weeks of past mixes whose tracks are not picked again
+MIXED_TRACKS_LOOKBACK_WEEKS = 26
+
+
+def track_hash(track_id: str) -> int:
+    """64-bit hash of a track ID; collisions are negligible at library scale."""
+    return int.from_bytes(hashlib.blake2b(track_id.encode(), digest_size=8).digest(), "little")
+
+
+def _week_start(week_key: str) -> datetime.date:
+    year, week = week_key.split("-W")
+    return datetime.date.fromisocalendar(int(year), int(week), 1)
+
+
+def _weeks_before(week_key: str, current_week_key: str) -> int:
+    return (_week_start(current_week_key) - _week_start(week_key)).days // 7
+
+
+def _encode(hashes: Iterable[int]) -> str:
+    packed = array("Q", sorted(set(hashes)))
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _decode(encoded: str) -> array:
+    packed = array("Q")
+    packed.frombytes(base64.b64decode(encoded))
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed
+
+
+class MixedTracksFilter:
+    """Tracks served by recent weekly mixes, for O(1) exclusion during selection.
+
+    On disk each week is a sorted array of 64-bit track ID hashes (8 bytes per
+    track, base64 in JSON); only the weeks inside the lookback window are
+    loaded, into a set of those hashes.
+    """
+
+    __slots__ = ("_hashes",)
+
+    def __init__(self, hashes: Iterable[int] = ()):
+        self._hashes = frozenset(hashes)
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        current_week_key: str,
+        lookback_weeks: int = MIXED_TRACKS_LOOKBACK_WEEKS,
+    ) -> "MixedTracksFilter":
+        """Load the weeks before `current_week_key` within the lookback window."""
+        weeks = _read_weeks(path)
+        hashes: set[int] = set()
+        for week_key, encoded in weeks.items():
+            if 0 < _weeks_before(week_key, current_week_key) <= lookback_weeks:
+                hashes.update(_decode(encoded))
+        return cls(hashes)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_hash(track_id) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+def _read_weeks(path: Path) -> dict[str, str]:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["weeks"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Error loading mixed tracks {path}: {e}")
+        return {}
+
+
+def record_mixed_tracks(
+    path: Path,
+    week_key: str,
+    track_ids: Iterable[str],
+    keep_weeks: int = MIXED_TRACKS_LOOKBACK_WEEKS,
+) -> None:
+    """Store a week's mixed tracks, dropping weeks older than `keep_weeks`."""
+    with file_lock(lock_path_for(path)):
+        weeks = {
+            key: encoded
+            for key, encoded in _read_weeks(path).items()
+            if _weeks_before(key, week_key) <= keep_weeks
+        }
+        weeks[week_key] = _encode(track_hash(track_id) for track_id in track_ids)
+        atomic_write_json(path, {"weeks": weeks}, indent=2, sort_keys=True)
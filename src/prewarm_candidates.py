@@ -0,0 +1,207 @@
+import argparse
+import datetime
+import heapq
+import itertools
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from artist_catalog import ArtistCatalog
+from dotenv import load_dotenv
+from followed_artists import get_followed_artists
+from generative_discovery import filter_saved_artist_matches
+from logging_setup import add_logging_arguments, configure_logging
+from loguru import logger
+from profiles import PROFILES_PATH, Profile, build_spotify_client, resolve_profile
+from request_scheduler import BACKGROUND, LASTFM, scheduler
+from run_budget import RunBudget
+from saved_tracks_cache import get_saved_tracks
+
+
+PREWARM_MAX_SECONDS = 30 * 60
+# Entries this close to expiring are refreshed now, so the weekly run finds them fresh
+PREWARM_LEAD_DAYS = 2
+# Discovery tries at most this many Last.fm candidates per seed
+SIMILAR_RESOLVE_LIMIT = 10
+SAVE_EVERY_TASKS = 100
+
+# Catalog section backing each task kind
+TASK_SECTIONS = {
+    "artist": "artists",
+    "album": "albums",
+    "similar": "similar",
+    "resolve": "resolved",
+}
+
+
+@dataclass(order=True)
+class PrewarmTask:
+    # Negated age in seconds, so missing (-inf) and then oldest entries pop first
+    priority: float
+    sequence: int
+    kind: str = field(compare=False)
+    key: str = field(compare=False)
+
+
+class CandidatePrewarmer:
+    """Refresh the catalog entries the weekly mix samples from, stalest first.
+
+    Seeds are the followed artists: their discographies and album tracks, plus
+    their Last.fm neighbours, how those resolve on Spotify, and the resolved
+    artists' discographies. Fresh entries are not refetched, but what they
+    reference is still queued so gaps further down get filled.
+    """
+
+    def __init__(
+        self,
+        sp: Any,
+        catalog: ArtistCatalog,
+        lastfm_api_key: str | None,
+        saved_artist_names: set[str],
+        budget: RunBudget,
+        save_every: int = SAVE_EVERY_TASKS,
+    ):
+        self.sp = sp
+        self.catalog = catalog
+        self.lastfm_api_key = lastfm_api_key
+        self.saved_artist_names = saved_artist_names
+        self.budget = budget
+        self.save_every = save_every
+        # Yields Last.fm to interactive runs sharing the process
+        self.lastfm_limiter = scheduler.limiter(LASTFM, BACKGROUND)
+        self.refresh_after = catalog.expiry - datetime.timedelta(days=PREWARM_LEAD_DAYS)
+        self.refreshed = 0
+        self.failed = 0
+        self._queue: list[PrewarmTask] = []
+        self._queued: set[tuple[str, str]] = set()
+        self._sequence = itertools.count()
+
+    def add_seed_artist(self, artist: dict[str, Any]) -> None:
+        self.enqueue("artist", artist["id"])
+        if self.lastfm_api_key:
+            self.enqueue("similar", artist["name"])
+
+    def enqueue(self, kind: str, key: str) -> None:
+        if not key or (kind, key) in self._queued:
+            return
+        self._queued.add((kind, key))
+
+        age = self.catalog.entry_age(TASK_SECTIONS[kind], key)
+        if age is not None and age < self.refresh_after:
+            self._run(kind, key, refresh=False)
+            return
+
+        priority = -math.inf if age is None else -age.total_seconds()
+        heapq.heappush(self._queue, PrewarmTask(priority, next(self._sequence), kind, key))
+
+    def run(self) -> None:
+        """Work through the queue until it is empty or the budget runs out."""
+        logger.info(f"Prewarming {len(self._queue)} stale or missing catalog entries")
+        while self._queue and self.budget.remaining() > 0:
+            task = heapq.heappop(self._queue)
+            self._run(task.kind, task.key, refresh=True)
+            self.refreshed += 1
+            if self.refreshed % self.save_every == 0:
+                self.catalog.save()
+
+        logger.info(
+            f"Prewarm refreshed {self.refreshed} entries ({self.failed} failed), "
+            f"{len(self._queue)} left for the next run"
+        )
+
+    def _run(self, kind: str, key: str, refresh: bool) -> None:
+        """Fetch (or read) one entry and queue the entries it points to."""
+        try:
+            if kind == "artist":
+                for album in self.catalog.artist_albums(self.sp, key, refresh=refresh):
+                    self.enqueue("album", album["id"])
+            elif kind == "album":
+                self.catalog.album_tracks(self.sp, key, refresh=refresh)
+            elif kind == "similar" and self.lastfm_api_key:
+                # Only queued when there is a key
+                candidates = self.catalog.similar_artists(
+                    key, self.lastfm_api_key, refresh=refresh, rate_limiter=self.lastfm_limiter
+                )
+                candidates = filter_saved_artist_matches(candidates, self.saved_artist_names)
+                candidates.sort(key=_match_score, reverse=True)
+                for candidate in candidates[:SIMILAR_RESOLVE_LIMIT]:
+                    self.enqueue("resolve", candidate["name"])
+            elif kind == "resolve":
+                artist = self.catalog.resolve_artist(self.sp, key, refresh=refresh)
+                if artist:
+                    self.enqueue("artist", artist["id"])
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Prewarm {kind} {key} failed: {e}")
+
+
+def _match_score(candidate: dict[str, Any]) -> float:
+    try:
+        return float(candidate.get("match") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def run_prewarm(
+    sp,
+    profile: Profile,
+    catalog: ArtistCatalog,
+    lastfm_api_key: str | None,
+    max_seconds: float = PREWARM_MAX_SECONDS,
+) -> CandidatePrewarmer:
+    """Refresh one profile's followed artists, saved tracks and candidate pool."""
+    budget = RunBudget(max_seconds)
+    with budget.phase("followed artists"):
+        followed_artists = get_followed_artists(sp, profile.followed_artists_path, refresh=True)
+    with budget.phase("saved tracks"):
+        get_saved_tracks(sp, cache_file=profile.saved_tracks_path)
+
+    prewarmer = CandidatePrewarmer(
+        sp,
+        catalog,
+        lastfm_api_key,
+        {artist["name"] for artist in followed_artists},
+        budget,
+    )
+    if not lastfm_api_key:
+        logger.warning("LASTFM_API_KEY is not set; skipping Last.fm neighbours")
+    with budget.phase("catalog"):
+        for artist in followed_artists:
+            prewarmer.add_seed_artist(artist)
+        prewarmer.run()
+
+    budget.log_summary()
+    return prewarmer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh the cached candidate pool used by the weekly mix"
+    )
+    parser.add_argument("--profile", help="Profile name from the profiles file")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_PATH)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=PREWARM_MAX_SECONDS,
+        help="Stop refreshing after this many seconds; the rest waits for the next run",
+    )
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_logging("prewarm", json_logs=args.log_json)
+    load_dotenv()
+
+    profile = resolve_profile(args.profile, args.profiles)
+    sp = build_spotify_client(profile, priority=BACKGROUND)
+    catalog = ArtistCatalog.load()
+    try:
+        run_prewarm(sp, profile, catalog, os.getenv("LASTFM_API_KEY"), args.max_seconds)
+    finally:
+        catalog.save()
+
+
+if __name__ == "__main__":
+    main()
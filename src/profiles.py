@@ -0,0 +1,134 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import yaml
+from request_scheduler import NORMAL, SPOTIFY, ScheduledSpotify, scheduler
+from spotipy.oauth2 import SpotifyOAuth
+
+
+REPO_ROOT = Path(__file__).parent.parent
+DATA_DIR = REPO_ROOT / "data"
+PROFILES_PATH = REPO_ROOT / "profiles.yaml"
+DEFAULT_PROFILE_NAME = "default"
+DEFAULT_JOBS = ("weekly", "rolling")
+SPOTIFY_SCOPE = (
+    "playlist-modify-public,playlist-modify-private,playlist-read-private,"
+    "user-library-read,user-follow-read"
+)
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    data_dir: Path
+    token_cache: Path | None = None
+    jobs: tuple[str, ...] = field(default=DEFAULT_JOBS)
+
+    @property
+    def saved_tracks_path(self) -> Path:
+        return self.data_dir / "saved_tracks.json"
+
+    @property
+    def weekly_mix_state_path(self) -> Path:
+        return self.data_dir / "weekly_mix_runs.json"
+
+    @property
+    def unfollowed_artists_path(self) -> Path:
+        return self.data_dir / "unfollowed_artists.json"
+
+    @property
+    def followed_artists_path(self) -> Path:
+        return self.data_dir / "followed_artists.json"
+
+    @property
+    def mixed_tracks_path(self) -> Path:
+        return self.data_dir / "mixed_tracks.json"
+
+
+def default_profile() -> Profile:
+    """Return the single-user profile backed by `.env` and the shared data dir."""
+    return Profile(name=DEFAULT_PROFILE_NAME, data_dir=DATA_DIR)
+
+
+def profile_from_config(entry: dict[str, Any], base_dir: Path = REPO_ROOT) -> Profile:
+    """Build a profile from one `profiles.yaml` entry."""
+    name = entry.get("name")
+    if not name:
+        raise ValueError(f"Profile entry is missing a name: {entry}")
+
+    data_dir = Path(entry.get("data_dir") or DATA_DIR / "profiles" / name)
+    if not data_dir.is_absolute():
+        data_dir = base_dir / data_dir
+
+    token_cache = Path(entry.get("token_cache") or data_dir / ".spotify_token_cache")
+    if not token_cache.is_absolute():
+        token_cache = base_dir / token_cache
+
+    jobs = tuple(entry.get("jobs") or DEFAULT_JOBS)
+    unknown_jobs = set(jobs) - set(DEFAULT_JOBS)
+    if unknown_jobs:
+        raise ValueError(f"Unknown jobs for profile {name}: {sorted(unknown_jobs)}")
+
+    return Profile(name=name, data_dir=data_dir, token_cache=token_cache, jobs=jobs)
+
+
+def load_profiles_config(path: Path = PROFILES_PATH) -> dict[str, Any]:
+    """Load the raw profiles file."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected profiles file to be an object: {path}")
+
+    return data
+
+
+def load_profiles(path: Path = PROFILES_PATH) -> list[Profile]:
+    """Load every profile listed in the profiles file."""
+    data = load_profiles_config(path)
+    profiles = [profile_from_config(entry, path.parent) for entry in data.get("profiles", [])]
+
+    names = [profile.name for profile in profiles]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate profile names in {path}: {sorted(duplicates)}")
+
+    return profiles
+
+
+def resolve_profile(name: str | None, path: Path = PROFILES_PATH) -> Profile:
+    """Return the named profile, or the default profile when no name is given."""
+    if not name:
+        return default_profile()
+
+    for profile in load_profiles(path):
+        if profile.name == name:
+            return profile
+
+    raise ValueError(f"No profile named {name} in {path}")
+
+
+def build_spotify_client(
+    profile: Profile, scope: str = SPOTIFY_SCOPE, priority: str = NORMAL
+) -> Any:
+    """Create a Spotify client authorized with the profile's token cache.
+
+    Its requests queue on the process's shared Spotify bucket at `priority`.
+    """
+    auth_manager = SpotifyOAuth(
+        client_id=os.getenv("SPOTIPY_CLIENT_ID"),
+        client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
+        redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
+        scope=scope,
+        cache_path=str(profile.token_cache) if profile.token_cache else None,
+    )
+    return ScheduledSpotify(
+        auth_manager=auth_manager, limiter=scheduler.limiter(SPOTIFY, priority)
+    )
+
+
+def authorize_spotify_client(sp: Any) -> None:
+    """Fetch or refresh the access token now rather than on the first API call."""
+    sp.auth_manager.get_access_token(as_dict=False)
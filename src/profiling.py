@@ -0,0 +1,140 @@
+import argparse
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from cache_files import atomic_write_json
+from loguru import logger
+
+
+TIMINGS_DIR = Path("logs")
+PROFILE_TOP_FUNCTIONS = 25
+
+
+class SpanRecorder:
+    """Collects wall-clock timings for named phases across threads.
+
+    Repeated spans with the same name (e.g. one per rolling window) are
+    aggregated into a count, a total and a maximum.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._spans: dict[str, dict[str, float]] = {}
+        self.started_at = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started_at
+            self.record(name, seconds)
+            logger.debug(f"Span {name}: {seconds:.3f}s")
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._spans.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": int(stats["count"]),
+                    "total_seconds": round(stats["total"], 6),
+                    "max_seconds": round(stats["max"], 6),
+                }
+                for name, stats in self._spans.items()
+            }
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started_at, 6),
+            "spans": spans,
+        }
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        logger.info(f"Timings ({summary['wall_seconds']:.2f}s wall):")
+        for name, stats in sorted(
+            summary["spans"].items(), key=lambda item: item[1]["total_seconds"], reverse=True
+        ):
+            logger.info(f"  {name}: {stats['total_seconds']:.3f}s ({stats['count']}x)")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self.started_at = time.perf_counter()
+
+
+# Process-wide recorder used by the scripts' phase spans
+recorder = SpanRecorder()
+
+
+def span(name: str):
+    """Time a block under `name` in the process-wide recorder."""
+    return recorder.span(name)
+
+
+def add_profiling_arguments(parser: argparse.ArgumentParser) -> None:
+    # --profile already selects the Spotify account, so the profiler gets its own name
+    parser.add_argument(
+        "--cprofile",
+        type=Path,
+        metavar="PATH",
+        help="Capture a cProfile of the main thread to PATH (open with snakeviz or pstats)",
+    )
+    parser.add_argument(
+        "--timings",
+        type=Path,
+        metavar="PATH",
+        help="Write the phase timing summary as JSON (default: logs/<script>-timings.json)",
+    )
+
+
+@contextmanager
+def profiling_session(
+    name: str, cprofile_path: Path | None = None, timings_path: Path | None = None
+) -> Iterator[SpanRecorder]:
+    """Time a whole script run, optionally under cProfile.
+
+    On exit the phase timings are logged and written as JSON, and the
+    profile's hottest functions are logged when one was captured.
+    """
+    recorder.reset()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        with recorder.span(name):
+            yield recorder
+    finally:
+        if profiler and cprofile_path:
+            profiler.disable()
+            _save_profile(profiler, cprofile_path)
+
+        recorder.log_summary()
+        timings_path = timings_path or TIMINGS_DIR / f"{name}-timings.json"
+        try:
+            atomic_write_json(timings_path, recorder.summary(), indent=2)
+            logger.debug(f"Timings written to {timings_path}")
+        except OSError as e:
+            logger.error(f"Could not write timings to {timings_path}: {e}")
+
+
+def _save_profile(profiler: cProfile.Profile, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(path))
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    logger.debug(f"Hottest functions by cumulative time:\n{output.getvalue()}")
+    logger.info(f"cProfile written to {path}")
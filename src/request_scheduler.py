@@ -0,0 +1,252 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, cast
+
+import spotipy
+from requests import Session
+from requests.adapters import HTTPAdapter
+from loguru import logger
+from spotipy.exceptions import SpotifyException
+
+
+CRITICAL = "critical"
+NORMAL = "normal"
+BACKGROUND = "background"
+# Highest first: a waiting request is served before any lower-priority one
+PRIORITIES = (CRITICAL, NORMAL, BACKGROUND)
+
+SPOTIFY = "spotify"
+LASTFM = "lastfm"
+
+# Each success raises the rate by this fraction of the service's maximum
+RATE_INCREASE_FRACTION = 0.01
+# A throttled response cuts the rate by this factor
+RATE_DECREASE_FACTOR = 0.5
+# Share of the burst background requests leave unused, for critical ones arriving later
+BACKGROUND_RESERVE_FRACTION = 0.5
+# Longer Retry-After waits are not slept through; the request fails instead
+MAX_THROTTLE_WAIT_SECONDS = 60
+SPOTIFY_THROTTLE_RETRIES = 3
+# Server errors are still retried inside the HTTP session; 429s go to the scheduler
+SPOTIFY_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class ServiceRate:
+    requests_per_second: float
+    min_requests_per_second: float
+    max_requests_per_second: float
+    burst: int
+
+
+SERVICE_RATES = {
+    # Spotify doesn't publish its limit (a rolling 30-second window per app),
+    # so start moderate and let successes and 429s find it
+    SPOTIFY: ServiceRate(
+        requests_per_second=10, min_requests_per_second=1, max_requests_per_second=30, burst=10
+    ),
+    # Last.fm asks API clients to stay under five requests per second
+    LASTFM: ServiceRate(
+        requests_per_second=5, min_requests_per_second=0.5, max_requests_per_second=5, burst=5
+    ),
+}
+
+
+def retry_after_seconds(headers: Mapping[str, str] | None) -> float | None:
+    """The Retry-After header of a throttled response, in seconds, if present."""
+    try:
+        return float(headers["Retry-After"]) if headers else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ServiceBucket:
+    """Token bucket shared by every request to one service, served by priority.
+
+    Tokens refill at the current rate up to `burst`. A request waits while a
+    higher-priority request is waiting, and background requests also leave
+    part of the burst in reserve. The rate adapts: each success raises it a
+    little, each throttled response halves it and pauses the bucket for the
+    server's Retry-After.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: ServiceRate,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self.limits = rate
+        self.rate = rate.requests_per_second
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(rate.burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._waiting = [0] * len(PRIORITIES)
+        # Throttled responses seen, for run summaries
+        self.throttled_count = 0
+
+    def acquire(self, priority: str = NORMAL) -> None:
+        """Block until a request at `priority` may be sent."""
+        rank = PRIORITIES.index(priority)
+        with self._lock:
+            self._waiting[rank] += 1
+        try:
+            while True:
+                with self._lock:
+                    delay = self._delay(rank)
+                    if delay <= 0:
+                        self._tokens -= 1
+                        return
+                self._sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting[rank] -= 1
+
+    def succeeded(self) -> None:
+        with self._lock:
+            increase = self.limits.max_requests_per_second * RATE_INCREASE_FRACTION
+            self.rate = min(self.limits.max_requests_per_second, self.rate + increase)
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """Slow down after a 429; throttles during the resulting pause count once."""
+        with self._lock:
+            now = self._clock()
+            self.throttled_count += 1
+            if now < self._paused_until:
+                return
+            self.rate = max(
+                self.limits.min_requests_per_second, self.rate * RATE_DECREASE_FACTOR
+            )
+            self._tokens = 0.0
+            pause = min(retry_after or 1 / self.rate, MAX_THROTTLE_WAIT_SECONDS)
+            self._paused_until = now + pause
+            rate = self.rate
+
+        logger.warning(
+            f"{self.name} is throttling requests; pausing {pause:.1f}s, "
+            f"then sending at most {rate:.1f}/s"
+        )
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - max(self._updated_at, self._paused_until))
+        self._tokens = min(float(self.limits.burst), self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def _delay(self, rank: int) -> float:
+        """Seconds to wait before the request at `rank` can take a token (0 if now)."""
+        now = self._clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if any(self._waiting[:rank]):
+            return 1 / self.rate
+
+        needed = 1.0
+        if PRIORITIES[rank] == BACKGROUND:
+            needed += self.limits.burst * BACKGROUND_RESERVE_FRACTION
+        return max(0.0, (needed - self._tokens) / self.rate)
+
+
+class ScheduledLimiter:
+    """One caller's handle on a service bucket, at a fixed priority.
+
+    Passed wherever a `rate_limiter` is accepted, e.g. `fetch_similar_artists`.
+    """
+
+    __slots__ = ("bucket", "priority")
+
+    def __init__(self, bucket: ServiceBucket, priority: str = NORMAL):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown request priority: {priority}")
+        self.bucket = bucket
+        self.priority = priority
+
+    def wait(self) -> None:
+        self.bucket.acquire(self.priority)
+
+    def succeeded(self) -> None:
+        self.bucket.succeeded()
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        self.bucket.throttled(retry_after)
+
+
+class RequestScheduler:
+    """Per-service token buckets shared by every client in the process."""
+
+    def __init__(
+        self,
+        rates: Mapping[str, ServiceRate] = SERVICE_RATES,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._buckets = {
+            name: ServiceBucket(name, rate, clock, sleep) for name, rate in rates.items()
+        }
+
+    def bucket(self, service: str) -> ServiceBucket:
+        return self._buckets[service]
+
+    def limiter(self, service: str, priority: str = NORMAL) -> ScheduledLimiter:
+        return ScheduledLimiter(self._buckets[service], priority)
+
+
+# Shared by every Spotify and Last.fm request in the process
+scheduler = RequestScheduler()
+
+
+class ScheduledSpotify(spotipy.Spotify):
+    """Spotify client whose API calls queue on a scheduler bucket.
+
+    Throttled responses are not retried inside the HTTP session: they slow
+    the whole bucket down, and the call queues again, up to `throttle_retries`
+    times. A Retry-After longer than MAX_THROTTLE_WAIT_SECONDS fails the call.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        limiter: ScheduledLimiter,
+        throttle_retries: int = SPOTIFY_THROTTLE_RETRIES,
+        **kwargs: Any,
+    ):
+        kwargs.setdefault("status_forcelist", SPOTIFY_RETRY_STATUSES)
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+        super().__init__(*args, **kwargs)
+
+    _session: Session
+
+    def _build_session(self) -> None:
+        super()._build_session()
+        # Otherwise urllib3 sleeps through a 429's Retry-After without us seeing it
+        retry = cast(HTTPAdapter, self._session.get_adapter("https://")).max_retries
+        adapter = HTTPAdapter(max_retries=retry.new(respect_retry_after_header=False))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _internal_call(self, method, url, payload, params):
+        for attempt in range(self.throttle_retries + 1):
+            self.limiter.wait()
+            try:
+                # Copied since spotipy pops the content type out of the params
+                result = super()._internal_call(method, url, payload, dict(params))
+            except SpotifyException as e:
+                # spotipy also reports exhausted 5xx retries as a 429, but without a
+                # response (so no headers); that is an outage, not throttling
+                if e.http_status != 429 or not e.headers:
+                    raise
+                retry_after = retry_after_seconds(e.headers)
+                self.limiter.throttled(retry_after)
+                too_long = retry_after is not None and retry_after > MAX_THROTTLE_WAIT_SECONDS
+                if too_long or attempt == self.throttle_retries:
+                    raise
+                continue
+            self.limiter.succeeded()
+            return result
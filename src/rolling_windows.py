@@ -0,0 +1,55 @@
+import datetime
+from dataclasses import dataclass
+from typing import Any
+
+from track_collection import TrackCollection, cutoff_epoch
+
+
+@dataclass(frozen=True)
+class RollingWindow:
+    name: str
+    days: int
+    pin: bool = True
+
+
+DEFAULT_ROLLING_WINDOWS = (
+    RollingWindow("last month", 30),
+    RollingWindow("last 3 months", 90),
+)
+
+
+def load_rolling_windows(config: dict[str, Any]) -> list[RollingWindow]:
+    """Read the `rolling_playlists` section of config.yaml."""
+    entries = config.get("rolling_playlists")
+    if not entries:
+        return list(DEFAULT_ROLLING_WINDOWS)
+
+    windows = []
+    for entry in entries:
+        if not entry.get("name") or not entry.get("days"):
+            raise ValueError(f"Rolling playlist entry needs a name and days: {entry}")
+        windows.append(
+            RollingWindow(name=entry["name"], days=int(entry["days"]), pin=entry.get("pin", True))
+        )
+
+    names = [window.name for window in windows]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Rolling playlist names must be unique: {names}")
+
+    return windows
+
+
+def partition_windows(
+    tracks: TrackCollection,
+    windows: list[RollingWindow],
+    now: datetime.datetime | None = None,
+) -> dict[str, TrackCollection]:
+    """Split the library into every window, most recent first.
+
+    Every window is a prefix of the library in most-recent-first order, found
+    by binary search on the epoch column; cached libraries are already sorted.
+    """
+    tracks = tracks.sorted_by_added()
+    return {
+        window.name: tracks.added_since(cutoff_epoch(window.days, now)) for window in windows
+    }
@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from typing import Any, Sequence, cast
+
+
+# Spotify accepts at most 100 items per add, replace or remove call
+MAX_ITEMS_PER_CALL = 100
+
+
+@dataclass(frozen=True)
+class WriteOp:
+    """One playlist API call in a write plan."""
+
+    kind: str  # "replace", "add", "remove" or "reorder"
+    track_ids: tuple[str, ...] = ()
+    position: int | None = None
+    range_start: int = 0
+    range_length: int = 0
+    insert_before: int = 0
+
+
+def _chunks(items: Sequence[str], size: int = MAX_ITEMS_PER_CALL) -> list[tuple[str, ...]]:
+    return [tuple(items[i : i + size]) for i in range(0, len(items), size)]
+
+
+def plan_replace(target: Sequence[str]) -> list[WriteOp]:
+    """Overwrite the playlist: one replace call, then appends for the overflow."""
+    chunks = _chunks(target) or [()]
+    return [WriteOp("replace", chunks[0])] + [WriteOp("add", chunk) for chunk in chunks[1:]]
+
+
+def _longest_increasing_subsequence(values: Sequence[int]) -> set[int]:
+    """Return the indices of one longest strictly increasing subsequence."""
+    tails: list[int] = []  # index into values of the smallest tail per length
+    previous = [-1] * len(values)
+    for index, value in enumerate(values):
+        low, high = 0, len(tails)
+        while low < high:
+            mid = (low + high) // 2
+            if values[tails[mid]] < value:
+                low = mid + 1
+            else:
+                high = mid
+        if low:
+            previous[index] = tails[low - 1]
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+
+    kept = set()
+    index = tails[-1] if tails else -1
+    while index != -1:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+
+def _plan_reorders(working: list[str], desired: list[str]) -> list[WriteOp]:
+    """Move blocks of `working` until it matches `desired`, one call per block."""
+    working = list(working)
+    ops = []
+    for index, track_id in enumerate(desired):
+        if working[index] == track_id:
+            continue
+        start = working.index(track_id, index)
+        length = 1
+        while (
+            start + length < len(working)
+            and index + length < len(desired)
+            and working[start + length] == desired[index + length]
+        ):
+            length += 1
+        ops.append(
+            WriteOp("reorder", range_start=start, range_length=length, insert_before=index)
+        )
+        working[index:index] = working[start : start + length]
+        del working[start + length : start + 2 * length]
+    return ops
+
+
+def _plan_inserts(target: Sequence[str], present: set[str]) -> list[WriteOp]:
+    """Insert each run of missing tracks at its final position, in ascending order."""
+    ops = []
+    run_start = None
+    for index in range(len(target) + 1):
+        missing = index < len(target) and target[index] not in present
+        if missing and run_start is None:
+            run_start = index
+        elif not missing and run_start is not None:
+            run = target[run_start:index]
+            for offset in range(0, len(run), MAX_ITEMS_PER_CALL):
+                ops.append(
+                    WriteOp(
+                        "add",
+                        tuple(run[offset : offset + MAX_ITEMS_PER_CALL]),
+                        position=run_start + offset,
+                    )
+                )
+            run_start = None
+    return ops
+
+
+def plan_playlist_writes(
+    current: Sequence[str | None], target: Sequence[str]
+) -> list[WriteOp]:
+    """Plan the fewest API calls that turn `current` into exactly `target`.
+
+    Three strategies are costed and the cheapest wins, preferring ones that keep
+    existing items (and their "date added") on ties:
+
+    - keep in-place tracks, move out-of-order blocks with reorder calls;
+    - keep the longest in-order run of tracks, remove and re-add the rest;
+    - replace the whole playlist.
+
+    Positional edits are only safe when every current item is a unique track
+    ID; duplicates or unplayable/local items (None) force a full replace.
+    Removals run first, then reorders, then inserts in ascending position, so
+    every insert position is the track's final index.
+    """
+    replace = plan_replace(target)
+    if not current and not target:
+        return []
+    if None in current or len(set(current)) != len(current) or len(set(target)) != len(target):
+        return replace
+
+    track_ids = cast(Sequence[str], current)  # no None, checked above
+    target_index = {track_id: index for index, track_id in enumerate(target)}
+    kept = [track_id for track_id in track_ids if track_id in target_index]
+    stale = [track_id for track_id in track_ids if track_id not in target_index]
+
+    in_order = _longest_increasing_subsequence([target_index[t] for t in kept])
+    movers = [track_id for index, track_id in enumerate(kept) if index not in in_order]
+    remove_movers = [WriteOp("remove", chunk) for chunk in _chunks(stale + movers)] + (
+        _plan_inserts(target, {kept[index] for index in in_order})
+    )
+
+    desired = sorted(kept, key=target_index.__getitem__)
+    reorder_movers = (
+        [WriteOp("remove", chunk) for chunk in _chunks(stale)]
+        + _plan_reorders(kept, desired)
+        + _plan_inserts(target, set(kept))
+    )
+
+    return min((reorder_movers, remove_movers, replace), key=len)
+
+
+def apply_write_plan(sp: Any, playlist_id: str, ops: list[WriteOp]) -> str | None:
+    """Execute a write plan, chaining each call's snapshot_id into the next."""
+    snapshot_id = None
+    for op in ops:
+        if op.kind == "replace":
+            result = sp.playlist_replace_items(playlist_id, list(op.track_ids))
+        elif op.kind == "add":
+            result = sp.playlist_add_items(playlist_id, list(op.track_ids), position=op.position)
+        elif op.kind == "remove":
+            result = sp.playlist_remove_all_occurrences_of_items(
+                playlist_id, list(op.track_ids), snapshot_id=snapshot_id
+            )
+        elif op.kind == "reorder":
+            result = sp.playlist_reorder_items(
+                playlist_id,
+                range_start=op.range_start,
+                insert_before=op.insert_before,
+                range_length=op.range_length,
+                snapshot_id=snapshot_id,
+            )
+        else:
+            raise ValueError(f"Unknown playlist write op: {op.kind}")
+
+        snapshot_id = (result or {}).get("snapshot_id", snapshot_id)
+
+    return snapshot_id
+
+
+def simulate_write_plan(current: Sequence[str], ops: list[WriteOp]) -> list[str]:
+    """Apply a plan to a local list, mirroring Spotify's semantics for each call."""
+    playlist = list(current)
+    for op in ops:
+        if op.kind == "replace":
+            playlist = list(op.track_ids)
+        elif op.kind == "add":
+            position = len(playlist) if op.position is None else op.position
+            playlist[position:position] = op.track_ids
+        elif op.kind == "remove":
+            removed = set(op.track_ids)
+            playlist = [track_id for track_id in playlist if track_id not in removed]
+        elif op.kind == "reorder":
+            block = playlist[op.range_start : op.range_start + op.range_length]
+            del playlist[op.range_start : op.range_start + op.range_length]
+            insert_before = op.insert_before
+            if insert_before > op.range_start:
+                insert_before -= op.range_length
+            playlist[insert_before:insert_before] = block
+    return playlist
@@ -0,0 +1,91 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from loguru import logger
+from profiling import span
+
+
+# Degradations kick in as the fraction of the budget left drops below these
+SKIP_GENERATIVE_BELOW = 0.5
+CACHED_ONLY_BELOW = 0.25
+# Left for creating the playlist and adding its tracks
+STOP_SELECTION_BELOW = 0.1
+
+
+class RunBudget:
+    """Wall-clock budget for one run, with per-phase timings.
+
+    Without `max_seconds` the budget never runs out and nothing is degraded.
+    Each degradation is logged once, when it is first applied.
+    """
+
+    def __init__(
+        self, max_seconds: float | None = None, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_seconds = max_seconds
+        self._clock = clock
+        self.started_at = clock()
+        self.phase_seconds: dict[str, float] = {}
+        self.degradations: list[str] = []
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "RunBudget":
+        return cls(config.get("max_run_seconds"))
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started_at
+
+    def remaining(self) -> float:
+        if self.max_seconds is None:
+            return math.inf
+        return max(0.0, self.max_seconds - self.elapsed())
+
+    def fraction_remaining(self) -> float:
+        if not self.max_seconds:
+            return 1.0
+        return self.remaining() / self.max_seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of work, accumulating into `phase_seconds[name]`."""
+        started_at = self._clock()
+        try:
+            with span(name):
+                yield
+        finally:
+            seconds = self._clock() - started_at
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+            logger.debug(f"Phase {name} took {seconds:.2f}s ({self.remaining():.1f}s left)")
+
+    def allows_generative(self) -> bool:
+        """Whether there is time for Last.fm discovery and its Spotify lookups."""
+        return not self._degrade_below(
+            SKIP_GENERATIVE_BELOW, "skipped generative discovery"
+        )
+
+    def cached_only(self) -> bool:
+        """Whether candidates should come only from the cached artist catalog."""
+        return self._degrade_below(CACHED_ONLY_BELOW, "limited candidates to cached catalog")
+
+    def should_stop(self) -> bool:
+        """Whether selection must end now to publish the playlist in time."""
+        return self._degrade_below(STOP_SELECTION_BELOW, "ended selection early")
+
+    def log_summary(self) -> None:
+        phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.phase_seconds.items())
+        limit = f"/{self.max_seconds:.0f}s" if self.max_seconds is not None else ""
+        logger.info(f"Run took {self.elapsed():.1f}s{limit} ({phases or 'no phases'})")
+        if self.degradations:
+            logger.info(f"Degradations applied: {', '.join(self.degradations)}")
+
+    def _degrade_below(self, fraction: float, degradation: str) -> bool:
+        if self.fraction_remaining() >= fraction:
+            return False
+        if degradation not in self.degradations:
+            self.degradations.append(degradation)
+            logger.warning(
+                f"Run budget {self.remaining():.1f}s/{self.max_seconds:.0f}s left: {degradation}"
+            )
+        return True
@@ -1,167 +1,376 @@
 import datetime
+import itertools
+import json
+import math
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import IO, Dict, Generator, Iterator, Optional, Set, Tuple
 
+from cache_files import atomic_write_json_lines, file_lock, lock_path_for
 from loguru import logger
-
-# %%
-logger.remove()
-logger.add(
-    "logs/saved-tracks-cache.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="DEBUG",
-)
-logger.add(
-    lambda msg: print(msg, end=""),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="INFO",
+from spotify_pagination import SAVED_TRACKS_PAGE_SIZE, fetch_all_parallel, paginate
+from track_collection import (
+    Track,
+    TrackCollection,
+    cutoff_epoch,
+    iter_added_since,
+    iter_track_artists,
+    iter_track_keys,
+    track_key,
 )
 
 # %%
 CACHE_FILE = Path(__file__).parent.parent / "data" / "saved_tracks.json"
 CACHE_EXPIRY_HOURS = 24
+# Bumped when cached track fields or the file layout change; older caches are refetched
+CACHE_VERSION = 4
+# Oldest expired cache that allow_stale callers will still accept
+STALE_CACHE_MAX_HOURS = 7 * 24
+
+_background_refreshes: Dict[Path, threading.Thread] = {}
+_background_refreshes_lock = threading.Lock()
 
 
 # %%
-def get_saved_tracks(sp, force_refresh: bool = False) -> List[Dict]:
-    cached = _load_from_cache()
-    if cached is not None and not force_refresh:
-        logger.info(f"Loaded {len(cached)} tracks from cache")
-        return cached
+def get_saved_tracks(
+    sp,
+    force_refresh: bool = False,
+    cache_file: Path = CACHE_FILE,
+    allow_stale: bool = False,
+) -> TrackCollection:
+    """Return saved tracks, from cache when fresh.
+
+    With `allow_stale`, an expired (but not older than STALE_CACHE_MAX_HOURS)
+    cache is returned immediately and refreshed on a background thread. Callers
+    that need up-to-date data, like rolling playlists, keep the default.
+    """
+    if not force_refresh:
+        cached = _load_from_cache(cache_file)
+        if cached is not None:
+            logger.info(f"Loaded {len(cached)} tracks from cache")
+            return cached
+
+        if allow_stale:
+            stale = _load_from_cache(cache_file, max_age_hours=STALE_CACHE_MAX_HOURS)
+            if stale is not None:
+                logger.info(
+                    f"Loaded {len(stale)} tracks from expired cache, refreshing in background"
+                )
+                _start_background_refresh(sp, cache_file)
+                return stale
 
     if force_refresh:
         logger.info("Force refresh requested, fetching from API")
     else:
         logger.info("Cache not available or expired, fetching from API")
 
-    tracks = _fetch_from_api(sp)
-    _save_to_cache(tracks)
+    return _refresh_cache(sp, cache_file, force_refresh)
+
+
+def iter_saved_tracks(
+    sp,
+    force_refresh: bool = False,
+    cache_file: Path = CACHE_FILE,
+    allow_stale: bool = False,
+) -> Iterator[Track]:
+    """Yield saved tracks one at a time, most recently added first.
+
+    A fresh (or, with `allow_stale`, recently expired) cache is streamed line
+    by line, so only the track being yielded is held in memory. Otherwise the
+    library is refetched and cached as by `get_saved_tracks` first.
+    """
+    if not force_refresh:
+        rows = _open_cache(cache_file)
+        if rows is None and allow_stale:
+            rows = _open_cache(cache_file, max_age_hours=STALE_CACHE_MAX_HOURS)
+            if rows is not None:
+                logger.info("Streaming tracks from expired cache, refreshing in background")
+                _start_background_refresh(sp, cache_file)
+        if rows is not None:
+            yield from _stream_cached_tracks(sp, cache_file, rows)
+            return
+
+    yield from _refresh_cache(sp, cache_file, force_refresh)
+
+
+def _stream_cached_tracks(
+    sp, cache_file: Path, rows: Generator[Dict, None, None]
+) -> Iterator[Track]:
+    """Yield the cached tracks, refetching the library if a row turns out to be corrupt."""
+    streamed_ids: Set[str] = set()
+    while True:
+        try:
+            row = next(rows, None)
+            if row is None:
+                return
+            track = Track.from_dict(row)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Saved tracks cache is corrupt, refetching: {e}")
+            rows.close()
+            break
+        yield track
+        streamed_ids.add(track.id)
+
+    # Skipped by ID rather than position, since tracks may have been saved or
+    # unsaved since the cache was written
+    refreshed = _refresh_cache(sp, cache_file, force_refresh=True)
+    yield from (track for track in refreshed if track.id not in streamed_ids)
+
+
+def iter_saved_track_keys(
+    sp,
+    force_refresh: bool = False,
+    cache_file: Path = CACHE_FILE,
+    allow_stale: bool = False,
+) -> Iterator[Tuple[str, str]]:
+    """Stream the (name, primary artist) key of each saved track."""
+    return iter_track_keys(iter_saved_tracks(sp, force_refresh, cache_file, allow_stale))
+
+
+def iter_saved_track_artists(
+    sp,
+    force_refresh: bool = False,
+    cache_file: Path = CACHE_FILE,
+    allow_stale: bool = False,
+) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...]]]:
+    """Stream (track ID, artist names, artist IDs) for each saved track."""
+    return iter_track_artists(iter_saved_tracks(sp, force_refresh, cache_file, allow_stale))
+
+
+def get_tracks_in_date_range(
+    sp, days: int, force_refresh: bool = False, cache_file: Path = CACHE_FILE
+) -> TrackCollection:
+    """Return the tracks saved in the last `days` days.
+
+    The cache is read only up to the first older track.
+    """
+    tracks = iter_saved_tracks(sp, force_refresh, cache_file)
+    filtered = TrackCollection.from_tracks(iter_added_since(tracks, cutoff_epoch(days)))
+
+    logger.info(f"Filtered to {len(filtered)} tracks from last {days} days")
+    return filtered
+
+
+def get_saved_track_keys(
+    sp,
+    force_refresh: bool = False,
+    cache_file: Path = CACHE_FILE,
+    allow_stale: bool = False,
+) -> Set[Tuple[str, str]]:
+    keys = set(iter_saved_track_keys(sp, force_refresh, cache_file, allow_stale))
+
+    logger.info(f"Generated {len(keys)} unique track keys for duplicate checking")
+    return keys
+
+
+def build_track_keys(tracks: TrackCollection) -> Set[Tuple[str, str]]:
+    """Track keys of an already loaded collection, read column-wise."""
+    return {
+        track_key(name, primary_artist)
+        for name, primary_artist in zip(tracks.names, tracks.iter_primary_artists())
+    }
+
+
+def load_cached_saved_tracks(cache_file: Path = CACHE_FILE) -> Optional[TrackCollection]:
+    """Return the cached saved tracks whatever their age, without calling the API."""
+    return _load_from_cache(cache_file, max_age_hours=math.inf)
+
+
+def _refresh_cache(sp, cache_file: Path, force_refresh: bool) -> TrackCollection:
+    requested_at = datetime.datetime.now(datetime.timezone.utc)
+
+    # Only one process refetches at a time; the others wait here and reuse its result
+    with file_lock(lock_path_for(cache_file, "refresh.lock")):
+        header = _read_header(cache_file)
+        if header is not None and (
+            (header.get("version") == CACHE_VERSION and _cached_at(header) >= requested_at)
+            or (not force_refresh and _is_cache_valid(header))
+        ):
+            # A corrupt cache loads as None and is refetched like a missing one
+            tracks = _collect_rows(_open_cache(cache_file, max_age_hours=math.inf))
+            if tracks is not None:
+                logger.info(f"Reusing cache refreshed by another process ({len(tracks)} tracks)")
+                return tracks
+
+        tracks = _fetch_from_api(sp)
+        _save_to_cache(tracks, cache_file)
+
     logger.info(f"Fetched and cached {len(tracks)} tracks")
     return tracks
 
 
-def get_tracks_in_date_range(sp, days: int, force_refresh: bool = False) -> List[Dict]:
-    all_tracks = get_saved_tracks(sp, force_refresh)
+def wait_for_background_refresh(timeout: Optional[float] = None) -> None:
+    """Block until background cache refreshes started by this process finish."""
+    with _background_refreshes_lock:
+        threads = list(_background_refreshes.values())
+    for thread in threads:
+        thread.join(timeout)
 
-    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
-        days=days
-    )
 
-    filtered = [
-        t
-        for t in all_tracks
-        if datetime.datetime.fromisoformat(t["added_at"].replace("Z", "+00:00"))
-        >= cutoff_date
-    ]
+def _start_background_refresh(sp, cache_file: Path) -> None:
+    with _background_refreshes_lock:
+        running = _background_refreshes.get(cache_file)
+        if running and running.is_alive():
+            return
 
-    logger.info(
-        f"Filtered to {len(filtered)} tracks from last {days} days (total: {len(all_tracks)})"
-    )
-    return filtered
+        # Not a daemon: the process finishes the refresh before exiting
+        thread = threading.Thread(
+            target=_background_refresh,
+            args=(sp, cache_file),
+            name=f"saved-tracks-refresh-{cache_file.name}",
+        )
+        _background_refreshes[cache_file] = thread
+        thread.start()
 
 
-def get_saved_track_keys(sp, force_refresh: bool = False) -> Set[Tuple[str, str]]:
-    tracks = get_saved_tracks(sp, force_refresh)
+def _background_refresh(sp, cache_file: Path) -> None:
+    try:
+        # Skip if another process is already refreshing; it will write the cache
+        with file_lock(lock_path_for(cache_file, "refresh.lock"), blocking=False):
+            tracks = _fetch_from_api(sp)
+            _save_to_cache(tracks, cache_file)
+        logger.info(f"Background refresh cached {len(tracks)} tracks")
+    except BlockingIOError:
+        logger.debug("Another process is refreshing the cache, skipping background refresh")
+    except Exception as e:
+        logger.error(f"Background cache refresh failed: {e}")
 
-    keys = {
-        (t["name"].lower().strip(), t["primary_artist"].lower().strip()) for t in tracks
-    }
 
-    logger.info(f"Generated {len(keys)} unique track keys for duplicate checking")
-    return keys
+# The cache is JSON Lines: a header object ({version, cached_at}), then one track per line
 
 
-def _load_from_cache() -> Optional[List[Dict]]:
-    if not CACHE_FILE.exists():
-        logger.debug("Cache file does not exist")
+def _parse_header(line: str) -> Optional[Dict]:
+    try:
+        header = json.loads(line)
+        _cached_at(header)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        # Includes caches written before the JSON Lines layout
+        logger.debug("Cache header is unreadable")
         return None
+    return header if isinstance(header, dict) else None
+
 
+def _read_header(cache_file: Path) -> Optional[Dict]:
     try:
-        import json
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return _parse_header(f.readline())
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.error(f"Error reading cache: {e}")
+        return None
 
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            cache_data = json.load(f)
 
-        if not _is_cache_valid(cache_data):
-            logger.debug("Cache exists but is expired")
-            return None
+def _open_cache(
+    cache_file: Path = CACHE_FILE, max_age_hours: Optional[float] = None
+) -> Optional[Generator[Dict, None, None]]:
+    """Return a stream of the cached track dicts, or None if missing or expired.
 
-        cached_at = datetime.datetime.fromisoformat(
-            cache_data["cached_at"].replace("Z", "+00:00")
-        )
-        age = datetime.datetime.now(datetime.timezone.utc) - cached_at
+    The header is checked on the same open file that is then streamed, so a
+    concurrent refresh (which renames a new file into place) can't mix the
+    old header with new tracks.
+    """
+    try:
+        f = open(cache_file, "r", encoding="utf-8")
+    except FileNotFoundError:
+        logger.debug("Cache file does not exist")
+        return None
+    except OSError as e:
+        logger.error(f"Error loading cache: {e}")
+        return None
 
-        logger.debug(
-            f"Cache loaded: {cache_data['track_count']} tracks, {age.seconds // 3600}h old"
-        )
-        return cache_data["tracks"]
+    header = _parse_header(f.readline())
+    if header is None or not _is_cache_valid(header, max_age_hours):
+        f.close()
+        return None
+    return _iter_rows(f)
+
+
+def _iter_rows(f: IO[str]) -> Generator[Dict, None, None]:
+    with f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _load_from_cache(
+    cache_file: Path = CACHE_FILE, max_age_hours: Optional[float] = None
+) -> Optional[TrackCollection]:
+    return _collect_rows(_open_cache(cache_file, max_age_hours))
+
+
+def _collect_rows(rows: Optional[Iterator[Dict]]) -> Optional[TrackCollection]:
+    if rows is None:
+        return None
+
+    try:
+        return TrackCollection.from_dicts(rows)
     except Exception as e:
         logger.error(f"Error loading cache: {e}")
         return None
 
 
-def _save_to_cache(tracks: List[Dict]) -> None:
+def _save_to_cache(tracks: TrackCollection, cache_file: Path = CACHE_FILE) -> None:
+    header = {
+        "version": CACHE_VERSION,
+        "cached_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
     try:
-        import json
+        # Written to a temp file and renamed, so concurrent readers never see a partial file
+        atomic_write_json_lines(
+            cache_file,
+            itertools.chain([header], (track.to_dict() for track in tracks)),
+            ensure_ascii=False,
+        )
 
-        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f"Cache saved to {cache_file}")
+    except Exception as e:
+        logger.error(f"Error saving cache: {e}")
 
-        cache_data = {
-            "cached_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-            "track_count": len(tracks),
-            "tracks": tracks,
-        }
 
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+def _fetch_from_api(sp, parallel: bool = True) -> TrackCollection:
+    if parallel:
+        items = fetch_all_parallel(
+            lambda limit, offset: sp.current_user_saved_tracks(limit=limit, offset=offset),
+            SAVED_TRACKS_PAGE_SIZE,
+        )
+    else:
+        items = paginate(sp, sp.current_user_saved_tracks(limit=SAVED_TRACKS_PAGE_SIZE))
+
+    tracks = TrackCollection()
+    for item in items:
+        track = item["track"]
+        if not track:
+            continue
+
+        tracks.append(
+            id=track["id"],
+            name=track["name"],
+            artists=[a["name"] for a in track["artists"]],
+            # Local files have artists without IDs; keep the columns aligned
+            artist_ids=[a.get("id") or "" for a in track["artists"]],
+            album=track["album"]["name"],
+            duration_ms=track["duration_ms"],
+            added_at=item["added_at"],
+        )
 
-        logger.debug(f"Cache saved to {CACHE_FILE}")
-    except Exception as e:
-        logger.error(f"Error saving cache: {e}")
+    # Cached libraries are stored most recent first so date windows can bisect
+    return tracks.sorted_by_added()
 
 
-def _fetch_from_api(sp) -> List[Dict]:
-    tracks = []
-    results = sp.current_user_saved_tracks(limit=50)
-
-    while results:
-        for item in results["items"]:
-            track = item["track"]
-            if not track:
-                continue
-
-            primary_artist = (
-                track["artists"][0]["name"] if track["artists"] else "Unknown"
-            )
-
-            tracks.append(
-                {
-                    "id": track["id"],
-                    "name": track["name"],
-                    "primary_artist": primary_artist,
-                    "artists": [a["name"] for a in track["artists"]],
-                    "added_at": item["added_at"],
-                    "album": track["album"]["name"],
-                    "duration_ms": track["duration_ms"],
-                    "spotify_url": track["external_urls"]["spotify"],
-                }
-            )
-
-        if results["next"]:
-            results = sp.next(results)
-        else:
-            break
+def _cached_at(cache_data: Dict) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(cache_data["cached_at"].replace("Z", "+00:00"))
 
-    return tracks
 
+def _is_cache_valid(cache_data: Dict, max_age_hours: Optional[float] = None) -> bool:
+    if cache_data.get("version") != CACHE_VERSION:
+        logger.debug("Cache was written by an older version")
+        return False
 
-def _is_cache_valid(cache_data: Dict) -> bool:
-    cached_at = datetime.datetime.fromisoformat(
-        cache_data["cached_at"].replace("Z", "+00:00")
-    )
-    age = datetime.datetime.now(datetime.timezone.utc) - cached_at
+    if max_age_hours is None:
+        max_age_hours = CACHE_EXPIRY_HOURS
+    age = datetime.datetime.now(datetime.timezone.utc) - _cached_at(cache_data)
 
-    is_valid = age.total_seconds() < CACHE_EXPIRY_HOURS * 60 * 60
+    is_valid = age.total_seconds() < max_age_hours * 60 * 60
 
     if is_valid:
         logger.debug(f"Cache is valid ({age.seconds // 3600}h old)")
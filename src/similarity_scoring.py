@@ -0,0 +1,158 @@
+import math
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence
+
+from generative_discovery import normalize_artist_name
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - exercised when numpy is not installed
+    HAS_NUMPY = False
+
+
+@dataclass(frozen=True)
+class ScoredCandidate:
+    name: str
+    score: float
+    seed_count: int
+    best_seed: str
+    best_match: float
+
+
+class SimilarityMatrix:
+    """Sparse seed × candidate matrix of Last.fm match scores.
+
+    Stored as coordinate arrays (row, column, weight) with candidate names
+    interned by normalized name, so a candidate suggested by many seeds is
+    one column. Scoring is a single weighted column sum over all entries,
+    vectorized with numpy when it is installed.
+    """
+
+    __slots__ = ("seeds", "candidates", "_columns", "_rows", "_cols", "_weights")
+
+    def __init__(self) -> None:
+        self.seeds: list[str] = []
+        self.candidates: list[str] = []
+        self._columns: dict[str, int] = {}
+        self._rows = array("I")
+        self._cols = array("I")
+        self._weights = array("d")
+
+    def add_seed(self, seed_name: str, similar: Iterable[dict[str, Any]]) -> None:
+        row = len(self.seeds)
+        self.seeds.append(seed_name)
+        for candidate in similar:
+            name = candidate.get("name") or ""
+            key = normalize_artist_name(name)
+            try:
+                match = float(candidate.get("match") or 0)
+            except (TypeError, ValueError):
+                continue
+            if not key or match <= 0:
+                continue
+
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = len(self.candidates)
+                self.candidates.append(name)
+            self._rows.append(row)
+            self._cols.append(column)
+            self._weights.append(match)
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def rank(
+        self,
+        excluded_names: Iterable[str] = (),
+        seed_weights: Sequence[float] | None = None,
+        k: int | None = None,
+    ) -> list[ScoredCandidate]:
+        """Rank candidates by summed seed-weighted match, best first.
+
+        `seed_weights` (one per seed, default 1.0) express how strongly the
+        library leans on each seed; excluded names (followed artists) are
+        never returned.
+        """
+        if seed_weights is None:
+            seed_weights = [1.0] * len(self.seeds)
+        if len(seed_weights) != len(self.seeds):
+            raise ValueError("Expected one weight per seed")
+
+        if HAS_NUMPY:
+            scores, counts, best_rows, best_matches = self._score_numpy(seed_weights)
+        else:
+            scores, counts, best_rows, best_matches = self._score_python(seed_weights)
+
+        excluded = {normalize_artist_name(name) for name in excluded_names}
+        ranked = sorted(
+            (
+                column
+                for column, name in enumerate(self.candidates)
+                if counts[column] and normalize_artist_name(name) not in excluded
+            ),
+            key=lambda column: scores[column],
+            reverse=True,
+        )
+        if k is not None:
+            ranked = ranked[:k]
+
+        return [
+            ScoredCandidate(
+                name=self.candidates[column],
+                score=float(scores[column]),
+                seed_count=int(counts[column]),
+                best_seed=self.seeds[best_rows[column]],
+                best_match=float(best_matches[column]),
+            )
+            for column in ranked
+        ]
+
+    def _score_numpy(self, seed_weights: Sequence[float]) -> tuple:
+        size = len(self.candidates)
+        rows = np.frombuffer(self._rows, dtype=np.uint32)
+        cols = np.frombuffer(self._cols, dtype=np.uint32)
+        weights = np.frombuffer(self._weights, dtype=np.float64)
+        contributions = np.asarray(seed_weights, dtype=np.float64)[rows] * weights
+
+        scores = np.bincount(cols, weights=contributions, minlength=size)
+        counts = np.bincount(cols, minlength=size)
+
+        # The seed contributing most to each candidate is used for attribution
+        best = np.full(size, -1.0)
+        np.maximum.at(best, cols, contributions)
+        is_best = contributions == best[cols]
+        best_rows = np.zeros(size, dtype=np.int64)
+        best_matches = np.zeros(size)
+        best_rows[cols[is_best]] = rows[is_best]
+        best_matches[cols[is_best]] = weights[is_best]
+        return scores, counts, best_rows, best_matches
+
+    def _score_python(self, seed_weights: Sequence[float]) -> tuple:
+        size = len(self.candidates)
+        scores = array("d", bytes(8 * size))
+        counts = array("I", bytes(4 * size))
+        best = array("d", [-1.0]) * size
+        best_rows = array("I", bytes(4 * size))
+        best_matches = array("d", bytes(8 * size))
+        for row, column, weight in zip(self._rows, self._cols, self._weights):
+            contribution = seed_weights[row] * weight
+            scores[column] += contribution
+            counts[column] += 1
+            if contribution > best[column]:
+                best[column] = contribution
+                best_rows[column] = row
+                best_matches[column] = weight
+        return scores, counts, best_rows, best_matches
+
+
+def library_seed_weights(
+    seed_names: Sequence[str], saved_track_keys: Iterable[tuple[str, str]]
+) -> list[float]:
+    """Weight each seed by how many saved tracks it has, on a log scale."""
+    track_counts = Counter(artist for _, artist in saved_track_keys)
+    return [1.0 + math.log1p(track_counts[name.lower().strip()]) for name in seed_names]
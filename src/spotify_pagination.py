@@ -0,0 +1,85 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterator
+
+
+# Largest page size each Spotify list endpoint accepts.
+SAVED_TRACKS_PAGE_SIZE = 50
+FOLLOWED_ARTISTS_PAGE_SIZE = 50
+USER_PLAYLISTS_PAGE_SIZE = 50
+PLAYLIST_ITEMS_PAGE_SIZE = 100
+ARTIST_ALBUMS_PAGE_SIZE = 50
+ALBUM_TRACKS_PAGE_SIZE = 50
+
+# Requests in flight for offset-based parallel fetches.
+PARALLEL_FETCH_WORKERS = 8
+
+
+def paginate(
+    sp: Any,
+    first_page: dict[str, Any] | None,
+    container_key: str | None = None,
+    prefetch: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """Lazily yield items from a Spotify paging object, following `next` links.
+
+    `container_key` names the key that wraps the paging object (followed artists
+    are returned under "artists"). With `prefetch`, the next page is requested in
+    the background while the current page is consumed. No further pages are
+    requested once the consumer stops iterating, so lookups that break early
+    should pass `prefetch=False` to avoid paying for a speculative page.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending: Future | None = None
+    page = first_page
+
+    try:
+        while page:
+            body = (page.get(container_key) or {}) if container_key else page
+            has_next = bool(body.get("next"))
+            if has_next and executor:
+                pending = executor.submit(sp.next, body)
+
+            yield from body.get("items") or []
+
+            if not has_next:
+                break
+            if pending:
+                page = pending.result()
+                pending = None
+            else:
+                page = sp.next(body)
+    finally:
+        if pending:
+            pending.cancel()
+        if executor:
+            executor.shutdown(wait=False)
+
+
+def fetch_all_parallel(
+    fetch_page: Callable[[int, int], dict[str, Any]],
+    page_size: int,
+    max_workers: int = PARALLEL_FETCH_WORKERS,
+) -> list[dict[str, Any]]:
+    """Fetch every item of an offset-paged collection, in order.
+
+    `fetch_page(limit, offset)` returns one Spotify paging object. The first page
+    is fetched alone to learn `total`; the remaining offsets are then fetched with
+    at most `max_workers` requests in flight and reassembled in offset order.
+    Throttled requests are retried by the client (see ScheduledSpotify).
+    """
+    first_page = fetch_page(page_size, 0)
+    if not first_page:
+        return []
+
+    items = list(first_page.get("items") or [])
+    total = first_page.get("total") or len(items)
+    offsets = range(page_size, total, page_size)
+    if not offsets:
+        return items
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = executor.map(lambda offset: fetch_page(page_size, offset), offsets)
+        for page in pages:
+            items.extend(page.get("items") or [])
+
+    return items
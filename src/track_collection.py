@@ -0,0 +1,306 @@
+import datetime
+import sys
+from array import array
+from bisect import bisect_right
+from operator import neg
+from typing import Any, Iterable, Iterator, NamedTuple
+
+
+SPOTIFY_TRACK_URL = "https://open.spotify.com/track/{}"
+UNKNOWN_ARTIST = "Unknown"
+
+
+def parse_added_at(value: str) -> int:
+    """Convert a Spotify `added_at` timestamp to epoch seconds."""
+    return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def cutoff_epoch(days: float, now: datetime.datetime | None = None) -> int:
+    """Epoch seconds `days` before `now` (default: the current time)."""
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return int((now - datetime.timedelta(days=days)).timestamp())
+
+
+class Track(NamedTuple):
+    """One saved track, materialized on demand from a TrackCollection row."""
+
+    id: str
+    name: str
+    artists: tuple[str, ...]
+    album: str
+    duration_ms: int
+    added_at: str
+    artist_ids: tuple[str, ...] = ()
+    added_at_epoch: int = 0
+
+    @classmethod
+    def from_dict(cls, track: dict[str, Any]) -> "Track":
+        return cls(
+            id=track["id"],
+            name=track["name"],
+            artists=tuple(track.get("artists") or ()),
+            album=track["album"],
+            duration_ms=track["duration_ms"],
+            added_at=track["added_at"],
+            artist_ids=tuple(track.get("artist_ids") or ()),
+            added_at_epoch=track.get("added_at_epoch") or parse_added_at(track["added_at"]),
+        )
+
+    @property
+    def primary_artist(self) -> str:
+        return self.artists[0] if self.artists else UNKNOWN_ARTIST
+
+    @property
+    def spotify_url(self) -> str:
+        return SPOTIFY_TRACK_URL.format(self.id)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "primary_artist": self.primary_artist,
+            "artists": list(self.artists),
+            "artist_ids": list(self.artist_ids),
+            "added_at": self.added_at,
+            "added_at_epoch": self.added_at_epoch,
+            "album": self.album,
+            "duration_ms": self.duration_ms,
+            "spotify_url": self.spotify_url,
+        }
+
+
+def track_key(name: str, primary_artist: str) -> tuple[str, str]:
+    """Normalized (name, primary artist) pair, matching versions of the same track."""
+    return (name.lower().strip(), primary_artist.lower().strip())
+
+
+def iter_track_keys(tracks: Iterable[Track]) -> Iterator[tuple[str, str]]:
+    """Keys-only projection of a track stream."""
+    for track in tracks:
+        yield track_key(track.name, track.primary_artist)
+
+
+def iter_track_artists(
+    tracks: Iterable[Track],
+) -> Iterator[tuple[str, tuple[str, ...], tuple[str, ...]]]:
+    """Artists-only projection of a track stream: (track ID, artist names, artist IDs)."""
+    for track in tracks:
+        yield track.id, track.artists, track.artist_ids
+
+
+def iter_added_since(tracks: Iterable[Track], cutoff: int) -> Iterator[Track]:
+    """Tracks added at or after epoch `cutoff` from a most-recent-first stream.
+
+    Stops at the first older track, so the rest of the stream is never read.
+    """
+    for track in tracks:
+        if track.added_at_epoch < cutoff:
+            return
+        yield track
+
+
+class _InternTable:
+    """Maps repeated values to small integer codes, storing each value once."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self._codes: dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class TrackCollection:
+    """Column-oriented store for saved tracks.
+
+    Each field lives in its own column instead of one dict per track. Artist
+    lists and album names repeat heavily across a library, so they are interned
+    once and referenced by integer code; durations and codes are packed arrays.
+    An artist group is the pair of (names, IDs) tuples for one track.
+    Spotify URLs and primary artists are derived from the stored columns.
+
+    `added_epochs` holds each `added_at` as epoch seconds, parsed once on
+    ingest. Collections from the cache are ordered most recent first, so date
+    windows are a binary search (see `added_since`).
+    """
+
+    __slots__ = (
+        "ids",
+        "names",
+        "added_at",
+        "added_epochs",
+        "durations_ms",
+        "_artist_codes",
+        "_album_codes",
+        "_artist_groups",
+        "_albums",
+    )
+
+    def __init__(self) -> None:
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.added_at: list[str] = []
+        self.added_epochs = array("q")
+        self.durations_ms = array("I")
+        self._artist_codes = array("I")
+        self._album_codes = array("I")
+        self._artist_groups = _InternTable()
+        self._albums = _InternTable()
+
+    @classmethod
+    def from_dicts(cls, tracks: Iterable[dict[str, Any]]) -> "TrackCollection":
+        collection = cls()
+        for track in tracks:
+            collection.append(
+                id=track["id"],
+                name=track["name"],
+                artists=track.get("artists") or (),
+                artist_ids=track.get("artist_ids") or (),
+                album=track["album"],
+                duration_ms=track["duration_ms"],
+                added_at=track["added_at"],
+                added_at_epoch=track.get("added_at_epoch"),
+            )
+        return collection
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Track]) -> "TrackCollection":
+        collection = cls()
+        for track in tracks:
+            collection.append(
+                id=track.id,
+                name=track.name,
+                artists=track.artists,
+                artist_ids=track.artist_ids,
+                album=track.album,
+                duration_ms=track.duration_ms,
+                added_at=track.added_at,
+                added_at_epoch=track.added_at_epoch,
+            )
+        return collection
+
+    def append(
+        self,
+        id: str,
+        name: str,
+        artists: Iterable[str],
+        album: str,
+        duration_ms: int,
+        added_at: str,
+        artist_ids: Iterable[str] = (),
+        added_at_epoch: int | None = None,
+    ) -> None:
+        artist_group = (
+            tuple(sys.intern(artist) for artist in artists),
+            tuple(sys.intern(artist_id) for artist_id in artist_ids),
+        )
+        self.ids.append(id)
+        self.names.append(name)
+        self.added_at.append(added_at)
+        self.added_epochs.append(
+            parse_added_at(added_at) if added_at_epoch is None else added_at_epoch
+        )
+        self.durations_ms.append(duration_ms)
+        self._artist_codes.append(self._artist_groups.code(artist_group))
+        self._album_codes.append(self._albums.code(sys.intern(album)))
+
+    def take(self, indices: Iterable[int]) -> "TrackCollection":
+        """Return a new collection holding the given rows, in the given order."""
+        subset = TrackCollection()
+        # Rows keep pointing into the same intern tables
+        subset._artist_groups = self._artist_groups
+        subset._albums = self._albums
+        for index in indices:
+            subset.ids.append(self.ids[index])
+            subset.names.append(self.names[index])
+            subset.added_at.append(self.added_at[index])
+            subset.added_epochs.append(self.added_epochs[index])
+            subset.durations_ms.append(self.durations_ms[index])
+            subset._artist_codes.append(self._artist_codes[index])
+            subset._album_codes.append(self._album_codes[index])
+        return subset
+
+    def is_sorted_by_added(self) -> bool:
+        epochs = self.added_epochs
+        return all(epochs[i] >= epochs[i + 1] for i in range(len(epochs) - 1))
+
+    def sorted_by_added(self) -> "TrackCollection":
+        """Return the collection most recent first, or itself if already in that order."""
+        if self.is_sorted_by_added():
+            return self
+        return self.take(
+            sorted(range(len(self)), key=self.added_epochs.__getitem__, reverse=True)
+        )
+
+    def added_since(self, cutoff: int) -> "TrackCollection":
+        """Return the tracks added at or after epoch `cutoff`.
+
+        Expects most-recent-first order; the result is the prefix found by
+        binary search, so no timestamps are parsed or compared beyond log n.
+        """
+        size = bisect_right(self.added_epochs, -cutoff, key=neg)
+        return self.take(range(size))
+
+    def artists_at(self, index: int) -> tuple[str, ...]:
+        return self._artist_groups.values[self._artist_codes[index]][0]
+
+    def artist_ids_at(self, index: int) -> tuple[str, ...]:
+        return self._artist_groups.values[self._artist_codes[index]][1]
+
+    def primary_artist_at(self, index: int) -> str:
+        artists = self.artists_at(index)
+        return artists[0] if artists else UNKNOWN_ARTIST
+
+    def iter_artists(self) -> Iterator[tuple[str, ...]]:
+        """Yield each track's artist names without materializing whole rows."""
+        groups = self._artist_groups.values
+        for code in self._artist_codes:
+            yield groups[code][0]
+
+    def iter_artist_groups(self) -> Iterator[tuple[tuple[str, ...], tuple[str, ...]]]:
+        """Yield each track's (artist names, artist IDs) pair."""
+        groups = self._artist_groups.values
+        for code in self._artist_codes:
+            yield groups[code]
+
+    def iter_primary_artists(self) -> Iterator[str]:
+        for artists in self.iter_artists():
+            yield artists[0] if artists else UNKNOWN_ARTIST
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        return [track.to_dict() for track in self]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> Track:
+        return Track(
+            id=self.ids[index],
+            name=self.names[index],
+            artists=self.artists_at(index),
+            album=self._albums.values[self._album_codes[index]],
+            duration_ms=self.durations_ms[index],
+            added_at=self.added_at[index],
+            artist_ids=self.artist_ids_at(index),
+            added_at_epoch=self.added_epochs[index],
+        )
+
+    def __iter__(self) -> Iterator[Track]:
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TrackCollection):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"TrackCollection({len(self)} tracks)"
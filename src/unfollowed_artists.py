@@ -0,0 +1,158 @@
+import datetime
+import heapq
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from cache_files import atomic_write_json, file_lock, lock_path_for
+from loguru import logger
+
+
+FOLLOWED_EXPIRY_HOURS = 24
+
+# (track ID, artist names, artist IDs), as streamed by `iter_saved_track_artists`
+ArtistRow = tuple[str, tuple[str, ...], tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class ArtistCount:
+    artist_id: str
+    name: str
+    count: int
+
+
+@dataclass
+class ArtistAggregate:
+    """Persisted per-artist saved-track counts, kept current from library deltas.
+
+    `track_artists` remembers which artists each counted track contributed to,
+    so an unsaved track can be subtracted without refetching it.
+    """
+
+    track_artists: dict[str, list[str]] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+    names: dict[str, str] = field(default_factory=dict)
+    followed: set[str] = field(default_factory=set)
+    followed_at: str | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "ArtistAggregate":
+        """Load the aggregate, starting empty if none has been saved or it is unreadable."""
+        if not path.exists():
+            return cls()
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(
+                track_artists=data.get("track_artists", {}),
+                counts=data.get("counts", {}),
+                names=data.get("names", {}),
+                followed=set(data.get("followed", [])),
+                followed_at=data.get("followed_at"),
+            )
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            logger.error(f"Error loading artist aggregate {path}: {e}")
+            return cls()
+
+    def save(self, path: Path) -> None:
+        data = {
+            "track_artists": self.track_artists,
+            "counts": self.counts,
+            "names": self.names,
+            "followed": sorted(self.followed),
+            "followed_at": self.followed_at,
+        }
+        with file_lock(lock_path_for(path)):
+            atomic_write_json(path, data, ensure_ascii=False)
+
+    def apply_library(self, rows: Iterable[ArtistRow]) -> tuple[int, int]:
+        """Count newly saved tracks and subtract unsaved ones, in one pass over `rows`.
+
+        Returns the number of (added, removed) tracks.
+        """
+        current_ids: set[str] = set()
+        added = 0
+        for track_id, names, artist_ids in rows:
+            current_ids.add(track_id)
+            if track_id in self.track_artists:
+                continue
+            counted = []
+            for artist_id, name in zip(artist_ids, names):
+                if not artist_id or artist_id in counted:
+                    continue
+                counted.append(artist_id)
+                self.counts[artist_id] = self.counts.get(artist_id, 0) + 1
+                self.names[artist_id] = name
+            self.track_artists[track_id] = counted
+            added += 1
+
+        removed = [track_id for track_id in self.track_artists if track_id not in current_ids]
+        for track_id in removed:
+            for artist_id in self.track_artists.pop(track_id):
+                self._decrement(artist_id)
+        return added, len(removed)
+
+    def apply_followed(self, artist_ids: Iterable[str]) -> tuple[int, int]:
+        """Replace the followed set, returning the number of (followed, unfollowed)."""
+        current = set(artist_ids)
+        delta = (len(current - self.followed), len(self.followed - current))
+        self.followed = current
+        self.followed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return delta
+
+    def followed_is_fresh(self, max_age_hours: float = FOLLOWED_EXPIRY_HOURS) -> bool:
+        if not self.followed_at:
+            return False
+        age = datetime.datetime.now(datetime.timezone.utc) - datetime.datetime.fromisoformat(
+            self.followed_at
+        )
+        return age.total_seconds() < max_age_hours * 60 * 60
+
+    def top_unfollowed(self, k: int | None = None) -> list[ArtistCount]:
+        """Return the `k` most-saved unfollowed artists (all of them when k is None)."""
+        return top_unfollowed(self.counts, self.names, self.followed, k)
+
+    def _decrement(self, artist_id: str) -> None:
+        count = self.counts.get(artist_id, 0) - 1
+        if count > 0:
+            self.counts[artist_id] = count
+        else:
+            self.counts.pop(artist_id, None)
+            self.names.pop(artist_id, None)
+
+
+def count_artists(rows: Iterable[ArtistRow]) -> tuple[Counter, dict[str, str]]:
+    """Count saved tracks per artist ID for an ad-hoc slice of the library."""
+    counts: Counter = Counter()
+    names: dict[str, str] = {}
+    for _, track_names, artist_ids in rows:
+        for artist_id, name in dict(zip(artist_ids, track_names)).items():
+            if not artist_id:
+                continue
+            counts[artist_id] += 1
+            names[artist_id] = name
+    return counts, names
+
+
+def top_unfollowed(
+    counts: dict[str, int],
+    names: dict[str, str],
+    followed: set[str],
+    k: int | None = None,
+) -> list[ArtistCount]:
+    """Select the highest-count unfollowed artists with a heap instead of a full sort."""
+    candidates: Iterable[tuple[int, str]] = (
+        (count, artist_id) for artist_id, count in counts.items() if artist_id not in followed
+    )
+    if k is None:
+        ranked = sorted(candidates, reverse=True)
+    else:
+        ranked = heapq.nlargest(k, candidates)
+
+    return [
+        ArtistCount(artist_id, names.get(artist_id, artist_id), count)
+        for count, artist_id in ranked
+    ]
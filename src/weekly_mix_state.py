@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from cache_files import atomic_write_json, file_lock, lock_path_for
+from spotify_pagination import USER_PLAYLISTS_PAGE_SIZE, paginate
 
 CURRENT_MARKER_PREFIX = "Generated for ISO week"
 STATE_PATH = Path(__file__).parent.parent / "data" / "weekly_mix_runs.json"
@@ -54,19 +56,18 @@ def record_weekly_mix_run(
     playlist_url: str | None = None,
 ) -> None:
     """Record a successfully created or discovered weekly mix."""
-    state = load_weekly_mix_runs(state_path)
-    state[identity.key] = {
-        "playlist_id": playlist_id,
-        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-        "name": identity.playlist_name,
-    }
-    if playlist_url:
-        state[identity.key]["playlist_url"] = playlist_url
+    # Hold the lock across read-modify-write so concurrent runs don't drop entries
+    with file_lock(lock_path_for(state_path)):
+        state = load_weekly_mix_runs(state_path)
+        state[identity.key] = {
+            "playlist_id": playlist_id,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "name": identity.playlist_name,
+        }
+        if playlist_url:
+            state[identity.key]["playlist_url"] = playlist_url
 
-    state_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(state_path, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2, sort_keys=True)
-        f.write("\n")
+        atomic_write_json(state_path, state, indent=2, sort_keys=True)
 
 
 def find_current_week_playlist(
@@ -80,20 +81,14 @@ def find_current_week_playlist(
     if recorded_run:
         return recorded_run
 
-    playlists = sp.current_user_playlists(limit=50)
-    while playlists:
-        for playlist in playlists.get("items", []):
-            if playlist.get("name") != identity.playlist_name:
-                continue
-            if playlist.get("owner", {}).get("id") != user_id:
-                continue
-            if identity.description_marker in (playlist.get("description") or ""):
-                return playlist
-
-        if playlists.get("next"):
-            playlists = sp.next(playlists)
-        else:
-            break
+    first_page = sp.current_user_playlists(limit=USER_PLAYLISTS_PAGE_SIZE)
+    for playlist in paginate(sp, first_page, prefetch=False):
+        if playlist.get("name") != identity.playlist_name:
+            continue
+        if playlist.get("owner", {}).get("id") != user_id:
+            continue
+        if identity.description_marker in (playlist.get("description") or ""):
+            return playlist
 
     return None
 
@@ -0,0 +1,229 @@
+import datetime
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from artist_catalog import ArtistCatalog
+
+
+class FakeSpotify:
+    def __init__(self):
+        self.album_calls = []
+        self.track_calls = []
+
+    def artist_albums(self, artist_id, album_type=None, limit=20):
+        self.album_calls.append(artist_id)
+        return {
+            "items": [
+                {
+                    "id": "album-1",
+                    "name": "First",
+                    "artists": [{"id": artist_id, "name": "Artist"}],
+                    "images": ["dropped"],
+                },
+                {
+                    "id": "compilation",
+                    "name": "Various",
+                    "artists": [{"id": "someone-else", "name": "Other"}],
+                },
+            ],
+            "next": None,
+        }
+
+    def album_tracks(self, album_id, limit=50):
+        self.track_calls.append(album_id)
+        return {
+            "items": [
+                {
+                    "id": "track-1",
+                    "name": "Song",
+                    "duration_ms": 1000,
+                    "artists": [{"id": "artist-1", "name": "Artist"}],
+                    "preview_url": "dropped",
+                }
+            ],
+            "next": None,
+        }
+
+
+def test_artist_albums_are_trimmed_and_cached(tmp_path):
+    sp = FakeSpotify()
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+
+    albums = catalog.artist_albums(sp, "artist-1")
+    catalog.artist_albums(sp, "artist-1")
+
+    assert [album["id"] for album in albums] == ["album-1"]
+    assert "images" not in albums[0]
+    assert sp.album_calls == ["artist-1"]
+
+
+def test_catalog_round_trips_through_disk(tmp_path):
+    sp = FakeSpotify()
+    path = tmp_path / "catalog.json"
+    catalog = ArtistCatalog(path)
+    catalog.album_tracks(sp, "album-1")
+    catalog.save()
+
+    reloaded = ArtistCatalog.load(path)
+    tracks = reloaded.album_tracks(sp, "album-1")
+
+    assert tracks == (
+        {
+            "id": "track-1",
+            "name": "Song",
+            "duration_ms": 1000,
+            "artists": [{"id": "artist-1", "name": "Artist"}],
+        },
+    )
+    assert sp.track_calls == ["album-1"]
+
+
+def test_expired_entries_are_refetched(tmp_path):
+    sp = FakeSpotify()
+    fetched_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=8)
+    catalog = ArtistCatalog(
+        tmp_path / "catalog.json",
+        expiry_days=7,
+        albums={"album-1": {"tracks": [], "fetched_at": fetched_at.isoformat()}},
+    )
+
+    tracks = catalog.album_tracks(sp, "album-1")
+
+    assert len(tracks) == 1
+    assert sp.track_calls == ["album-1"]
+
+
+def test_cached_album_tracks_ignores_expiry_and_never_calls_api(tmp_path):
+    sp = FakeSpotify()
+    catalog = ArtistCatalog(tmp_path / "catalog.json", expiry_days=0)
+    albums = catalog.artist_albums(sp, "artist-1")
+    catalog.album_tracks(sp, albums[0]["id"])
+
+    cached = catalog.cached_album_tracks("artist-1")
+
+    assert [[track["id"] for track in tracks] for tracks in cached] == [["track-1"]]
+    assert catalog.cached_album_tracks("unknown") == []
+    assert sp.album_calls == ["artist-1"]
+
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    release = threading.Event()
+
+    class SlowSpotify(FakeSpotify):
+        def artist_albums(self, artist_id, album_type=None, limit=20):
+            release.wait()
+            return super().artist_albums(artist_id, album_type, limit)
+
+    sp = SlowSpotify()
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(catalog.artist_albums, sp, "artist-1") for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while catalog._in_flight.coalesced < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        # Released either way, so a failure doesn't leave the workers blocked
+        release.set()
+        if catalog._in_flight.coalesced < 3:
+            pytest.fail("Concurrent misses were not coalesced")
+        results = [future.result() for future in futures]
+
+    assert sp.album_calls == ["artist-1"]
+    assert all(result == results[0] for result in results)
+
+
+class PagedSpotify:
+    """Two pages of albums; the second is only reachable through `next`."""
+
+    def __init__(self, album_ids):
+        self.album_ids = album_ids
+        self.calls = []
+
+    def _page(self, offset):
+        items = [
+            {"id": album_id, "name": album_id, "artists": [{"id": "artist-1", "name": "A"}]}
+            for album_id in self.album_ids[offset : offset + 2]
+        ]
+        has_next = offset + 2 < len(self.album_ids)
+        return {
+            "items": items,
+            "total": len(self.album_ids),
+            "next": offset + 2 if has_next else None,
+        }
+
+    def artist_albums(self, artist_id, album_type=None, limit=20):
+        self.calls.append("first")
+        return self._page(0)
+
+    def next(self, page):
+        self.calls.append("next")
+        return self._page(page["next"])
+
+
+def test_refresh_fetches_only_first_page_when_nothing_is_new(tmp_path):
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+    catalog.artist_albums(PagedSpotify(["new", "b", "c"]), "artist-1")
+
+    sp = PagedSpotify(["new", "b", "c"])
+    albums = catalog.artist_albums(sp, "artist-1", refresh=True)
+
+    assert sp.calls == ["first"]
+    assert [album["id"] for album in albums] == ["new", "b", "c"]
+
+
+def test_refresh_repages_when_total_changes(tmp_path):
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+    catalog.artist_albums(PagedSpotify(["b", "c", "d"]), "artist-1")
+
+    sp = PagedSpotify(["b", "c", "d", "new"])
+    albums = catalog.artist_albums(sp, "artist-1", refresh=True)
+
+    assert sp.calls == ["first", "next"]
+    assert [album["id"] for album in albums] == ["b", "c", "d", "new"]
+
+
+def test_offline_catalog_serves_stale_entries_and_never_fetches(tmp_path):
+    year_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=365)
+    stale = year_ago.isoformat()
+    catalog = ArtistCatalog(
+        tmp_path / "catalog.json",
+        artists={"artist-1": {"albums": [{"id": "album-1"}], "fetched_at": stale}},
+        offline=True,
+    )
+
+    assert catalog.artist_albums(None, "artist-1") == ({"id": "album-1"},)
+    assert catalog.album_tracks(None, "album-1") == ()
+    assert catalog.similar_artists("Artist", "key") == []
+    assert catalog.resolve_artist(None, "Artist") is None
+    catalog.save()
+    assert not (tmp_path / "catalog.json").exists()
+
+
+def test_offline_view_sees_entries_fetched_later_and_never_fetches(tmp_path):
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+    view = catalog.offline_view()
+
+    assert view.artist_albums(None, "artist-1") == ()
+    catalog.artist_albums(FakeSpotify(), "artist-1")
+
+    assert [album["id"] for album in view.artist_albums(None, "artist-1")] == ["album-1"]
+
+
+def test_merge_from_disk_pulls_newer_entries_into_views(tmp_path):
+    path = tmp_path / "catalog.json"
+    catalog = ArtistCatalog(path)
+    view = catalog.offline_view()
+    other_process = ArtistCatalog(path)
+    other_process.artist_albums(FakeSpotify(), "artist-1")
+    other_process.save()
+
+    assert catalog.merge_from_disk() == 1
+    assert [album["id"] for album in view.artist_albums(None, "artist-1")] == ["album-1"]
+    assert catalog.merge_from_disk() == 0
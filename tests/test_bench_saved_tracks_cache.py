@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from bench_saved_tracks_cache import find_regressions, generate_library, run_size
+
+
+def test_generated_library_is_sorted_and_deterministic():
+    tracks = generate_library(500)
+
+    assert len(tracks) == 500
+    assert tracks.is_sorted_by_added()
+    assert generate_library(500) == tracks
+
+
+def test_run_size_measures_every_operation(tmp_path):
+    results = run_size(200, tmp_path)
+
+    assert set(results) == {"save", "load", "keys", "date_filter"}
+    assert all(result["seconds"] > 0 and result["peak_mb"] > 0 for result in results.values())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_find_regressions_flags_results_beyond_tolerance():
+    baseline = {"1000": {"load": {"seconds": 1.0, "peak_mb": 10.0}}}
+    results = {
+        "1000": {
+            "load": {"seconds": 1.6, "peak_mb": 11.0},
+            "save": {"seconds": 9.0, "peak_mb": 90.0},
+        },
+        "5000": {"load": {"seconds": 9.0, "peak_mb": 90.0}},
+    }
+
+    regressions = find_regressions(results, baseline, time_tolerance=1.5, memory_tolerance=1.2)
+
+    assert regressions == ["load @ 1000: seconds 1.600 > 1.000 x 1.5"]
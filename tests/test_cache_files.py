@@ -0,0 +1,57 @@
+import fcntl
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from cache_files import atomic_write_json, file_lock, lock_path_for
+
+
+def test_atomic_write_json_replaces_file_without_leftovers(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("old", encoding="utf-8")
+
+    atomic_write_json(path, {"a": 1}, sort_keys=True)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_atomic_write_json_keeps_old_file_when_serialization_fails(tmp_path):
+    path = tmp_path / "state.json"
+    atomic_write_json(path, {"a": 1})
+
+    try:
+        atomic_write_json(path, {"a": object()})
+    except TypeError:
+        pass
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    lock_path = lock_path_for(tmp_path / "state.json")
+    events = []
+
+    def contender():
+        with file_lock(lock_path):
+            events.append("contender")
+
+    with file_lock(lock_path):
+        with open(lock_path, "a") as other:
+            try:
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+        thread = threading.Thread(target=contender)
+        thread.start()
+        thread.join(timeout=0.1)
+        events.append("holder")
+
+    thread.join()
+    assert not acquired
+    assert events == ["holder", "contender"]
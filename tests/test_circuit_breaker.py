@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("dep", failure_threshold=2, clock=FakeClock())
+    calls = []
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, "skipped")
+
+    assert breaker.state == "open"
+    assert breaker.rejected == 1
+    assert calls == []
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("dep", failure_threshold=2, clock=FakeClock())
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    assert breaker.state == "closed"
+
+
+def test_slow_successes_count_as_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_threshold=2, slow_call_seconds=1, clock=clock)
+
+    def slow():
+        clock.now += 5
+        return "late"
+
+    assert breaker.call(slow) == "late"
+    assert breaker.call(slow) == "late"
+
+    assert breaker.state == "open"
+
+
+def test_single_trial_call_after_open_period():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_threshold=1, open_seconds=10, clock=clock)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    # A failed trial opens the circuit for another full period
+    clock.now = 15
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+    clock.now = 20
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
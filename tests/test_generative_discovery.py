@@ -2,14 +2,23 @@ import random
 import sys
 from pathlib import Path
 
+import pytest
+import requests
+
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+import generative_discovery
+from circuit_breaker import CircuitBreaker, CircuitOpenError
 from generative_discovery import (
+    expand_similar_artists,
+    fetch_similar_artists,
     filter_saved_artist_matches,
+    merge_similar_artists,
     normalize_artist_name,
     resolve_spotify_artist,
     weighted_choice,
 )
+from request_scheduler import ScheduledLimiter, ServiceBucket, ServiceRate
 
 
 class FakeSpotify:
@@ -71,3 +80,130 @@ def test_resolve_spotify_artist_rejects_weak_top_result():
     artist = resolve_spotify_artist(sp, "The Smile")
 
     assert artist is None
+
+
+class FakeLogger:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+    def debug(self, message):
+        pass
+
+
+def test_merge_similar_artists_dedupes_and_keeps_best_match():
+    results = [
+        ("Seed A", [{"name": "Big Thief", "match": "0.5"}, {"name": "Saved", "match": "1"}]),
+        ("Seed B", [{"name": "big thief", "match": "0.8"}, {"name": "Low", "match": "0.6"}]),
+    ]
+
+    merged = merge_similar_artists(results, {"Saved"})
+
+    assert [candidate["name"] for candidate in merged] == ["Big Thief", "Low"]
+    assert merged[0]["match"] == 0.8
+    assert merged[0]["lastfm_seed_artist"] == "Seed B"
+    assert merged[0]["lastfm_seeds"] == ["Seed A", "Seed B"]
+
+
+def test_expand_similar_artists_skips_failed_seeds(monkeypatch):
+    def fake_fetch(artist_name, api_key, rate_limiter=None):
+        rate_limiter.wait()
+        if artist_name == "Broken":
+            raise RuntimeError("timeout")
+        return [{"name": f"Like {artist_name}", "match": "0.5"}]
+
+    monkeypatch.setattr(generative_discovery, "fetch_similar_artists", fake_fetch)
+    logger = FakeLogger()
+
+    candidates = expand_similar_artists(
+        ["A", "Broken", "B", "A"],
+        "key",
+        set(),
+        logger=logger,
+        rate_limiter=ScheduledLimiter(ServiceBucket("Last.fm", ServiceRate(1000, 1, 1000, 10))),
+    )
+
+    assert sorted(candidate["name"] for candidate in candidates) == ["Like A", "Like B"]
+    assert len(logger.warnings) == 1
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_fetch_similar_artists_retries_a_timed_out_request(monkeypatch):
+    attempts = []
+
+    def fake_get(url, params, timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise requests.Timeout()
+        return FakeResponse({"similarartists": {"artist": [{"name": "Like A"}]}})
+
+    monkeypatch.setattr(generative_discovery.requests, "get", fake_get)
+
+    artists = fetch_similar_artists("A", "key", timeout=2, circuit_breaker=None)
+
+    assert artists == [{"name": "Like A"}]
+    assert attempts == [2, 2]
+
+
+def test_fetch_similar_artists_fails_fast_once_circuit_opens(monkeypatch):
+    attempts = []
+
+    def fake_get(url, params, timeout):
+        attempts.append(params["artist"])
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr(generative_discovery.requests, "get", fake_get)
+    breaker = CircuitBreaker("Last.fm", failure_threshold=3)
+
+    with pytest.raises(RuntimeError, match="ConnectionError"):
+        fetch_similar_artists("A", "key", circuit_breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        fetch_similar_artists("B", "key", circuit_breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        fetch_similar_artists("C", "key", circuit_breaker=breaker)
+
+    # Two attempts for A, then B's retry trips the breaker and C is never sent
+    assert attempts == ["A", "A", "B"]
+
+
+def test_fetch_similar_artists_reports_rate_limiting_and_retries(monkeypatch):
+    throttles = []
+
+    class Limiter:
+        def wait(self):
+            pass
+
+        def succeeded(self):
+            pass
+
+        def throttled(self, retry_after=None):
+            throttles.append(retry_after)
+
+    throttled = requests.Response()
+    throttled.status_code = 429
+    throttled.headers["Retry-After"] = "1"
+    responses = [throttled, FakeResponse({"similarartists": {"artist": [{"name": "Like A"}]}})]
+
+    def fake_get(url, params, timeout):
+        return responses.pop(0)
+
+    monkeypatch.setattr(generative_discovery.requests, "get", fake_get)
+
+    artists = fetch_similar_artists(
+        "A", "key", rate_limiter=Limiter(), circuit_breaker=None
+    )
+
+    assert artists == [{"name": "Like A"}]
+    assert throttles == [1]
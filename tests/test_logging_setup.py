@@ -0,0 +1,72 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from logging_setup import SampledLogger, configure_logging, preview
+
+
+@pytest.fixture
+def captured():
+    messages = []
+    handler_id = logger.add(lambda message: messages.append(message.record), level="DEBUG")
+    yield messages
+    logger.remove(handler_id)
+
+
+@pytest.fixture
+def restore_logger():
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+def test_sampled_logger_logs_first_and_every_nth(captured):
+    sampler = SampledLogger(every=3)
+
+    for i in range(7):
+        sampler.debug("rejected", "track {} rejected", i)
+    sampler.debug("other", "other message")
+
+    assert [record["message"] for record in captured] == [
+        "track 0 rejected",
+        "track 3 rejected [rejected: 4 so far]",
+        "track 6 rejected [rejected: 7 so far]",
+        "other message",
+    ]
+    assert captured[0]["function"] == "test_sampled_logger_logs_first_and_every_nth"
+    assert sampler.counts() == {"rejected": 7, "other": 1}
+
+
+def test_skipped_messages_are_never_formatted(captured):
+    class Exploding:
+        def __format__(self, spec):
+            raise AssertionError("formatted a skipped message")
+
+    sampler = SampledLogger(every=10)
+    sampler.debug("hot", "first {}", "ok")
+    sampler.debug("hot", "skipped {}", Exploding())
+
+    assert len(captured) == 1
+
+
+def test_json_logs_are_written_through_the_queue(tmp_path, restore_logger):
+    configure_logging("test", console_level="ERROR", json_logs=True, log_dir=tmp_path)
+
+    logger.debug("structured {}", "record")
+    logger.complete()
+    logger.remove()
+
+    lines = (tmp_path / "test.jsonl").read_text().splitlines()
+    record = json.loads(lines[0])["record"]
+    assert record["message"] == "structured record"
+    assert record["level"]["name"] == "DEBUG"
+
+
+def test_preview_abbreviates_long_lists():
+    assert preview(["a", "b"]) == "['a', 'b']"
+    assert preview(list(range(8)), limit=3) == "[0, 1, 2, ... 5 more]"
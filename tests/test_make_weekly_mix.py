@@ -0,0 +1,106 @@
+import datetime
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from artist_catalog import ArtistCatalog
+from mixed_tracks_filter import MixedTracksFilter, track_hash
+from make_weekly_mix import (
+    PlanInputs,
+    config_grid,
+    parse_config_overrides,
+    plan_weekly_mix,
+)
+
+
+CONFIG = {
+    "max_tracks": 5,
+    "max_runtime": 30,
+    "max_artist": 2,
+    "failed_runtime_attempts": 5,
+    "generative_percentage_mean": 0,
+    "generative_percentage_std": 0,
+}
+
+
+def offline_catalog(tmp_path, artist_count=4, albums_per_artist=2, tracks_per_album=5):
+    fetched_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc).isoformat()
+    artists, albums = {}, {}
+    for a in range(artist_count):
+        album_ids = [f"album-{a}-{b}" for b in range(albums_per_artist)]
+        artists[f"artist-{a}"] = {
+            "albums": [{"id": album_id} for album_id in album_ids],
+            "fetched_at": fetched_at,
+        }
+        for album_id in album_ids:
+            albums[album_id] = {
+                "tracks": [
+                    {"id": f"{album_id}-{t}", "name": f"Song {t}", "duration_ms": 180_000}
+                    for t in range(tracks_per_album)
+                ],
+                "fetched_at": fetched_at,
+            }
+    return ArtistCatalog(tmp_path / "catalog.json", artists=artists, albums=albums, offline=True)
+
+
+def plan_inputs(artist_count=4):
+    saved_artists = [{"id": f"artist-{a}", "name": f"Artist {a}"} for a in range(artist_count)]
+    return PlanInputs(saved_artists, {artist["name"] for artist in saved_artists}, set())
+
+
+def test_plan_selects_from_stale_cache_without_spotify(tmp_path):
+    selection = plan_weekly_mix(offline_catalog(tmp_path), CONFIG, plan_inputs(), None, seed=1)
+
+    assert len(selection.track_ids) == 5
+    assert len(set(selection.track_ids)) == 5
+    assert all(count <= 2 for count in selection.artist_counts.values())
+    assert selection.track_labels[0].endswith(" by " + next(iter(selection.artist_counts)))
+
+
+def test_plan_is_reproducible_per_seed(tmp_path):
+    catalog = offline_catalog(tmp_path)
+    inputs = plan_inputs()
+
+    first = plan_weekly_mix(catalog, CONFIG, inputs, None, seed=7)
+    again = plan_weekly_mix(catalog, CONFIG, inputs, None, seed=7)
+
+    assert first.track_ids == again.track_ids
+
+
+def test_plan_skips_tracks_from_recent_mixes(tmp_path):
+    catalog = offline_catalog(tmp_path, artist_count=1, albums_per_artist=1, tracks_per_album=3)
+    inputs = plan_inputs(artist_count=1)
+    inputs.mixed_tracks = MixedTracksFilter(track_hash(f"album-0-0-{t}") for t in range(2))
+
+    selection = plan_weekly_mix(catalog, CONFIG, inputs, None, seed=0)
+
+    assert selection.track_ids == ["album-0-0-2"]
+
+
+def test_plan_requires_offline_catalog(tmp_path):
+    with pytest.raises(ValueError):
+        plan_weekly_mix(ArtistCatalog(tmp_path / "catalog.json"), CONFIG, plan_inputs(), None, 0)
+
+
+def test_config_overrides_sweep_every_combination():
+    overrides = parse_config_overrides(["max_artist=1,2", "generative_percentage_mean=0,10.5"])
+
+    configs = config_grid(CONFIG, overrides)
+
+    assert overrides == {"max_artist": [1, 2], "generative_percentage_mean": [0, 10.5]}
+    assert len(configs) == 4
+    assert {(c["max_artist"], c["generative_percentage_mean"]) for c in configs} == {
+        (1, 0),
+        (1, 10.5),
+        (2, 0),
+        (2, 10.5),
+    }
+    assert all(c["max_tracks"] == 5 for c in configs)
+
+
+def test_config_overrides_reject_missing_value():
+    with pytest.raises(ValueError):
+        parse_config_overrides(["max_artist"])
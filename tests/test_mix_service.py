@@ -0,0 +1,200 @@
+import dataclasses
+import datetime
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from artist_catalog import ArtistCatalog
+from followed_artists import save_followed_artists
+import mix_service
+from mix_service import MixServer, MixService
+from mixed_tracks_filter import record_mixed_tracks
+from profiles import Profile
+from saved_tracks_cache import _save_to_cache
+from track_collection import TrackCollection
+
+
+CONFIG = {
+    "max_tracks": 5,
+    "max_runtime": 30,
+    "max_artist": 2,
+    "failed_runtime_attempts": 5,
+    "generative_percentage_mean": 0,
+    "generative_percentage_std": 0,
+    "rolling_playlists": [{"name": "last month", "days": 30}],
+}
+
+
+@dataclasses.dataclass
+class FakeIdentity:
+    key: str
+
+
+class FailingSpotify:
+    def __getattr__(self, name):
+        raise AssertionError(f"Spotify should not be called ({name})")
+
+
+def saved_track(track_id, days_ago):
+    added_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)
+    return {
+        "id": track_id,
+        "name": f"Song {track_id}",
+        "primary_artist": "Artist 0",
+        "artists": ["Artist 0"],
+        "artist_ids": ["artist-0"],
+        "added_at": added_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "added_at_epoch": int(added_at.timestamp()),
+        "album": "Album",
+        "duration_ms": 1000,
+        "spotify_url": f"https://open.spotify.com/track/{track_id}",
+    }
+
+
+def catalog(tmp_path):
+    fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    artists, albums = {}, {}
+    for a in range(4):
+        album_id = f"album-{a}"
+        artists[f"artist-{a}"] = {"albums": [{"id": album_id}], "fetched_at": fetched_at}
+        albums[album_id] = {
+            "tracks": [
+                {"id": f"{album_id}-{t}", "name": f"Song {t}", "duration_ms": 180_000}
+                for t in range(5)
+            ],
+            "fetched_at": fetched_at,
+        }
+    return ArtistCatalog(tmp_path / "catalog.json", artists=artists, albums=albums)
+
+
+@pytest.fixture
+def service(tmp_path):
+    profile = Profile(name="test", data_dir=tmp_path)
+    save_followed_artists(
+        profile.followed_artists_path,
+        [{"id": f"artist-{a}", "name": f"Artist {a}"} for a in range(4)],
+    )
+    _save_to_cache(
+        TrackCollection.from_dicts([saved_track("new", 3), saved_track("old", 60)]),
+        profile.saved_tracks_path,
+    )
+    return MixService(
+        profile, CONFIG, FailingSpotify(), FailingSpotify(), catalog(tmp_path), None
+    )
+
+
+def test_refresh_loads_library_from_fresh_caches(service):
+    service.refresh()
+
+    assert service.status()["followed_artists"] == 4
+    assert service.status()["saved_tracks"] == 2
+    assert service.state.inputs.saved_tracks_set == {
+        ("song new", "artist 0"),
+        ("song old", "artist 0"),
+    }
+
+
+def test_refresh_merges_catalog_entries_saved_by_other_processes(service, tmp_path):
+    fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    # As saved by the prewarm, running in another process
+    similar = {
+        "Artist 0": {"candidates": [{"name": "New", "match": "1"}], "fetched_at": fetched_at}
+    }
+    (tmp_path / "catalog.json").write_text(json.dumps({"similar": similar}), encoding="utf-8")
+    service.lastfm_api_key = "key"
+
+    service.refresh()
+
+    assert service.preview_catalog.cached_similar_artists("Artist 0") == [
+        {"name": "New", "match": "1"}
+    ]
+    assert [c["name"] for c in service.state.inputs.generative_pool] == ["New"]
+
+
+def test_weekly_preview_is_reproducible_per_seed(service):
+    first = service.preview_weekly(seed=3)
+    again = service.preview_weekly(seed=3)
+
+    assert first["seed"] == 3
+    assert len(first["tracks"]) == 5
+    assert first["tracks"] == again["tracks"]
+
+
+def test_rolling_preview_counts_tracks_per_window(service):
+    assert service.preview_rolling() == {
+        "windows": [{"name": "last month", "days": 30, "tracks": 1}]
+    }
+
+
+def request(server, method, path):
+    host, port = server.server_address
+    req = urllib.request.Request(f"http://{host}:{port}{path}", method=method)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_http_routes(service):
+    service.refresh()
+    server = MixServer(("127.0.0.1", 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert request(server, "GET", "/status")[1]["profile"] == "test"
+        status, body = request(server, "GET", "/weekly/preview?seed=1")
+        assert status == 200 and body["seed"] == 1
+        assert request(server, "GET", "/weekly/preview?seed=x")[0] == 400
+        assert request(server, "GET", "/weekly/generate")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_week_rollover_reloads_past_mixes_before_generating(service, monkeypatch):
+    service.refresh()
+    service.state = dataclasses.replace(service.state, week_key="2020-W01")
+    record_mixed_tracks(
+        service.profile.mixed_tracks_path, "2020-W01", [f"album-{a}-0" for a in range(4)]
+    )
+    monkeypatch.setattr(mix_service, "build_weekly_mix_identity", lambda: FakeIdentity("2020-W02"))
+    used = []
+    monkeypatch.setattr(
+        mix_service,
+        "run_weekly_mix",
+        lambda sp, profile, config, catalog, key, inputs: used.append(inputs),
+    )
+
+    service.generate_weekly()
+
+    assert "album-0-0" in used[0].mixed_tracks
+    assert "album-0-0" not in service.state.inputs.mixed_tracks
+
+
+def test_rolling_generates_run_one_at_a_time(service, monkeypatch):
+    running = []
+    overlaps = []
+
+    def fake_run(sp, profile, config, tracks):
+        running.append(1)
+        overlaps.append(len(running))
+        time.sleep(0.05)
+        running.pop()
+
+    monkeypatch.setattr(mix_service, "run_rolling_playlists", fake_run)
+    service.refresh()
+    threads = [threading.Thread(target=service.generate_rolling) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == [1, 1, 1]
@@ -0,0 +1,42 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from mixed_tracks_filter import MixedTracksFilter, record_mixed_tracks, track_hash
+
+
+def test_filter_loads_only_weeks_inside_lookback(tmp_path):
+    path = tmp_path / "mixed_tracks.json"
+    record_mixed_tracks(path, "2025-W50", ["old"], keep_weeks=52)
+    record_mixed_tracks(path, "2026-W01", ["recent-1", "recent-2"], keep_weeks=52)
+    record_mixed_tracks(path, "2026-W03", ["this-week"], keep_weeks=52)
+
+    mixed = MixedTracksFilter.load(path, "2026-W03", lookback_weeks=3)
+
+    assert "recent-1" in mixed
+    assert "recent-2" in mixed
+    assert "old" not in mixed
+    assert "this-week" not in mixed
+    assert len(mixed) == 2
+
+
+def test_weeks_are_stored_as_sorted_hashes_and_pruned(tmp_path):
+    path = tmp_path / "mixed_tracks.json"
+    record_mixed_tracks(path, "2026-W01", ["a"], keep_weeks=2)
+    record_mixed_tracks(path, "2026-W05", ["b", "c", "b"], keep_weeks=2)
+
+    weeks = json.loads(path.read_text())["weeks"]
+
+    assert list(weeks) == ["2026-W05"]
+    # Eight bytes per distinct track, base64 encoded
+    assert len(weeks["2026-W05"]) == 24
+    assert track_hash("b") != track_hash("c")
+
+
+def test_missing_file_excludes_nothing(tmp_path):
+    mixed = MixedTracksFilter.load(tmp_path / "missing.json", "2026-W05")
+
+    assert len(mixed) == 0
+    assert "anything" not in mixed
@@ -0,0 +1,92 @@
+import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import artist_catalog
+from artist_catalog import ArtistCatalog
+from prewarm_candidates import CandidatePrewarmer
+from run_budget import RunBudget
+
+
+class FakeSpotify:
+    def __init__(self):
+        self.calls = []
+
+    def artist_albums(self, artist_id, album_type=None, limit=20):
+        self.calls.append(("albums", artist_id))
+        return {
+            "items": [
+                {
+                    "id": f"{artist_id}-album",
+                    "name": "Album",
+                    "artists": [{"id": artist_id, "name": artist_id}],
+                }
+            ],
+            "next": None,
+        }
+
+    def album_tracks(self, album_id, limit=50):
+        self.calls.append(("tracks", album_id))
+        return {
+            "items": [
+                {"id": f"{album_id}-track", "name": "Song", "duration_ms": 1000, "artists": []}
+            ],
+            "next": None,
+        }
+
+    def search(self, q, type, limit):
+        self.calls.append(("search", q))
+        return {"artists": {"items": [{"id": "similar-id", "name": "Similar"}]}}
+
+
+def timestamp(days_ago):
+    fetched_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)
+    return fetched_at.isoformat()
+
+
+def test_prewarm_fills_missing_entries_through_similar_artists(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        artist_catalog,
+        "fetch_similar_artists",
+        lambda name, api_key, **kwargs: [
+            {"name": "Similar", "match": "0.9"},
+            {"name": "Seed", "match": "1"},
+        ],
+    )
+    sp = FakeSpotify()
+    catalog = ArtistCatalog(tmp_path / "catalog.json")
+    prewarmer = CandidatePrewarmer(sp, catalog, "key", {"Seed"}, RunBudget(60))
+
+    prewarmer.add_seed_artist({"id": "seed-id", "name": "Seed"})
+    prewarmer.run()
+
+    assert catalog.cached_album_tracks("seed-id")
+    assert catalog.cached_album_tracks("similar-id")
+    assert ("search", 'artist:"Seed"') not in sp.calls
+    assert prewarmer.failed == 0
+
+
+def test_prewarm_refreshes_stalest_entries_first_and_skips_fresh_ones(tmp_path):
+    sp = FakeSpotify()
+    catalog = ArtistCatalog(
+        tmp_path / "catalog.json",
+        artists={
+            "fresh": {"albums": [{"id": "fresh-album"}], "fetched_at": timestamp(0)},
+            "old": {"albums": [], "fetched_at": timestamp(6)},
+            "older": {"albums": [], "fetched_at": timestamp(30)},
+        },
+        albums={"fresh-album": {"tracks": [], "fetched_at": timestamp(0)}},
+    )
+    prewarmer = CandidatePrewarmer(sp, catalog, None, set(), RunBudget(60))
+
+    for artist_id in ("old", "fresh", "missing", "older"):
+        prewarmer.add_seed_artist({"id": artist_id, "name": artist_id})
+    prewarmer.run()
+
+    assert [call for call in sp.calls if call[0] == "albums"] == [
+        ("albums", "missing"),
+        ("albums", "older"),
+        ("albums", "old"),
+    ]
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from profiles import DATA_DIR, default_profile, load_profiles, resolve_profile
+
+
+def write_profiles(tmp_path, content):
+    path = tmp_path / "profiles.yaml"
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+def test_default_profile_uses_shared_data_dir():
+    profile = default_profile()
+
+    assert profile.saved_tracks_path == DATA_DIR / "saved_tracks.json"
+    assert profile.weekly_mix_state_path == DATA_DIR / "weekly_mix_runs.json"
+    assert profile.token_cache is None
+
+
+def test_load_profiles_resolves_paths_relative_to_profiles_file(tmp_path):
+    path = write_profiles(
+        tmp_path,
+        "profiles:\n"
+        "  - name: alice\n"
+        "    data_dir: data/alice\n"
+        "    jobs: [weekly]\n"
+        "  - name: bob\n"
+        "    token_cache: tokens/bob\n",
+    )
+
+    alice, bob = load_profiles(path)
+
+    assert alice.data_dir == tmp_path / "data" / "alice"
+    assert alice.token_cache == tmp_path / "data" / "alice" / ".spotify_token_cache"
+    assert alice.jobs == ("weekly",)
+    assert bob.token_cache == tmp_path / "tokens" / "bob"
+    assert bob.jobs == ("weekly", "rolling")
+
+
+def test_load_profiles_rejects_duplicate_names(tmp_path):
+    path = write_profiles(tmp_path, "profiles:\n  - name: alice\n  - name: alice\n")
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_profiles(path)
+
+
+def test_load_profiles_rejects_unknown_jobs(tmp_path):
+    path = write_profiles(tmp_path, "profiles:\n  - name: alice\n    jobs: [daily]\n")
+
+    with pytest.raises(ValueError, match="Unknown jobs"):
+        load_profiles(path)
+
+
+def test_resolve_profile_finds_named_profile(tmp_path):
+    path = write_profiles(tmp_path, "profiles:\n  - name: alice\n")
+
+    assert resolve_profile(None, path) == default_profile()
+    assert resolve_profile("alice", path).name == "alice"
+    with pytest.raises(ValueError, match="No profile"):
+        resolve_profile("bob", path)
@@ -0,0 +1,33 @@
+import json
+import pstats
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from profiling import SpanRecorder, profiling_session, span
+
+
+def test_repeated_spans_are_aggregated():
+    recorder = SpanRecorder()
+
+    for _ in range(3):
+        with recorder.span("update window"):
+            pass
+
+    stats = recorder.summary()["spans"]["update window"]
+    assert stats["count"] == 3
+    assert stats["max_seconds"] <= stats["total_seconds"]
+
+
+def test_profiling_session_writes_timings_and_cprofile(tmp_path):
+    timings_path = tmp_path / "timings.json"
+    cprofile_path = tmp_path / "run.prof"
+
+    with profiling_session("script", cprofile_path, timings_path):
+        with span("selection"):
+            sum(range(1000))
+
+    summary = json.loads(timings_path.read_text())
+    assert set(summary["spans"]) == {"script", "selection"}
+    assert pstats.Stats(str(cprofile_path)).total_calls > 0
@@ -0,0 +1,168 @@
+import sys
+from pathlib import Path
+
+import pytest
+import spotipy
+from spotipy.exceptions import SpotifyException
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from request_scheduler import (
+    BACKGROUND,
+    CRITICAL,
+    ScheduledLimiter,
+    ScheduledSpotify,
+    ServiceBucket,
+    ServiceRate,
+    retry_after_seconds,
+)
+
+
+RATE = ServiceRate(
+    requests_per_second=2, min_requests_per_second=0.5, max_requests_per_second=4, burst=4
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def bucket(clock, rate=RATE):
+    return ServiceBucket("Service", rate, clock=clock, sleep=clock.sleep)
+
+
+def test_burst_is_sent_at_once_then_spaced_at_the_rate():
+    clock = FakeClock()
+    service = bucket(clock)
+
+    for _ in range(6):
+        service.acquire()
+
+    assert clock.sleeps == [0.5, 0.5]
+
+
+def test_background_requests_leave_a_reserve_for_critical_ones():
+    clock = FakeClock()
+    service = bucket(clock)
+
+    service.acquire(BACKGROUND)
+    service.acquire(BACKGROUND)
+    service.acquire(CRITICAL)
+    service.acquire(CRITICAL)
+    assert clock.sleeps == []
+
+    service.acquire(BACKGROUND)
+    assert clock.sleeps == [1.5]
+
+
+def test_lower_priority_waits_while_higher_priority_is_queued():
+    clock = FakeClock()
+    service = bucket(clock)
+    # A critical request is already waiting on another thread
+    service._waiting[0] = 1
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        service._waiting[0] = 0
+
+    service._sleep = sleep
+    service.acquire()
+
+    assert clock.sleeps == [0.5]
+
+
+def test_throttling_halves_the_rate_and_pauses_once_per_retry_after():
+    clock = FakeClock()
+    service = bucket(clock)
+
+    service.throttled(retry_after=3)
+    service.throttled(retry_after=3)
+    service.acquire()
+
+    assert service.rate == 1
+    assert service.throttled_count == 2
+    assert clock.sleeps == [3, 1.0]
+
+
+def test_successes_raise_the_rate_up_to_the_maximum():
+    service = bucket(FakeClock())
+
+    for _ in range(60):
+        service.succeeded()
+
+    assert service.rate == 4
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        ScheduledLimiter(bucket(FakeClock()), "urgent")
+
+
+def test_retry_after_is_read_from_headers():
+    assert retry_after_seconds({"Retry-After": "2"}) == 2
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds(None) is None
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.calls = []
+
+    def wait(self):
+        self.calls.append("wait")
+
+    def succeeded(self):
+        self.calls.append("succeeded")
+
+    def throttled(self, retry_after=None):
+        self.calls.append(("throttled", retry_after))
+
+
+def test_spotify_client_requeues_throttled_calls(monkeypatch):
+    responses = [SpotifyException(429, -1, "slow down", headers={"Retry-After": "2"}), {}]
+
+    def fake_call(self, method, url, payload, params):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(spotipy.Spotify, "_internal_call", fake_call)
+    limiter = FakeLimiter()
+    sp = ScheduledSpotify(auth="token", limiter=limiter)
+
+    assert sp.me() == {}
+    assert limiter.calls == ["wait", ("throttled", 2), "wait", "succeeded"]
+
+
+def test_spotify_client_gives_up_on_long_retry_after(monkeypatch):
+    def fake_call(self, method, url, payload, params):
+        raise SpotifyException(429, -1, "banned", headers={"Retry-After": "3600"})
+
+    monkeypatch.setattr(spotipy.Spotify, "_internal_call", fake_call)
+    sp = ScheduledSpotify(auth="token", limiter=FakeLimiter())
+
+    with pytest.raises(SpotifyException):
+        sp.me()
+
+
+def test_spotify_client_does_not_treat_exhausted_server_retries_as_throttling(monkeypatch):
+    def fake_call(self, method, url, payload, params):
+        raise SpotifyException(429, -1, "/v1/me:\n Max Retries")
+
+    monkeypatch.setattr(spotipy.Spotify, "_internal_call", fake_call)
+    limiter = FakeLimiter()
+    sp = ScheduledSpotify(auth="token", limiter=limiter)
+
+    with pytest.raises(SpotifyException):
+        sp.me()
+    assert limiter.calls == ["wait"]
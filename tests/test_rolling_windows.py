@@ -0,0 +1,66 @@
+import datetime
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from rolling_windows import (
+    DEFAULT_ROLLING_WINDOWS,
+    RollingWindow,
+    load_rolling_windows,
+    partition_windows,
+)
+from track_collection import TrackCollection
+
+
+NOW = datetime.datetime(2026, 4, 21, tzinfo=datetime.timezone.utc)
+
+
+def library(*days_ago):
+    collection = TrackCollection()
+    for index, days in enumerate(days_ago):
+        added_at = NOW - datetime.timedelta(days=days)
+        collection.append(
+            id=f"t{days}",
+            name=f"Song {index}",
+            artists=["Artist"],
+            album="Album",
+            duration_ms=1000,
+            added_at=added_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        )
+    return collection
+
+
+def test_partition_windows_returns_sorted_prefix_per_window():
+    tracks = library(45, 2, 120, 30, 10, 89)
+    windows = [RollingWindow("month", 30), RollingWindow("quarter", 90)]
+
+    partitions = partition_windows(tracks, windows, now=NOW)
+
+    assert partitions["month"].ids == ["t2", "t10", "t30"]
+    assert partitions["quarter"].ids == ["t2", "t10", "t30", "t45", "t89"]
+
+
+def test_partition_windows_handles_empty_library():
+    partitions = partition_windows(library(), list(DEFAULT_ROLLING_WINDOWS), now=NOW)
+
+    assert all(len(tracks) == 0 for tracks in partitions.values())
+
+
+def test_load_rolling_windows_reads_config_with_defaults():
+    assert load_rolling_windows({}) == list(DEFAULT_ROLLING_WINDOWS)
+
+    windows = load_rolling_windows(
+        {"rolling_playlists": [{"name": "last week", "days": 7, "pin": False}]}
+    )
+
+    assert windows == [RollingWindow("last week", 7, pin=False)]
+
+
+def test_load_rolling_windows_rejects_duplicate_names():
+    with pytest.raises(ValueError, match="unique"):
+        load_rolling_windows(
+            {"rolling_playlists": [{"name": "a", "days": 7}, {"name": "a", "days": 30}]}
+        )
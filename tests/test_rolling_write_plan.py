@@ -0,0 +1,115 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from rolling_write_plan import (  # noqa: E402
+    WriteOp,
+    apply_write_plan,
+    plan_playlist_writes,
+    simulate_write_plan,
+)
+
+
+def ids(prefix, count):
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def kinds(ops):
+    return [op.kind for op in ops]
+
+
+def test_unchanged_playlist_needs_no_calls():
+    assert plan_playlist_writes(["a", "b"], ["a", "b"]) == []
+
+
+def test_new_tracks_are_inserted_in_order_without_reversing_batches():
+    current = ids("old", 10)
+    target = ids("new", 250) + current
+
+    ops = plan_playlist_writes(current, target)
+
+    assert kinds(ops) == ["add", "add", "add"]
+    assert [op.position for op in ops] == [0, 100, 200]
+    assert simulate_write_plan(current, ops) == target
+
+
+def test_disjoint_target_uses_replace():
+    current = ids("old", 300)
+    target = ids("new", 150)
+
+    ops = plan_playlist_writes(current, target)
+
+    assert kinds(ops) == ["replace", "add"]
+    assert simulate_write_plan(current, ops) == target
+
+
+def test_moved_block_uses_one_reorder():
+    current = ["b", "c", "d", "a"]
+    target = ["a", "b", "c", "d"]
+
+    ops = plan_playlist_writes(current, target)
+
+    assert ops == [WriteOp("reorder", range_start=3, range_length=1, insert_before=0)]
+    assert simulate_write_plan(current, ops) == target
+
+
+def test_unavailable_items_force_replace():
+    ops = plan_playlist_writes(["a", None, "b"], ["a", "b"])
+
+    assert kinds(ops) == ["replace"]
+
+
+def test_random_plans_reach_target_and_never_cost_more_than_replace():
+    rng = random.Random(34)
+    pool = ids("t", 400)
+    for _ in range(200):
+        current = rng.sample(pool, rng.randint(0, 250))
+        target = rng.sample(pool, rng.randint(0, 250))
+        if rng.random() < 0.5:
+            # Mostly-stable playlists, like a rolling window a day later
+            target = ids("fresh", rng.randint(0, 5)) + current[: rng.randint(0, len(current))]
+
+        ops = plan_playlist_writes(current, target)
+
+        assert simulate_write_plan(current, ops) == target
+        assert len(ops) <= max(1, -(-len(target) // 100))
+
+
+class FakeSpotify:
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, name, **kwargs):
+        self.calls.append((name, kwargs))
+        return {"snapshot_id": f"snap{len(self.calls)}"}
+
+    def playlist_replace_items(self, playlist_id, items):
+        return self._record("replace", items=items)
+
+    def playlist_add_items(self, playlist_id, items, position=None):
+        return self._record("add", items=items, position=position)
+
+    def playlist_remove_all_occurrences_of_items(self, playlist_id, items, snapshot_id=None):
+        return self._record("remove", items=items, snapshot_id=snapshot_id)
+
+    def playlist_reorder_items(
+        self, playlist_id, range_start, insert_before, range_length=1, snapshot_id=None
+    ):
+        return self._record("reorder", snapshot_id=snapshot_id)
+
+
+def test_apply_write_plan_chains_snapshot_ids():
+    sp = FakeSpotify()
+    ops = [
+        WriteOp("add", ("x",), position=0),
+        WriteOp("remove", ("y",)),
+        WriteOp("reorder", range_start=1, range_length=1, insert_before=0),
+    ]
+
+    snapshot_id = apply_write_plan(sp, "playlist", ops)
+
+    assert sp.calls[1] == ("remove", {"items": ["y"], "snapshot_id": "snap1"})
+    assert sp.calls[2] == ("reorder", {"snapshot_id": "snap2"})
+    assert snapshot_id == "snap3"
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from run_budget import RunBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unlimited_budget_never_degrades():
+    clock = FakeClock()
+    budget = RunBudget(clock=clock)
+    clock.now = 10_000
+
+    assert budget.allows_generative()
+    assert not budget.cached_only()
+    assert not budget.should_stop()
+    assert budget.degradations == []
+
+
+def test_degradations_apply_in_order_as_deadline_nears():
+    clock = FakeClock()
+    budget = RunBudget(100, clock=clock)
+
+    clock.now = 60
+    assert not budget.allows_generative()
+    assert not budget.cached_only()
+
+    clock.now = 80
+    assert budget.cached_only()
+    assert not budget.should_stop()
+
+    clock.now = 95
+    assert budget.should_stop()
+    assert budget.allows_generative() is False
+    assert budget.degradations == [
+        "skipped generative discovery",
+        "limited candidates to cached catalog",
+        "ended selection early",
+    ]
+
+
+def test_phase_times_accumulate():
+    clock = FakeClock()
+    budget = RunBudget(100, clock=clock)
+
+    for _ in range(2):
+        with budget.phase("selection"):
+            clock.now += 3
+
+    assert budget.phase_seconds == {"selection": 6}
+    assert budget.remaining() == 94
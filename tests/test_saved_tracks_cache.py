@@ -0,0 +1,247 @@
+import datetime
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import saved_tracks_cache
+from cache_files import file_lock, lock_path_for
+from saved_tracks_cache import (
+    _save_to_cache,
+    get_saved_track_keys,
+    get_saved_tracks,
+    get_tracks_in_date_range,
+    iter_saved_track_artists,
+    iter_saved_tracks,
+    load_cached_saved_tracks,
+    wait_for_background_refresh,
+)
+from track_collection import TrackCollection
+
+
+TRACK = {
+    "id": "track-1",
+    "name": "Song",
+    "primary_artist": "Artist",
+    "artists": ["Artist"],
+    "artist_ids": ["artist-1"],
+    "added_at": "2026-04-20T10:00:00Z",
+    "added_at_epoch": 1776679200,
+    "album": "Album",
+    "duration_ms": 1000,
+    "spotify_url": "https://open.spotify.com/track/track-1",
+}
+
+
+REFRESHED_TRACK = dict(TRACK, id="track-2", spotify_url="https://open.spotify.com/track/track-2")
+
+
+def collection(*tracks):
+    return TrackCollection.from_dicts(tracks)
+
+
+class FailingSpotify:
+    def current_user_saved_tracks(self, limit=20, offset=0):
+        raise AssertionError("API should not be called")
+
+
+def test_fresh_cache_is_returned_without_api_calls(tmp_path):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(TRACK), cache_file)
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert tracks.to_dicts() == [TRACK]
+
+
+def test_waiting_process_reuses_cache_refreshed_by_lock_holder(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    monkeypatch.setattr(saved_tracks_cache, "_load_from_cache", lambda cache_file: None)
+    results = []
+
+    with file_lock(lock_path_for(cache_file, "refresh.lock")):
+        waiter = threading.Thread(
+            target=lambda: results.append(
+                get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+            )
+        )
+        waiter.start()
+        waiter.join(timeout=0.1)
+        assert waiter.is_alive()
+        _save_to_cache(collection(TRACK), cache_file)
+
+    waiter.join()
+    assert [tracks.to_dicts() for tracks in results] == [[TRACK]]
+
+
+def test_expired_cache_is_refetched(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(), cache_file)
+    monkeypatch.setattr(saved_tracks_cache, "CACHE_EXPIRY_HOURS", 0)
+    monkeypatch.setattr(saved_tracks_cache, "_fetch_from_api", lambda sp: collection(TRACK))
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert tracks.to_dicts() == [TRACK]
+    assert load_cached_saved_tracks(cache_file).to_dicts() == [TRACK]
+
+
+def test_allow_stale_returns_expired_cache_and_refreshes_in_background(
+    tmp_path, monkeypatch
+):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(TRACK), cache_file)
+    monkeypatch.setattr(saved_tracks_cache, "CACHE_EXPIRY_HOURS", 0)
+    monkeypatch.setattr(
+        saved_tracks_cache, "_fetch_from_api", lambda sp: collection(REFRESHED_TRACK)
+    )
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file, allow_stale=True)
+    wait_for_background_refresh()
+
+    assert tracks.to_dicts() == [TRACK]
+    assert load_cached_saved_tracks(cache_file).to_dicts() == [REFRESHED_TRACK]
+
+
+def test_strict_mode_blocks_on_refetch_of_expired_cache(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(TRACK), cache_file)
+    monkeypatch.setattr(saved_tracks_cache, "CACHE_EXPIRY_HOURS", 0)
+    monkeypatch.setattr(
+        saved_tracks_cache, "_fetch_from_api", lambda sp: collection(REFRESHED_TRACK)
+    )
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert tracks.to_dicts() == [REFRESHED_TRACK]
+
+
+def test_allow_stale_blocks_when_cache_is_too_old(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(TRACK), cache_file)
+    monkeypatch.setattr(saved_tracks_cache, "CACHE_EXPIRY_HOURS", 0)
+    monkeypatch.setattr(saved_tracks_cache, "STALE_CACHE_MAX_HOURS", 0)
+    monkeypatch.setattr(
+        saved_tracks_cache, "_fetch_from_api", lambda sp: collection(REFRESHED_TRACK)
+    )
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file, allow_stale=True)
+
+    assert tracks.to_dicts() == [REFRESHED_TRACK]
+
+
+def test_saved_track_keys_use_lowercased_name_and_primary_artist(tmp_path):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(dict(TRACK, name=" Song ", artists=["ARTIST", "Guest"])), cache_file)
+
+    keys = get_saved_track_keys(FailingSpotify(), cache_file=cache_file)
+
+    assert keys == {("song", "artist")}
+
+
+def test_iter_saved_tracks_streams_fresh_cache_without_api_calls(tmp_path):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(REFRESHED_TRACK, TRACK), cache_file)
+
+    tracks = iter_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert next(tracks).to_dict() == REFRESHED_TRACK
+    assert [track.to_dict() for track in tracks] == [TRACK]
+
+
+def test_iter_saved_track_artists_projects_ids_and_artists(tmp_path):
+    cache_file = tmp_path / "saved_tracks.json"
+    _save_to_cache(collection(TRACK), cache_file)
+
+    rows = list(iter_saved_track_artists(FailingSpotify(), cache_file=cache_file))
+
+    assert rows == [("track-1", ("Artist",), ("artist-1",))]
+
+
+def test_date_range_stops_reading_at_first_older_track(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    recent = dict(TRACK, added_at_epoch=2_000_000_000)
+    _save_to_cache(collection(recent, TRACK), cache_file)
+    # The older track is cut off by the date, so an unreadable line after it is never read
+    with open(cache_file, "a", encoding="utf-8") as f:
+        f.write("not json\n")
+    monkeypatch.setattr(saved_tracks_cache, "cutoff_epoch", lambda days: 1_900_000_000)
+
+    tracks = get_tracks_in_date_range(FailingSpotify(), 30, cache_file=cache_file)
+
+    assert tracks.to_dicts() == [recent]
+
+
+def test_cache_in_previous_json_format_is_refetched(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    cached_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    cache_file.write_text(
+        json.dumps({"version": 3, "cached_at": cached_at, "tracks": [TRACK]}, indent=2),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(saved_tracks_cache, "_fetch_from_api", lambda sp: collection(TRACK))
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert tracks.to_dicts() == [TRACK]
+
+
+def write_with_corrupt_middle_line(cache_file, first, last):
+    _save_to_cache(collection(first, last), cache_file)
+    header, first_line, last_line = cache_file.read_text(encoding="utf-8").splitlines()
+    truncated = first_line[: len(first_line) // 2]
+    cache_file.write_text("\n".join([header, truncated, last_line]) + "\n", encoding="utf-8")
+
+
+def test_corrupt_cache_row_is_refetched(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    write_with_corrupt_middle_line(cache_file, REFRESHED_TRACK, TRACK)
+    monkeypatch.setattr(
+        saved_tracks_cache, "_fetch_from_api", lambda sp: collection(REFRESHED_TRACK, TRACK)
+    )
+
+    tracks = get_saved_tracks(FailingSpotify(), cache_file=cache_file)
+
+    assert tracks.to_dicts() == [REFRESHED_TRACK, TRACK]
+    assert load_cached_saved_tracks(cache_file).to_dicts() == [REFRESHED_TRACK, TRACK]
+
+
+def test_streaming_falls_back_to_refetch_at_corrupt_row(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    third = dict(TRACK, id="track-3", spotify_url="https://open.spotify.com/track/track-3")
+    _save_to_cache(collection(REFRESHED_TRACK, third, TRACK), cache_file)
+    header, *lines = cache_file.read_text(encoding="utf-8").splitlines()
+    lines[1] = lines[1][:10]
+    cache_file.write_text("\n".join([header, *lines]) + "\n", encoding="utf-8")
+    monkeypatch.setattr(
+        saved_tracks_cache,
+        "_fetch_from_api",
+        lambda sp: collection(REFRESHED_TRACK, third, TRACK),
+    )
+
+    tracks = [track.id for track in iter_saved_tracks(FailingSpotify(), cache_file=cache_file)]
+
+    assert tracks == ["track-2", "track-3", "track-1"]
+    assert get_saved_track_keys(FailingSpotify(), cache_file=cache_file) == {("song", "artist")}
+
+
+def test_streaming_refetch_skips_tracks_already_yielded_by_id(tmp_path, monkeypatch):
+    cache_file = tmp_path / "saved_tracks.json"
+    third = dict(TRACK, id="track-3", spotify_url="https://open.spotify.com/track/track-3")
+    newest = dict(TRACK, id="track-4", spotify_url="https://open.spotify.com/track/track-4")
+    _save_to_cache(collection(REFRESHED_TRACK, third, TRACK), cache_file)
+    header, *lines = cache_file.read_text(encoding="utf-8").splitlines()
+    lines[1] = lines[1][:10]
+    cache_file.write_text("\n".join([header, *lines]) + "\n", encoding="utf-8")
+    # Since the cache was written, a track was saved and track-3 unsaved
+    monkeypatch.setattr(
+        saved_tracks_cache,
+        "_fetch_from_api",
+        lambda sp: collection(newest, REFRESHED_TRACK, TRACK),
+    )
+
+    tracks = [track.id for track in iter_saved_tracks(FailingSpotify(), cache_file=cache_file)]
+
+    assert tracks == ["track-2", "track-4", "track-1"]
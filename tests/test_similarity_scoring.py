@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import similarity_scoring
+from similarity_scoring import SimilarityMatrix, library_seed_weights
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(similarity_scoring, "HAS_NUMPY", False)
+    return request.param
+
+
+def matrix():
+    scores = SimilarityMatrix()
+    scores.add_seed(
+        "Seed A",
+        [
+            {"name": "Big Thief", "match": "0.5"},
+            {"name": "Low", "match": "0.9"},
+            {"name": "Seed B", "match": "1"},
+        ],
+    )
+    scores.add_seed(
+        "Seed B", [{"name": "big thief", "match": "0.6"}, {"name": "Nope", "match": "x"}]
+    )
+    return scores
+
+
+def test_rank_sums_affinity_across_seeds(backend):
+    ranked = matrix().rank(excluded_names={"Seed A", "Seed B"})
+
+    assert [candidate.name for candidate in ranked] == ["Big Thief", "Low"]
+    assert ranked[0].score == pytest.approx(1.1)
+    assert ranked[0].seed_count == 2
+    assert (ranked[0].best_seed, ranked[0].best_match) == ("Seed B", 0.6)
+
+
+def test_seed_weights_favor_library_heavy_seeds(backend):
+    ranked = matrix().rank(excluded_names={"Seed A", "Seed B"}, seed_weights=[1.0, 3.0], k=1)
+
+    assert [(candidate.name, candidate.best_seed) for candidate in ranked] == [
+        ("Big Thief", "Seed B")
+    ]
+    assert ranked[0].score == pytest.approx(2.3)
+
+
+def test_library_seed_weights_grow_with_saved_tracks():
+    keys = {("song 1", "seed a"), ("song 2", "seed a"), ("song 3", "other")}
+
+    weights = library_seed_weights(["Seed A", "Seed B"], keys)
+
+    assert weights[0] > weights[1] == 1.0
@@ -0,0 +1,67 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from singleflight import SingleFlight
+
+
+def wait_until(condition, timeout=5):
+    """Poll `condition` until it holds, returning False if `timeout` seconds pass first."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def run_concurrently(flight, fn, callers=5):
+    """Start `callers` calls for one key and release the leader once all are waiting."""
+    release = threading.Event()
+    calls = []
+
+    def blocking_fn():
+        calls.append(1)
+        release.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(flight.do, "key", blocking_fn) for _ in range(callers)]
+        coalesced = wait_until(lambda: flight.coalesced >= callers - 1)
+        # Released either way, so a failure doesn't leave the workers blocked
+        release.set()
+        if not coalesced:
+            pytest.fail("Concurrent callers were not coalesced")
+        return calls, futures
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+
+    calls, futures = run_concurrently(flight, lambda: {"albums": []})
+
+    results = [future.result() for future in futures]
+    assert all(result is results[0] for result in results)
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_waiting_caller_and_are_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    calls, futures = run_concurrently(flight, fail)
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result()
+    assert len(calls) == 1
+    assert flight.do("key", lambda: "retried") == "retried"
@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from spotify_pagination import fetch_all_parallel, paginate
+
+
+class FakeSpotify:
+    def __init__(self, pages, container_key=None):
+        self.pages = pages
+        self.container_key = container_key
+        self.next_calls = []
+
+    def first_page(self):
+        return self._wrap(self.pages[0])
+
+    def next(self, page):
+        self.next_calls.append(page["next"])
+        return self._wrap(self.pages[page["next"]])
+
+    def _wrap(self, page):
+        if self.container_key:
+            return {self.container_key: page}
+        return page
+
+
+def build_pages(page_count, page_size=2):
+    pages = []
+    for index in range(page_count):
+        pages.append(
+            {
+                "items": [{"id": f"{index}-{item}"} for item in range(page_size)],
+                "next": index + 1 if index + 1 < page_count else None,
+            }
+        )
+    return pages
+
+
+def test_paginate_yields_items_across_pages_in_order():
+    sp = FakeSpotify(build_pages(3))
+
+    items = [item["id"] for item in paginate(sp, sp.first_page())]
+
+    assert items == ["0-0", "0-1", "1-0", "1-1", "2-0", "2-1"]
+    assert sp.next_calls == [1, 2]
+
+
+def test_paginate_unwraps_container_key():
+    sp = FakeSpotify(build_pages(2), container_key="artists")
+
+    items = list(paginate(sp, sp.first_page(), container_key="artists"))
+
+    assert len(items) == 4
+
+
+def test_paginate_stops_fetching_when_consumer_breaks():
+    sp = FakeSpotify(build_pages(5))
+
+    for item in paginate(sp, sp.first_page(), prefetch=False):
+        if item["id"] == "1-0":
+            break
+
+    assert sp.next_calls == [1]
+
+
+def test_paginate_handles_missing_first_page():
+    assert list(paginate(FakeSpotify([]), None)) == []
+
+
+class FakeOffsetSource:
+    def __init__(self, total):
+        self.total = total
+        self.calls = []
+
+    def fetch(self, limit, offset):
+        self.calls.append(offset)
+        stop = min(offset + limit, self.total)
+        return {"items": list(range(offset, stop)), "total": self.total}
+
+
+def test_fetch_all_parallel_preserves_offset_order():
+    source = FakeOffsetSource(total=23)
+
+    items = fetch_all_parallel(source.fetch, page_size=5, max_workers=3)
+
+    assert items == list(range(23))
+    assert sorted(source.calls) == [0, 5, 10, 15, 20]
+
+
+def test_fetch_all_parallel_raises_other_errors():
+    def fetch(limit, offset):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        fetch_all_parallel(fetch, page_size=5)
@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from track_collection import Track, TrackCollection, iter_added_since, parse_added_at
+
+
+def track_dict(track_id, artists=("Artist",), album="Album", added_at="2026-04-20T10:00:00Z"):
+    return {
+        "id": track_id,
+        "name": f"Song {track_id}",
+        "primary_artist": artists[0] if artists else "Unknown",
+        "artists": list(artists),
+        "artist_ids": [artist.lower() for artist in artists],
+        "added_at": added_at,
+        "added_at_epoch": parse_added_at(added_at),
+        "album": album,
+        "duration_ms": 1000,
+        "spotify_url": f"https://open.spotify.com/track/{track_id}",
+    }
+
+
+def test_round_trips_cache_dicts_with_derived_fields():
+    tracks = [track_dict("a"), track_dict("b", artists=()), track_dict("c", ("X", "Y"))]
+
+    collection = TrackCollection.from_dicts(tracks)
+
+    assert len(collection) == 3
+    assert collection.to_dicts() == tracks
+    assert collection[1].primary_artist == "Unknown"
+    assert collection[2].spotify_url == "https://open.spotify.com/track/c"
+
+
+def test_repeated_artists_and_albums_are_stored_once():
+    collection = TrackCollection.from_dicts(
+        track_dict(str(index), artists=("Artist", "Guest")) for index in range(100)
+    )
+
+    assert len(collection._artist_groups.values) == 1
+    assert len(collection._albums.values) == 1
+    assert collection[0].artists is collection[99].artists
+
+
+def test_take_selects_rows_in_requested_order():
+    collection = TrackCollection.from_dicts(
+        [track_dict("a", ("A",)), track_dict("b", ("B",)), track_dict("c", ("C",))]
+    )
+
+    subset = collection.take([2, 0])
+
+    assert subset.ids == ["c", "a"]
+    assert list(subset.iter_primary_artists()) == ["C", "A"]
+    assert [track.album for track in subset] == ["Album", "Album"]
+
+
+def test_added_since_bisects_most_recent_first_order():
+    collection = TrackCollection.from_dicts(
+        [
+            track_dict("old", added_at="2026-01-01T00:00:00Z"),
+            track_dict("new", added_at="2026-04-20T10:00:00Z"),
+            track_dict("mid", added_at="2026-03-01T00:00:00Z"),
+        ]
+    ).sorted_by_added()
+
+    assert collection.ids == ["new", "mid", "old"]
+    assert collection.sorted_by_added() is collection
+    assert collection.added_since(parse_added_at("2026-03-01T00:00:00Z")).ids == ["new", "mid"]
+    assert collection.added_since(parse_added_at("2026-05-01T00:00:00Z")).ids == []
+
+
+def test_iter_added_since_stops_at_first_older_track():
+    tracks = [
+        Track.from_dict(track_dict("new", added_at="2026-04-20T10:00:00Z")),
+        Track.from_dict(track_dict("old", added_at="2026-01-01T10:00:00Z")),
+    ]
+    consumed = []
+
+    def stream():
+        for track in tracks:
+            consumed.append(track.id)
+            yield track
+
+    recent = iter_added_since(stream(), parse_added_at("2026-03-01T00:00:00Z"))
+
+    assert [track.id for track in recent] == ["new"]
+    assert consumed == ["new", "old"]
+    assert TrackCollection.from_tracks(tracks).to_dicts() == [
+        track_dict("new", added_at="2026-04-20T10:00:00Z"),
+        track_dict("old", added_at="2026-01-01T10:00:00Z"),
+    ]
@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from track_collection import TrackCollection, iter_track_artists
+from unfollowed_artists import ArtistAggregate, count_artists, top_unfollowed
+
+
+def library(*tracks):
+    collection = TrackCollection()
+    for track_id, artists in tracks:
+        collection.append(
+            id=track_id,
+            name=f"Song {track_id}",
+            artists=[name for name, _ in artists],
+            artist_ids=[artist_id for _, artist_id in artists],
+            album="Album",
+            duration_ms=1000,
+            added_at="2026-04-20T10:00:00Z",
+        )
+    return list(iter_track_artists(collection))
+
+
+def test_apply_library_counts_by_artist_id_and_applies_deltas():
+    aggregate = ArtistAggregate()
+    aggregate.apply_library(
+        library(
+            ("t1", [("Big Thief", "bt"), ("Guest", "g")]),
+            ("t2", [("Big Thief", "bt")]),
+            ("t3", [("big thief", "other-bt")]),
+        )
+    )
+
+    added, removed = aggregate.apply_library(
+        library(
+            ("t2", [("Big Thief", "bt")]),
+            ("t3", [("big thief", "other-bt")]),
+            ("t4", [("Guest", "g")]),
+        )
+    )
+
+    assert (added, removed) == (1, 1)
+    assert aggregate.counts == {"bt": 1, "other-bt": 1, "g": 1}
+
+
+def test_unsaving_last_track_drops_artist():
+    aggregate = ArtistAggregate()
+    aggregate.apply_library(library(("t1", [("Low", "low")])))
+
+    aggregate.apply_library(library())
+
+    assert aggregate.counts == {}
+    assert aggregate.names == {}
+
+
+def test_top_unfollowed_excludes_followed_and_limits_results():
+    counts = {"a": 5, "b": 9, "c": 7, "d": 1}
+    names = {"a": "A", "b": "B", "c": "C", "d": "D"}
+
+    top = top_unfollowed(counts, names, followed={"b"}, k=2)
+
+    assert [(artist.name, artist.count) for artist in top] == [("C", 7), ("A", 5)]
+    assert len(top_unfollowed(counts, names, followed=set())) == 4
+
+
+def test_aggregate_round_trips_and_tracks_followed_deltas(tmp_path):
+    path = tmp_path / "unfollowed_artists.json"
+    aggregate = ArtistAggregate()
+    aggregate.apply_library(library(("t1", [("Low", "low"), ("High", "high")])))
+    assert aggregate.apply_followed(["high"]) == (1, 0)
+    aggregate.save(path)
+
+    reloaded = ArtistAggregate.load(path)
+
+    assert reloaded.followed_is_fresh()
+    assert [artist.artist_id for artist in reloaded.top_unfollowed(10)] == ["low"]
+    assert reloaded.apply_followed(["low"]) == (1, 1)
+
+
+def test_count_artists_ignores_artists_without_ids():
+    counts, names = count_artists(library(("t1", [("Local", ""), ("Low", "low")])))
+
+    assert counts == {"low": 1}
+    assert names == {"low": "Low"}
+
+
+def test_corrupt_aggregate_loads_empty(tmp_path):
+    path = tmp_path / "unfollowed_artists.json"
+    path.write_text('{"counts": {"a', encoding="utf-8")
+
+    aggregate = ArtistAggregate.load(path)
+
+    assert aggregate.counts == {}
+    assert aggregate.track_artists == {}